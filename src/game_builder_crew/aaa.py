@@ -1,12 +1,41 @@
 
+import mmap
+import os
 import pygame
+import struct
 import sys
+from collections import namedtuple
+
+try:
+    from game_builder_crew.profiler import get_profiler
+except ImportError: # Run as a plain script without the package installed: no profiling
+    class _NoProfiler:
+        def begin_frame(self):
+            pass
+
+        def mark(self, phase):
+            pass
+
+        def draw_overlay(self, screen):
+            pass
+
+        def close(self):
+            pass
+
+    def get_profiler(game_name, profiler=None):
+        return profiler or _NoProfiler()
 
 # --- Constants ---
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
 FPS = 60
 
+# Physics runs at a fixed rate, independent of the render frame rate. All per-step
+# quantities below (velocities, GRAVITY, DASH_DURATION, ...) are in physics steps.
+PHYSICS_STEPS_PER_SECOND = 60
+PHYSICS_STEP_MS = 1000 / PHYSICS_STEPS_PER_SECOND
+MAX_PHYSICS_STEPS_PER_FRAME = 5 # Caps catch-up after a stall so the game never spirals
+
 # Colors
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
@@ -29,10 +58,33 @@ WALL_SLIDE_SPEED = 1.5 # How fast player slides down a wall
 WALL_JUMP_X_VELOCITY = 8 # Horizontal speed when wall jumping
 WALL_JUMP_Y_VELOCITY = -10 # Vertical speed when wall jumping
 DASH_SPEED = 15
-DASH_DURATION = 10 # Frames (approx 0.16 seconds at 60 FPS)
+DASH_DURATION = 10 # Physics steps (approx 0.16 seconds)
 MAX_DASHES = 1
 INITIAL_HEALTH = 3
-INVULNERABILITY_DURATION = 90 # Frames (1.5 seconds at 60 FPS)
+INVULNERABILITY_DURATION = 90 # Physics steps (1.5 seconds)
+
+# Collision broadphase
+SPATIAL_HASH_CELL_SIZE = 64 # Pixels per spatial hash cell
+
+# Level streaming
+# Levels are cut into vertical strips (chunks) CHUNK_WIDTH pixels wide. Only chunks near the
+# camera have sprites; the rest stay on disk (or in the level dict) until the player gets close.
+CHUNK_WIDTH = 400
+CHUNK_ACTIVATION_MARGIN = 200 # Chunks this far outside the camera view stay active
+COLLECTABLE_TYPES = ['coin', 'heart', 'powerup'] # Type codes used in level files
+
+# Level file layout (all little-endian):
+#   header:      magic, version, chunk width, level width, level height,
+#                player start (x, y), exit gate (x, y, w, h), chunk count
+#   chunk table: (offset, length) per chunk
+#   chunk:       platform, hazard and collectable counts, then the records
+LEVEL_FILE_MAGIC = b"AAAL"
+LEVEL_FILE_VERSION = 1
+LEVEL_HEADER_FORMAT = "<4sBHIIiiiiiiI"
+CHUNK_TABLE_ENTRY_FORMAT = "<II"
+CHUNK_COUNTS_FORMAT = "<HHH"
+RECT_RECORD_FORMAT = "<iiii" # x, y, width, height
+COLLECTABLE_RECORD_FORMAT = "<iiB" # center x, center y, type code
 
 # --- Level Data ---
 LEVEL_DATA = [
@@ -108,16 +160,249 @@ LEVEL_DATA = [
 ]
 
 
+# --- Level Chunking ---
+
+def split_level_into_chunks(level, chunk_width=CHUNK_WIDTH):
+    # Splits a LEVEL_DATA-style dict into per-chunk (platforms, hazards, collectables) lists.
+    # Platforms and hazards that cross a chunk boundary are cut into one piece per chunk;
+    # collectables belong to the chunk containing their center.
+    # Returns (chunks, level_width, level_height).
+    gate_x, gate_y, gate_w, gate_h = level["exit_gate"]
+    level_width = max([SCREEN_WIDTH, gate_x + gate_w] + [x + w for x, y, w, h in level["platforms"] + level["hazards"]])
+    level_height = max([SCREEN_HEIGHT, gate_y + gate_h] + [y + h for x, y, w, h in level["platforms"] + level["hazards"]])
+    chunks = [([], [], []) for _ in range((level_width + chunk_width - 1) // chunk_width)]
+
+    for kind, rects in ((0, level["platforms"]), (1, level["hazards"])):
+        for x, y, w, h in rects:
+            first = max(0, x // chunk_width)
+            last = (x + w - 1) // chunk_width
+            for chunk_index in range(first, last + 1):
+                left = x if chunk_index == first else chunk_index * chunk_width
+                right = x + w if chunk_index == last else (chunk_index + 1) * chunk_width
+                chunks[chunk_index][kind].append((left, y, right - left, h))
+
+    for x, y, c_type in level["collectables"]:
+        chunk_index = min(len(chunks) - 1, max(0, x // chunk_width))
+        chunks[chunk_index][2].append((x, y, c_type))
+
+    return chunks, level_width, level_height
+
+
+class InlineLevel:
+    # A level defined in Python (a LEVEL_DATA entry), chunked in memory.
+    def __init__(self, level, chunk_width=CHUNK_WIDTH):
+        self.player_start = tuple(level["player_start"])
+        self.exit_gate = tuple(level["exit_gate"])
+        self.chunk_width = chunk_width
+        self.chunks, self.width, self.height = split_level_into_chunks(level, chunk_width)
+        self.num_chunks = len(self.chunks)
+
+    def load_chunk(self, chunk_index):
+        return self.chunks[chunk_index]
+
+
+class LevelFile:
+    # A level stored in the binary level file format. Only the header and chunk table are
+    # read when opening; chunk records are decoded from the memory map on demand.
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as level_file:
+            self.data = mmap.mmap(level_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, self.chunk_width, self.width, self.height,
+         start_x, start_y, gate_x, gate_y, gate_w, gate_h, self.num_chunks) = struct.unpack_from(LEVEL_HEADER_FORMAT, self.data, 0)
+        if magic != LEVEL_FILE_MAGIC or version != LEVEL_FILE_VERSION:
+            raise ValueError(f"{path} is not a version {LEVEL_FILE_VERSION} level file")
+        self.player_start = (start_x, start_y)
+        self.exit_gate = (gate_x, gate_y, gate_w, gate_h)
+
+        table_offset = struct.calcsize(LEVEL_HEADER_FORMAT)
+        self.chunk_offsets = [struct.unpack_from(CHUNK_TABLE_ENTRY_FORMAT, self.data, table_offset + i * struct.calcsize(CHUNK_TABLE_ENTRY_FORMAT))[0]
+                              for i in range(self.num_chunks)]
+
+    def load_chunk(self, chunk_index):
+        offset = self.chunk_offsets[chunk_index]
+        num_platforms, num_hazards, num_collectables = struct.unpack_from(CHUNK_COUNTS_FORMAT, self.data, offset)
+        offset += struct.calcsize(CHUNK_COUNTS_FORMAT)
+        rect_size = struct.calcsize(RECT_RECORD_FORMAT)
+        platforms = [struct.unpack_from(RECT_RECORD_FORMAT, self.data, offset + i * rect_size) for i in range(num_platforms)]
+        offset += num_platforms * rect_size
+        hazards = [struct.unpack_from(RECT_RECORD_FORMAT, self.data, offset + i * rect_size) for i in range(num_hazards)]
+        offset += num_hazards * rect_size
+        collectables = []
+        for x, y, type_code in struct.iter_unpack(COLLECTABLE_RECORD_FORMAT, self.data[offset:offset + num_collectables * struct.calcsize(COLLECTABLE_RECORD_FORMAT)]):
+            collectables.append((x, y, COLLECTABLE_TYPES[type_code]))
+        return platforms, hazards, collectables
+
+    def close(self):
+        self.data.close()
+
+
+def write_level_file(level, path, chunk_width=CHUNK_WIDTH):
+    # Writes a LEVEL_DATA-style dict to path in the level file format.
+    chunks, level_width, level_height = split_level_into_chunks(level, chunk_width)
+    payloads = []
+    for platforms, hazards, collectables in chunks:
+        payload = [struct.pack(CHUNK_COUNTS_FORMAT, len(platforms), len(hazards), len(collectables))]
+        payload += [struct.pack(RECT_RECORD_FORMAT, *rect) for rect in platforms + hazards]
+        payload += [struct.pack(COLLECTABLE_RECORD_FORMAT, x, y, COLLECTABLE_TYPES.index(c_type) if c_type in COLLECTABLE_TYPES else 2)
+                    for x, y, c_type in collectables]
+        payloads.append(b"".join(payload))
+
+    header = struct.pack(LEVEL_HEADER_FORMAT, LEVEL_FILE_MAGIC, LEVEL_FILE_VERSION, chunk_width, level_width, level_height,
+                         *level["player_start"], *level["exit_gate"], len(chunks))
+    offset = len(header) + len(chunks) * struct.calcsize(CHUNK_TABLE_ENTRY_FORMAT)
+    table = []
+    for payload in payloads:
+        table.append(struct.pack(CHUNK_TABLE_ENTRY_FORMAT, offset, len(payload)))
+        offset += len(payload)
+
+    with open(path, "wb") as level_file:
+        level_file.write(header)
+        level_file.write(b"".join(table))
+        level_file.write(b"".join(payloads))
+
+
 # --- Classes ---
 
+class Camera:
+    # Scrolling view onto the level, kept centered on the player and clamped to the level bounds.
+    def __init__(self, level_width, level_height):
+        self.rect = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.level_width = level_width
+        self.level_height = level_height
+
+    def follow(self, target_rect):
+        self.rect.center = target_rect.center
+        self.rect.left = max(0, min(self.rect.left, self.level_width - SCREEN_WIDTH))
+        self.rect.top = max(0, min(self.rect.top, self.level_height - SCREEN_HEIGHT))
+
+    def apply(self, rect):
+        # Converts a level-space rect into screen space.
+        return rect.move(-self.rect.x, -self.rect.y)
+
+
+class SpatialHash:
+    # Uniform grid over the level. Each cell lists the sprites whose rects overlap it,
+    # so a collision query only checks sprites near the queried rect instead of a whole group.
+    def __init__(self, cell_size=SPATIAL_HASH_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {} # (cell_x, cell_y) -> list of sprites
+        self.order = {} # sprite -> insertion counter, keeps query results in group order
+        self.next_order = 0
+
+    def cells_for(self, rect):
+        x0, y0 = rect.left // self.cell_size, rect.top // self.cell_size
+        x1, y1 = (rect.right - 1) // self.cell_size, (rect.bottom - 1) // self.cell_size
+        for cell_x in range(x0, x1 + 1):
+            for cell_y in range(y0, y1 + 1):
+                yield (cell_x, cell_y)
+
+    def add(self, sprite):
+        self.order[sprite] = self.next_order
+        self.next_order += 1
+        for cell in self.cells_for(sprite.rect):
+            self.cells.setdefault(cell, []).append(sprite)
+
+    def remove(self, sprite):
+        if sprite not in self.order:
+            return
+        for cell in self.cells_for(sprite.rect):
+            bucket = self.cells[cell]
+            bucket.remove(sprite)
+            if not bucket:
+                del self.cells[cell]
+        del self.order[sprite]
+
+    def clear(self):
+        self.cells = {}
+        self.order = {}
+        self.next_order = 0
+
+    def collide(self, rect):
+        # Returns the sprites colliding with rect, in the order they were added
+        # (the same order pygame.sprite.spritecollide would return them from a Group).
+        found = {}
+        for cell in self.cells_for(rect):
+            for sprite in self.cells.get(cell, ()):
+                if sprite.rect.colliderect(rect):
+                    found[sprite] = None
+        if len(found) <= 1:
+            return list(found)
+        return sorted(found, key=self.order.__getitem__)
+
+
+# --- Shared Surfaces ---
+# Static sprites never draw on their image, so every sprite of the same look shares one surface.
+_surface_cache = {}
+
+def get_filled_surface(width, height, color):
+    key = (width, height, color)
+    surface = _surface_cache.get(key)
+    if surface is None:
+        surface = pygame.Surface([width, height])
+        surface.fill(color)
+        _surface_cache[key] = surface
+    return surface
+
+def get_collectable_surface(c_type):
+    key = ('collectable', c_type)
+    surface = _surface_cache.get(key)
+    if surface is None:
+        if c_type == 'coin':
+            surface = pygame.Surface([20, 20], pygame.SRCALPHA)
+            pygame.draw.circle(surface, YELLOW, (10, 10), 10) # Placeholder coin
+        elif c_type == 'heart':
+            surface = pygame.Surface([20, 20], pygame.SRCALPHA)
+            pygame.draw.rect(surface, RED, (0,5,20,10))
+            pygame.draw.circle(surface, RED, (5,5), 5)
+            pygame.draw.circle(surface, RED, (15,5), 5)
+        else:
+            surface = pygame.Surface([20, 20])
+            surface.fill(ORANGE) # Generic powerup
+        _surface_cache[key] = surface
+    return surface
+
+
+class SpritePool:
+    # Sprites released by the level (dropped chunks, previous levels) are kept per class and
+    # reused through their reset() method instead of being constructed again.
+    def __init__(self):
+        self.free = {} # sprite class -> list of released sprites
+
+    def acquire(self, sprite_class, *args):
+        free = self.free.get(sprite_class)
+        if free:
+            sprite = free.pop()
+            sprite.reset(*args)
+            return sprite
+        return sprite_class(*args)
+
+    def release(self, sprite):
+        sprite.kill()
+        self.free.setdefault(type(sprite), []).append(sprite)
+
+
+# Input for one physics step. left and right are held directions; jump and dash are
+# presses that happened since the previous step. The physics never reads pygame input itself.
+PlayerInput = namedtuple('PlayerInput', ['left', 'right', 'jump', 'dash'])
+NO_INPUT = PlayerInput(False, False, False, False)
+
+
 class Player(pygame.sprite.Sprite):
     def __init__(self, x, y):
         super().__init__()
         self.image = pygame.Surface([PLAYER_WIDTH, PLAYER_HEIGHT])
         self.image.fill(BLUE) # Placeholder player sprite
         self.rect = self.image.get_rect(topleft=(x, y))
+        self.game_manager = None # Reference to GameManager, set after creation
+        self.reset(x, y)
 
+    def reset(self, x, y):
+        # Puts the player back in its starting state at (x, y), reusing this sprite and its surface.
+        self.rect.topleft = (x, y)
         self.start_pos = (x, y) # For respawn
+        self.prev_pos = (x, y) # Position before the last physics step, for render interpolation
 
         self.velocity_x = 0
         self.velocity_y = 0
@@ -141,19 +426,22 @@ class Player(pygame.sprite.Sprite):
         self.dash_timer = 0
 
         self.invulnerable_timer = 0
-        self.game_manager = None # Reference to GameManager, set after creation
 
-    def update(self, platforms, hazards, collectables, exit_gate):
+    def step(self, controls, platforms, hazards, collectables, exit_gate):
+        # Advances the player by one fixed physics step. The result depends only on the current
+        # state, controls (a PlayerInput) and the level, so identical inputs replay identically.
+        # platforms, hazards and collectables are SpatialHash instances built by GameManager.load_level
+        self.prev_pos = self.rect.topleft
+
+        if controls.jump:
+            self.jump()
+        if controls.dash:
+            self.dash()
+        self.handle_input(controls)
+
         # Update invulnerability
         if self.invulnerable_timer > 0:
             self.invulnerable_timer -= 1
-            # Simple visual feedback for invulnerability (flash)
-            if self.invulnerable_timer % 10 < 5:
-                self.image.fill(WHITE)
-            else:
-                self.image.fill(BLUE)
-        else:
-            self.image.fill(BLUE) # Ensure correct color when not invulnerable
 
         # Apply gravity
         self.velocity_y += self.gravity
@@ -168,12 +456,11 @@ class Player(pygame.sprite.Sprite):
             else:
                 self.is_dashing = False
                 self.velocity_x = 0 # Stop dashing, revert to no horizontal movement
-                # Revert to normal movement based on current input keys
-                keys = pygame.key.get_pressed()
-                if keys[pygame.K_LEFT] or keys[pygame.K_a]:
+                # Revert to normal movement based on the held direction
+                if controls.left:
                     self.velocity_x = -self.speed
                     self.facing_right = False # Update facing direction
-                elif keys[pygame.K_RIGHT] or keys[pygame.K_d]:
+                elif controls.right:
                     self.velocity_x = self.speed
                     self.facing_right = True # Update facing direction
 
@@ -183,7 +470,7 @@ class Player(pygame.sprite.Sprite):
 
         # Horizontal collision detection
         self.wall_sliding = False # Reset wall sliding status
-        for platform in pygame.sprite.spritecollide(self, platforms, False):
+        for platform in platforms.collide(self.rect):
             if self.velocity_x > 0: # Moving right, hit left side of platform
                 self.rect.right = platform.rect.left
                 if self.velocity_y > 0 and not self.on_ground: # Sliding down a wall
@@ -202,7 +489,7 @@ class Player(pygame.sprite.Sprite):
         # Vertical collision detection
         was_on_ground = self.on_ground
         self.on_ground = False
-        for platform in pygame.sprite.spritecollide(self, platforms, False):
+        for platform in platforms.collide(self.rect):
             if self.velocity_y > 0: # Falling, hit top of platform
                 self.rect.bottom = platform.rect.top
                 self.velocity_y = 0
@@ -224,11 +511,12 @@ class Player(pygame.sprite.Sprite):
 
         # Hazard collision
         if self.invulnerable_timer == 0:
-            for hazard in pygame.sprite.spritecollide(self, hazards, False):
+            for hazard in hazards.collide(self.rect):
                 hazard.on_hit(self)
 
         # Collectable collision
-        for collectable in pygame.sprite.spritecollide(self, collectables, True): # Kill collectable on collision
+        for collectable in collectables.collide(self.rect):
+            collectables.remove(collectable) # Incremental update; on_collect kills the sprite
             collectable.on_collect(self)
 
         # Exit Gate collision
@@ -240,12 +528,12 @@ class Player(pygame.sprite.Sprite):
             self.game_manager.game_state = 'GAME_OVER'
 
 
-    def handle_input(self, keys_pressed):
+    def handle_input(self, controls):
         if not self.is_dashing: # Cannot change horizontal movement during dash
-            if keys_pressed[pygame.K_LEFT] or keys_pressed[pygame.K_a]:
+            if controls.left:
                 self.velocity_x = -self.speed
                 self.facing_right = False
-            elif keys_pressed[pygame.K_RIGHT] or keys_pressed[pygame.K_d]:
+            elif controls.right:
                 self.velocity_x = self.speed
                 self.facing_right = True
             else:
@@ -286,6 +574,21 @@ class Player(pygame.sprite.Sprite):
             self.jumps_left = 1 # Reset to 1 for single jump
             self.dashes_left = MAX_DASHES
 
+    def update_image(self):
+        # Simple visual feedback for invulnerability (flash); done at render time, not in step()
+        if self.invulnerable_timer > 0 and self.invulnerable_timer % 10 < 5:
+            self.image.fill(WHITE)
+        else:
+            self.image.fill(BLUE)
+
+    def get_render_rect(self, alpha):
+        # Position between the previous and the current physics step; alpha is the fraction
+        # of a step that has elapsed since the last one.
+        prev_x, prev_y = self.prev_pos
+        x = round(prev_x + (self.rect.x - prev_x) * alpha)
+        y = round(prev_y + (self.rect.y - prev_y) * alpha)
+        return self.rect.move(x - self.rect.x, y - self.rect.y)
+
     def draw(self, screen):
         screen.blit(self.image, self.rect)
 
@@ -293,8 +596,11 @@ class Player(pygame.sprite.Sprite):
 class Platform(pygame.sprite.Sprite):
     def __init__(self, x, y, width, height):
         super().__init__()
-        self.image = pygame.Surface([width, height])
-        self.image.fill(GREY) # Placeholder platform sprite
+        self.reset(x, y, width, height)
+
+    def reset(self, x, y, width, height):
+        # Also used to reuse a pooled platform; the surface is shared by same-sized platforms
+        self.image = get_filled_surface(width, height, GREY) # Placeholder platform sprite
         self.rect = self.image.get_rect(topleft=(x, y))
 
     def draw(self, screen):
@@ -304,23 +610,13 @@ class Platform(pygame.sprite.Sprite):
 class Collectable(pygame.sprite.Sprite):
     def __init__(self, x, y, c_type):
         super().__init__()
-        self.type = c_type
-        self.value = 0
-        if self.type == 'coin':
-            self.image = pygame.Surface([20, 20], pygame.SRCALPHA)
-            pygame.draw.circle(self.image, YELLOW, (10, 10), 10) # Placeholder coin
-            self.value = 10
-        elif self.type == 'heart': # Example for future expansion
-            self.image = pygame.Surface([20, 20], pygame.SRCALPHA)
-            pygame.draw.rect(self.image, RED, (0,5,20,10))
-            pygame.draw.circle(self.image, RED, (5,5), 5)
-            pygame.draw.circle(self.image, RED, (15,5), 5)
-            self.value = 0 # Hearts restore health, not score
-        else:
-            self.image = pygame.Surface([20, 20])
-            self.image.fill(ORANGE) # Generic powerup
-            self.value = 0
+        self.reset(x, y, c_type)
 
+    def reset(self, x, y, c_type):
+        # Also used to reuse a pooled collectable; the surface is shared by collectables of a type
+        self.type = c_type
+        self.value = 10 if self.type == 'coin' else 0 # Hearts restore health and powerups apply effects, not score
+        self.image = get_collectable_surface(c_type)
         self.rect = self.image.get_rect(center=(x, y))
 
     def on_collect(self, player):
@@ -335,8 +631,11 @@ class Collectable(pygame.sprite.Sprite):
 class Hazard(pygame.sprite.Sprite):
     def __init__(self, x, y, width, height):
         super().__init__()
-        self.image = pygame.Surface([width, height])
-        self.image.fill(RED) # Placeholder hazard sprite (e.g., spikes/lava)
+        self.reset(x, y, width, height)
+
+    def reset(self, x, y, width, height):
+        # Also used to reuse a pooled hazard; the surface is shared by same-sized hazards
+        self.image = get_filled_surface(width, height, RED) # Placeholder hazard sprite (e.g., spikes/lava)
         self.rect = self.image.get_rect(topleft=(x, y))
         self.damage_amount = 1
 
@@ -350,10 +649,13 @@ class Hazard(pygame.sprite.Sprite):
 class ExitGate(pygame.sprite.Sprite):
     def __init__(self, x, y, width, height):
         super().__init__()
-        self.image = pygame.Surface([width, height])
-        self.image.fill(GREEN) # Placeholder exit gate sprite
-        self.rect = self.image.get_rect(topleft=(x, y))
         self.game_manager = None # Will be set by GameManager
+        self.reset(x, y, width, height)
+
+    def reset(self, x, y, width, height):
+        # Also used to reuse a pooled exit gate; the surface is shared by same-sized gates
+        self.image = get_filled_surface(width, height, GREEN) # Placeholder exit gate sprite
+        self.rect = self.image.get_rect(topleft=(x, y))
 
     def on_trigger(self):
         if self.game_manager:
@@ -364,7 +666,12 @@ class ExitGate(pygame.sprite.Sprite):
 
 
 class GameManager:
-    def __init__(self):
+    def __init__(self, levels=None, headless=False, profiler=None):
+        # headless runs on SDL's dummy video driver, for automated level testing with run_headless()
+        # profiler is a profiler.FrameProfiler; by default it is configured from the environment
+        self.profiler = get_profiler("aaa", profiler)
+        if headless:
+            os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
         pygame.init()
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Parkour Peril")
@@ -374,77 +681,233 @@ class GameManager:
         self.running = True
         self.game_state = 'PLAYING' # 'PLAYING', 'GAME_OVER', 'LEVEL_COMPLETE', 'GAME_WIN'
 
+        # Fixed-timestep state
+        self.accumulator_ms = 0.0 # Frame time not yet consumed by physics steps
+        self.jump_pressed = False # Presses seen by handle_events since the last physics step
+        self.dash_pressed = False
+
+        # Level sources (InlineLevel or LevelFile); defaults to the built-in LEVEL_DATA
+        self.levels = levels if levels else [InlineLevel(level) for level in LEVEL_DATA]
         self.current_level_index = 0
+        self.level = None # Level source of the current level
+        self.camera = None
         self.player = None
         self.exit_gate = None # Reference to the current exit gate
 
+        # Chunk streaming state for the current level
+        self.active_chunks = {} # chunk index -> (platform sprites, hazard sprites, collectable sprites)
+        self.collected = set() # (chunk index, collectable index) already picked up this attempt
+
+        # Cached drawing layers
+        self.chunk_layers = {} # chunk index -> pre-rendered background, platforms and hazards
+        self.hud_key = None # (health, score, level) the HUD surface was rendered for
+        self.hud_surface = None
+        self.overlay_key = None # State (and shown values) the overlay text was rendered for
+        self.overlay_lines = [] # Rendered (text surface, rect) pairs of the current overlay
+        self.overlay_dim = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+        self.overlay_dim.fill((0, 0, 0, 150)) # Semi-transparent black, shared by all overlays
+
         # Sprite groups
         self.all_sprites = pygame.sprite.Group()
+        self.dynamic_sprites = pygame.sprite.Group() # Drawn every frame: player, collectables, exit gate
         self.platforms = pygame.sprite.Group()
         self.hazards = pygame.sprite.Group()
         self.collectables = pygame.sprite.Group()
 
+        # Spatial hashes used by the player's collision passes
+        self.platform_hash = SpatialHash()
+        self.hazard_hash = SpatialHash()
+        self.collectable_hash = SpatialHash()
+
+        # Released sprites, reused when chunks are activated or levels loaded
+        self.sprite_pool = SpritePool()
+
         self.load_level(self.current_level_index)
 
     def reset_current_level(self):
-        # Reload the current level, resetting player state and objects specific to that level.
-        # load_level already resets player health and score.
-        self.load_level(self.current_level_index)
+        # Restart the current level. The level that is already loaded is restored in place;
+        # anything else (e.g. after the last level) goes through load_level.
+        if self.current_level_index < len(self.levels) and self.levels[self.current_level_index] is self.level:
+            self.restore_level()
+        else:
+            self.load_level(self.current_level_index)
+
+    def restore_level(self):
+        # Puts the loaded level back into its starting state without rebuilding it: collectables
+        # picked up in active chunks go back into play, the player is reset in place and the
+        # chunks around the start are streamed back in from the sprite pool. No surfaces are
+        # created: chunk layers, sprite images and the player's surface are all reused.
+        for chunk_index, (_, _, collectables) in self.active_chunks.items():
+            for collectable in collectables:
+                if not collectable.alive():
+                    self.add_collectable(collectable)
+            # Picked up before the chunk was last deactivated, so it was reactivated without them
+            c_list = self.level.load_chunk(chunk_index)[2]
+            for item_index, c_data in enumerate(c_list):
+                if (chunk_index, item_index) in self.collected:
+                    collectables.append(self.spawn_collectable(chunk_index, item_index, c_data))
+        self.collected = set() # Inactive chunks rebuild all their collectables when reactivated
+
+        self.player.reset(*self.level.player_start)
+        self.camera.follow(self.player.rect)
+        self.update_active_chunks()
+
+        self.accumulator_ms = 0.0
+        self.jump_pressed = False
+        self.dash_pressed = False
+        self.game_state = 'PLAYING'
 
     def next_level(self):
         self.current_level_index += 1
-        if self.current_level_index < len(LEVEL_DATA):
+        if self.current_level_index < len(self.levels):
             self.load_level(self.current_level_index)
             self.game_state = 'LEVEL_COMPLETE' # Transition to level complete screen
         else:
             self.game_state = 'GAME_WIN'
 
     def load_level(self, level_index):
-        # Clear existing sprites
+        # Static chunk layers can be reused when the same level is restarted
+        if level_index >= len(self.levels) or self.levels[level_index] is not self.level:
+            self.chunk_layers = {}
+
+        # Return the previous level's sprites to the pool, then clear what is left
+        for chunk_index in list(self.active_chunks):
+            self.release_chunk_sprites(chunk_index)
+        if self.exit_gate is not None:
+            self.sprite_pool.release(self.exit_gate)
+            self.exit_gate = None
         self.all_sprites.empty()
+        self.dynamic_sprites.empty()
         self.platforms.empty()
         self.hazards.empty()
         self.collectables.empty()
-
-        if level_index >= len(LEVEL_DATA):
+        self.platform_hash.clear()
+        self.hazard_hash.clear()
+        self.collectable_hash.clear()
+        self.active_chunks = {}
+        self.collected = set()
+        self.accumulator_ms = 0.0
+        self.jump_pressed = False
+        self.dash_pressed = False
+
+        if level_index >= len(self.levels):
             self.game_state = 'GAME_WIN'
             return
 
-        level = LEVEL_DATA[level_index]
+        self.level = self.levels[level_index]
+        self.camera = Camera(self.level.width, self.level.height)
 
-        # Player
-        player_x, player_y = level["player_start"]
-        self.player = Player(player_x, player_y)
-        self.player.game_manager = self # Give player reference to game manager
-        self.player.health = INITIAL_HEALTH # Reset health on new level
-        self.player.score = 0 # Reset score for the level
+        # Player (one instance for the whole game; reset() restores health and score)
+        player_x, player_y = self.level.player_start
+        if self.player is not None:
+            self.player.reset(player_x, player_y)
+        else:
+            self.player = Player(player_x, player_y)
+            self.player.game_manager = self # Give player reference to game manager
         self.all_sprites.add(self.player)
+        self.dynamic_sprites.add(self.player)
+
+        # Exit Gate (always active, independent of chunks)
+        eg_data = self.level.exit_gate
+        self.exit_gate = self.sprite_pool.acquire(ExitGate, *eg_data)
+        self.exit_gate.game_manager = self # Give exit gate reference to game manager
+        self.all_sprites.add(self.exit_gate)
+        self.dynamic_sprites.add(self.exit_gate)
+
+        # Platforms, hazards and collectables are created per chunk around the camera
+        self.camera.follow(self.player.rect)
+        self.update_active_chunks()
+        for chunk_index in list(self.chunk_layers): # Layers kept from a previous attempt
+            if chunk_index not in self.active_chunks:
+                del self.chunk_layers[chunk_index]
+
+        self.game_state = 'PLAYING' # Ensure game state is playing after loading
+
+    def update_active_chunks(self):
+        # Activates chunks that came within range of the camera and drops the ones that left it.
+        chunk_width = self.level.chunk_width
+        first = max(0, (self.camera.rect.left - CHUNK_ACTIVATION_MARGIN) // chunk_width)
+        last = min(self.level.num_chunks - 1, (self.camera.rect.right + CHUNK_ACTIVATION_MARGIN) // chunk_width)
+
+        for chunk_index in list(self.active_chunks):
+            if not first <= chunk_index <= last:
+                self.deactivate_chunk(chunk_index)
+        for chunk_index in range(first, last + 1):
+            if chunk_index not in self.active_chunks:
+                self.activate_chunk(chunk_index)
+
+    def activate_chunk(self, chunk_index):
+        p_list, h_list, c_list = self.level.load_chunk(chunk_index)
 
         # Platforms
-        for p_data in level["platforms"]:
-            platform = Platform(*p_data)
+        platforms = []
+        for p_data in p_list:
+            platform = self.sprite_pool.acquire(Platform, *p_data)
             self.all_sprites.add(platform)
             self.platforms.add(platform)
+            self.platform_hash.add(platform)
+            platforms.append(platform)
 
         # Hazards
-        for h_data in level["hazards"]:
-            hazard = Hazard(*h_data)
+        hazards = []
+        for h_data in h_list:
+            hazard = self.sprite_pool.acquire(Hazard, *h_data)
             self.all_sprites.add(hazard)
             self.hazards.add(hazard)
-
-        # Collectables
-        for c_data in level["collectables"]:
-            collectable = Collectable(c_data[0], c_data[1], c_data[2])
-            self.all_sprites.add(collectable)
-            self.collectables.add(collectable)
-
-        # Exit Gate
-        eg_data = level["exit_gate"]
-        self.exit_gate = ExitGate(*eg_data)
-        self.exit_gate.game_manager = self # Give exit gate reference to game manager
-        self.all_sprites.add(self.exit_gate)
-
-        self.game_state = 'PLAYING' # Ensure game state is playing after loading
+            self.hazard_hash.add(hazard)
+            hazards.append(hazard)
+
+        # Collectables (skipping those already collected on this attempt)
+        collectables = []
+        for item_index, c_data in enumerate(c_list):
+            if (chunk_index, item_index) in self.collected:
+                continue
+            collectables.append(self.spawn_collectable(chunk_index, item_index, c_data))
+
+        self.active_chunks[chunk_index] = (platforms, hazards, collectables)
+        if chunk_index not in self.chunk_layers:
+            self.chunk_layers[chunk_index] = self.build_chunk_layer(chunk_index, platforms + hazards)
+
+    def spawn_collectable(self, chunk_index, item_index, c_data):
+        collectable = self.sprite_pool.acquire(Collectable, c_data[0], c_data[1], c_data[2])
+        collectable.chunk_key = (chunk_index, item_index)
+        self.add_collectable(collectable)
+        return collectable
+
+    def add_collectable(self, collectable):
+        self.all_sprites.add(collectable)
+        self.dynamic_sprites.add(collectable)
+        self.collectables.add(collectable)
+        self.collectable_hash.add(collectable)
+
+    def build_chunk_layer(self, chunk_index, static_sprites):
+        # Bakes the background and the chunk's platforms and hazards into one opaque surface,
+        # drawn with a single blit per chunk instead of one blit per static sprite.
+        chunk_x = chunk_index * self.level.chunk_width
+        layer = pygame.Surface((self.level.chunk_width, self.level.height))
+        layer.fill(LIGHT_BLUE)
+        for sprite in static_sprites:
+            layer.blit(sprite.image, sprite.rect.move(-chunk_x, 0))
+        return layer
+
+    def deactivate_chunk(self, chunk_index):
+        self.chunk_layers.pop(chunk_index, None)
+        self.release_chunk_sprites(chunk_index)
+
+    def release_chunk_sprites(self, chunk_index):
+        # Removes the chunk's sprites from play and hands them to the sprite pool.
+        platforms, hazards, collectables = self.active_chunks.pop(chunk_index)
+        for platform in platforms:
+            self.platform_hash.remove(platform)
+            self.sprite_pool.release(platform)
+        for hazard in hazards:
+            self.hazard_hash.remove(hazard)
+            self.sprite_pool.release(hazard)
+        for collectable in collectables:
+            if not collectable.alive(): # Picked up while the chunk was active
+                self.collected.add(collectable.chunk_key)
+            self.collectable_hash.remove(collectable)
+            self.sprite_pool.release(collectable)
 
     def handle_events(self):
         for event in pygame.event.get():
@@ -459,33 +922,86 @@ class GameManager:
                     elif self.game_state == 'LEVEL_COMPLETE':
                         # Already called load_level in next_level(), just need to set state
                         self.game_state = 'PLAYING'
-                if self.game_state == 'PLAYING':
+                if self.game_state == 'PLAYING': # Applied by the next physics step
                     if event.key == pygame.K_SPACE or event.key == pygame.K_w:
-                        self.player.jump()
+                        self.jump_pressed = True
                     if event.key == pygame.K_LSHIFT or event.key == pygame.K_j:
-                        self.player.dash()
-
-    def update(self):
-        if self.game_state == 'PLAYING':
-            keys_pressed = pygame.key.get_pressed()
-            self.player.handle_input(keys_pressed)
-            self.player.update(self.platforms, self.hazards, self.collectables, self.exit_gate)
+                        self.dash_pressed = True
+
+    def read_input(self):
+        # Builds the PlayerInput for the next physics step from the keyboard and the pending presses.
+        # The presses stay pending until a physics step has consumed them (see update).
+        keys_pressed = pygame.key.get_pressed()
+        return PlayerInput(
+            left=bool(keys_pressed[pygame.K_LEFT] or keys_pressed[pygame.K_a]),
+            right=bool(keys_pressed[pygame.K_RIGHT] or keys_pressed[pygame.K_d]),
+            jump=self.jump_pressed,
+            dash=self.dash_pressed,
+        )
+
+    def update(self, dt_ms=PHYSICS_STEP_MS):
+        # Runs as many fixed physics steps as dt_ms (the frame time) covers; the remainder
+        # carries over to the next frame and is used to interpolate the rendered player.
+        if self.game_state != 'PLAYING':
+            self.accumulator_ms = 0.0
+            return
+        self.accumulator_ms += dt_ms
+        controls = self.read_input()
+        steps = 0
+        while self.accumulator_ms >= PHYSICS_STEP_MS and self.game_state == 'PLAYING':
+            if steps == MAX_PHYSICS_STEPS_PER_FRAME:
+                self.accumulator_ms = 0.0 # Drop the backlog after a long stall
+                break
+            self.step(controls)
+            controls = controls._replace(jump=False, dash=False) # Presses apply to one step only
+            self.accumulator_ms -= PHYSICS_STEP_MS
+            steps += 1
+        if steps:
+            # A frame shorter than a step runs none, and its presses wait for the next one
+            self.jump_pressed = False
+            self.dash_pressed = False
+
+    def step(self, controls):
+        # One fixed physics step of the current level.
+        self.player.step(controls, self.platform_hash, self.hazard_hash, self.collectable_hash, self.exit_gate)
+        if self.game_state == 'PLAYING': # The exit gate may have loaded the next level
+            self.camera.follow(self.player.rect)
+            self.update_active_chunks()
+
+    def run_headless(self, inputs):
+        # Steps the physics once per PlayerInput in inputs, with no events, frame cap or drawing,
+        # until the inputs run out or the level stops playing (death, exit reached).
+        # Returns the number of steps taken.
+        steps = 0
+        for controls in inputs:
+            if self.game_state != 'PLAYING':
+                break
+            self.step(controls)
+            steps += 1
+        return steps
 
     def draw(self):
-        self.screen.fill(LIGHT_BLUE)
-
-        # Draw all sprites if game is playing or level complete (to show final state)
+        # The player is drawn between its last two physics positions, and the camera follows
+        # that interpolated position so scrolling stays smooth at any render frame rate.
+        alpha = self.accumulator_ms / PHYSICS_STEP_MS if self.game_state == 'PLAYING' else 1.0
+        player_rect = self.player.get_render_rect(alpha)
+        self.player.update_image()
+        self.camera.follow(player_rect)
+
+        # The baked chunk layers (background, platforms, hazards) cover the whole view,
+        # so no screen fill is needed. They and the sprites are offset by the camera.
+        for chunk_index, layer in self.chunk_layers.items():
+            self.screen.blit(layer, (chunk_index * self.level.chunk_width - self.camera.rect.x, -self.camera.rect.y))
+
+        # Draw dynamic sprites if game is playing or level complete (to show final state)
         if self.game_state in ['PLAYING', 'LEVEL_COMPLETE', 'GAME_OVER', 'GAME_WIN']:
-            self.all_sprites.draw(self.screen)
+            for sprite in self.dynamic_sprites:
+                rect = player_rect if sprite is self.player else sprite.rect
+                self.screen.blit(sprite.image, self.camera.apply(rect))
 
         # Draw UI
         if self.player: # Ensure player exists before trying to draw UI
-            health_text = self.font.render(f"Health: {self.player.health}", True, BLACK)
-            score_text = self.font.render(f"Score: {self.player.score}", True, BLACK)
-            level_text = self.font.render(f"Level: {self.current_level_index + 1}/{len(LEVEL_DATA)}", True, BLACK)
-            self.screen.blit(health_text, (10, 10))
-            self.screen.blit(score_text, (10, 40))
-            self.screen.blit(level_text, (10, 70))
+            self.screen.blit(self.get_hud_surface(), (10, 10))
 
 
         if self.game_state == 'GAME_OVER':
@@ -495,72 +1011,79 @@ class GameManager:
         elif self.game_state == 'GAME_WIN':
             self.show_game_win_screen()
 
-
+        self.profiler.draw_overlay(self.screen)
         pygame.display.flip()
 
-    def show_game_over_screen(self):
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 150)) # Semi-transparent black
-        self.screen.blit(overlay, (0, 0))
-
-        game_over_text = self.font.render("GAME OVER", True, RED)
-        restart_text = self.font.render("Press 'R' to Restart Level", True, WHITE)
-        quit_text = self.font.render("Press 'Esc' to Quit", True, WHITE)
-
-        go_rect = game_over_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 50))
-        restart_rect = restart_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 20))
-        quit_rect = quit_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 60))
+    def get_hud_surface(self):
+        # The HUD is re-rendered only when health, score or level changes.
+        key = (self.player.health, self.player.score, self.current_level_index)
+        if key != self.hud_key:
+            health_text = self.font.render(f"Health: {self.player.health}", True, BLACK)
+            score_text = self.font.render(f"Score: {self.player.score}", True, BLACK)
+            level_text = self.font.render(f"Level: {self.current_level_index + 1}/{len(self.levels)}", True, BLACK)
+            width = max(health_text.get_width(), score_text.get_width(), level_text.get_width())
+            self.hud_surface = pygame.Surface((width, 60 + level_text.get_height()), pygame.SRCALPHA)
+            self.hud_surface.blit(health_text, (0, 0))
+            self.hud_surface.blit(score_text, (0, 30))
+            self.hud_surface.blit(level_text, (0, 60))
+            self.hud_key = key
+        return self.hud_surface
+
+    def show_overlay(self, key, lines):
+        # Overlay text is rendered once per state change (key holds the state and any values
+        # shown); each frame only blits the shared dim surface and the cached text.
+        # lines holds (text, color, y offset from the screen center) tuples.
+        if key != self.overlay_key:
+            self.overlay_lines = []
+            for text, color, y_offset in lines:
+                text_surface = self.font.render(text, True, color)
+                text_rect = text_surface.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + y_offset))
+                self.overlay_lines.append((text_surface, text_rect))
+            self.overlay_key = key
+        self.screen.blit(self.overlay_dim, (0, 0))
+        for text_surface, text_rect in self.overlay_lines:
+            self.screen.blit(text_surface, text_rect)
 
-        self.screen.blit(game_over_text, go_rect)
-        self.screen.blit(restart_text, restart_rect)
-        self.screen.blit(quit_text, quit_rect)
+    def show_game_over_screen(self):
+        self.show_overlay(('GAME_OVER',), [
+            ("GAME OVER", RED, -50),
+            ("Press 'R' to Restart Level", WHITE, 20),
+            ("Press 'Esc' to Quit", WHITE, 60),
+        ])
 
     def show_level_complete_screen(self):
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 150)) # Semi-transparent black
-        self.screen.blit(overlay, (0, 0))
-
-        level_complete_text = self.font.render("LEVEL COMPLETE!", True, GREEN)
-        next_level_text = self.font.render("Press 'R' to Continue", True, WHITE)
-        quit_text = self.font.render("Press 'Esc' to Quit", True, WHITE)
-
-        lc_rect = level_complete_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 50))
-        next_rect = next_level_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 20))
-        quit_rect = quit_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 60))
-
-        self.screen.blit(level_complete_text, lc_rect)
-        self.screen.blit(next_level_text, next_rect) # Corrected blit
-        self.screen.blit(quit_text, quit_rect)
+        self.show_overlay(('LEVEL_COMPLETE',), [
+            ("LEVEL COMPLETE!", GREEN, -50),
+            ("Press 'R' to Continue", WHITE, 20),
+            ("Press 'Esc' to Quit", WHITE, 60),
+        ])
 
     def show_game_win_screen(self):
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 150)) # Semi-transparent black
-        self.screen.blit(overlay, (0, 0))
-
-        game_win_text = self.font.render("YOU WIN! CONGRATULATIONS!", True, YELLOW)
         # Note: Current score is only for the last level. For total, scores would need to be accumulated.
-        final_score_text = self.font.render(f"Final Level Score: {self.player.score}", True, WHITE)
-        quit_text = self.font.render("Press 'Esc' to Quit", True, WHITE)
-
-        gw_rect = game_win_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 50))
-        fs_rect = final_score_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 20))
-        quit_rect = quit_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 60))
-
-        self.screen.blit(game_win_text, gw_rect)
-        self.screen.blit(fs_rect, fs_rect)
-        self.screen.blit(quit_text, quit_rect)
+        self.show_overlay(('GAME_WIN', self.player.score), [
+            ("YOU WIN! CONGRATULATIONS!", YELLOW, -50),
+            (f"Final Level Score: {self.player.score}", WHITE, 20),
+            ("Press 'Esc' to Quit", WHITE, 60),
+        ])
 
 
     def run_game_loop(self):
         while self.running:
+            self.profiler.begin_frame()
+            dt = self.clock.tick(FPS)
+            self.profiler.mark("tick")
             self.handle_events()
-            self.update()
+            self.profiler.mark("events")
+            self.update(dt)
+            self.profiler.mark("update")
             self.draw()
-            self.clock.tick(FPS)
+            self.profiler.mark("draw")
 
+        self.profiler.close()
         pygame.quit()
         sys.exit()
 
 if __name__ == '__main__':
-    game = GameManager()
+    # Optional arguments: level files to play instead of the built-in LEVEL_DATA
+    game = GameManager([LevelFile(path) for path in sys.argv[1:]])
     game.run_game_loop()
\ No newline at end of file
@@ -0,0 +1,476 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+import pygame
+
+from game_builder_crew import aaa, maze, snake, word
+from game_builder_crew.profiler import FrameProfiler
+from game_builder_crew.replay import TraceSession
+
+# --- Benchmark Settings ---
+# Every scenario drives a game's real main loop headlessly (dummy SDL driver) through a
+# scripted input session: each frame lasts FRAME_DT_MS of virtual time and nothing sleeps.
+# Timings are the best of TIMING_REPEATS runs (per statistic, like timeit) to keep scheduler
+# noise out of them; memory is measured in a separate run under tracemalloc, so the tracing
+# overhead never shows up in the timings.
+DEFAULT_FRAMES = 600
+TIMING_REPEATS = 3
+FRAME_DT_MS = 16
+TIMING_CAPACITY = 100000 # Ring buffer size; large enough to keep every frame of a run
+KEYS_PER_FRAME = 10 # Keystrokes per frame in the word_typing scenario
+
+# Scales per scenario: maze/snake grid size (cells), word count (words on screen), aaa level width (px)
+SCALES = {
+    "maze": [(21, 13), (41, 25), (81, 51)],
+    "snake": [(30, 24), (60, 48), (120, 96)],
+    "word": [10, 50, 200],
+    "word_stress": [1000, 5000],
+    "word_typing": [100, 500, 2000],
+    "aaa": [800, 6400, 51200],
+}
+
+# Metrics checked against a baseline, and how much each may grow before the run fails.
+# Timing metrics also get an absolute slack so sub-microsecond noise can't fail a run.
+# A thresholds file (--thresholds) overrides these:
+#   {"default_tolerance": 0.25,
+#    "tolerances": {"draw_ms.p99": 1.0},
+#    "limits": {"aaa/level_width=51200": {"update_ms.p99": 1.0}}}
+# "limits" are absolute maximums, checked with or without a baseline.
+GATED_METRICS = ["update_ms.p50", "update_ms.p99", "draw_ms.p50", "draw_ms.p99",
+                 "events_ms.p50", "events_ms.p99", "alloc_kb_per_frame", "peak_memory_kb"]
+DEFAULT_TOLERANCE = 0.25
+DEFAULT_TOLERANCES = {"update_ms.p99": 0.5, "draw_ms.p99": 0.5, "events_ms.p99": 0.5} # Tail latencies are noisier
+ABSOLUTE_SLACK = {"update_ms.p50": 0.02, "update_ms.p99": 0.1, "draw_ms.p50": 0.02, "draw_ms.p99": 0.1,
+                  "events_ms.p50": 0.02, "events_ms.p99": 0.1, "alloc_kb_per_frame": 1.0, "peak_memory_kb": 64.0}
+
+
+class ScriptedSession(TraceSession):
+    """
+    Runs a game's main loop like replay.TraceReplayer, but with events produced by a script
+    instead of read from a trace. script(frame, game, session) returns the events of a frame;
+    after frames frames the game receives QUIT until its loop exits.
+    """
+    def __init__(self, game_name, factory, script, frames, profiler, seed=0):
+        super().__init__(game_name, seed)
+        self.factory = factory
+        self.script = script
+        self.total_frames = frames
+        self.profiler = profiler
+        self.delivered = False
+
+    def build_game(self):
+        return self.factory(self.profiler)
+
+    def get_events(self, *args, **kwargs):
+        pygame.event.pump() # Keep the (dummy) SDL event queue drained
+        if self.frames >= self.total_frames:
+            return [pygame.event.Event(pygame.QUIT)]
+        if self.delivered:
+            return []
+        self.delivered = True
+        events = self.script(self.frames, self.game, self) if self.game is not None else []
+        self.track_keys(events)
+        return events
+
+    def end_frame(self, framerate):
+        self.virtual_ms += FRAME_DT_MS
+        self.frames += 1
+        self.delivered = False
+        return FRAME_DT_MS
+
+
+class AllocationProfiler(FrameProfiler):
+    """
+    FrameProfiler that also records, per frame, the bytes the frame allocated on top of what
+    was live when it started (tracemalloc peak growth) and the net change in allocated blocks.
+    Must run with tracemalloc started.
+    """
+    def __init__(self, game_name):
+        super().__init__(game_name, capacity=TIMING_CAPACITY)
+        self.alloc_bytes = []
+        self.net_blocks = []
+        self.frame_start_bytes = None
+        self.frame_start_blocks = 0
+
+    def finish_allocation_frame(self):
+        if self.frame_start_bytes is not None:
+            _, peak = tracemalloc.get_traced_memory()
+            self.alloc_bytes.append(max(0, peak - self.frame_start_bytes))
+            self.net_blocks.append(sys.getallocatedblocks() - self.frame_start_blocks)
+
+    def begin_frame(self):
+        self.finish_allocation_frame()
+        tracemalloc.reset_peak()
+        self.frame_start_bytes = tracemalloc.get_traced_memory()[0]
+        self.frame_start_blocks = sys.getallocatedblocks()
+        super().begin_frame()
+
+    def close(self):
+        self.finish_allocation_frame()
+        self.frame_start_bytes = None
+        super().close()
+
+
+@contextmanager
+def patched(module, **values):
+    # Temporarily overrides module-level constants (the games read their sizes from them).
+    saved = {name: getattr(module, name) for name in values}
+    for name, value in values.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(module, name, value)
+
+
+def key_event(key, unicode=""):
+    return pygame.event.Event(pygame.KEYDOWN, key=key, unicode=unicode, mod=0)
+
+
+# --- Scenarios ---
+# Each scenario is (context manager setting the scale up, game factory, input script).
+
+def generate_maze_grid(width, height, rng):
+    # Perfect maze by randomized depth-first search; width and height are odd.
+    grid = [[1] * width for _ in range(height)]
+    stack = [(1, 1)]
+    grid[1][1] = 0
+    while stack:
+        x, y = stack[-1]
+        neighbours = [(x + dx, y + dy, dx, dy) for dx, dy in ((2, 0), (-2, 0), (0, 2), (0, -2))
+                      if 0 < x + dx < width - 1 and 0 < y + dy < height - 1 and grid[y + dy][x + dx] == 1]
+        if not neighbours:
+            stack.pop()
+            continue
+        nx, ny, dx, dy = rng.choice(neighbours)
+        grid[y + dy // 2][x + dx // 2] = 0
+        grid[ny][nx] = 0
+        stack.append((nx, ny))
+    return grid
+
+
+def maze_scenario(scale, seed):
+    width, height = scale
+    rng = random.Random(seed)
+    grid = generate_maze_grid(width, height, rng)
+    cell_size = max(4, min(maze.CELL_SIZE, 1280 // width))
+    settings = patched(maze, MAZE_GRID_DATA=grid, PLAYER_START_POS=(1, 1),
+                       MONSTER_START_POS=(width - 2, height - 2), MAZE_EXIT_POS=(width - 2, 1))
+    arrows = [pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT]
+
+    def factory(profiler):
+        return maze.GameManager(width * cell_size, height * cell_size, cell_size, profiler=profiler)
+
+    def script(frame, game, session):
+        if game.game_state == "MENU":
+            return [key_event(pygame.K_SPACE)]
+        if game.game_state in ("WIN", "GAME_OVER"):
+            return [key_event(pygame.K_r)]
+        return [key_event(rng.choice(arrows))]
+
+    return settings, factory, script
+
+
+def snake_scenario(scale, seed):
+    width, height = scale
+    grid_size = max(4, min(snake.GRID_SIZE, 1200 // width))
+    settings = patched(snake, GRID_WIDTH=width, GRID_HEIGHT=height, GRID_SIZE=grid_size,
+                       SCREEN_WIDTH=width * grid_size, SCREEN_HEIGHT=height * grid_size)
+
+    def factory(profiler):
+        return snake.Game(profiler=profiler)
+
+    def script(frame, game, session):
+        if game.game_state != snake.PLAYING:
+            return [key_event(pygame.K_SPACE)]
+        # Greedy steering towards the food, so the snake grows as the run goes on
+        head_x, head_y = game.snake.get_head_position()
+        food_x, food_y = game.food.position
+        if food_x != head_x:
+            key = pygame.K_RIGHT if food_x > head_x else pygame.K_LEFT
+        else:
+            key = pygame.K_DOWN if food_y > head_y else pygame.K_UP
+        return [key_event(key)]
+
+    return settings, factory, script
+
+
+def word_scenario(scale, seed, **constants):
+    word_count = scale
+    settings = patched(word, INITIAL_LIVES=10 ** 9, **constants) # Words reaching the bottom never end the run
+
+    def factory(profiler):
+        game = word.Game(profiler=profiler)
+        game.game_state = word.GAME_STATE_PLAYING
+        game.reset_game()
+        return game
+
+    def script(frame, game, session):
+        # Keeps word_count words on screen (these spawns count towards the events phase)
+        # and types the next letter of the oldest word.
+        while len(game.active_words) < word_count:
+            game.spawn_word()
+        target = next(iter(game.active_words))
+        char = target.original_text[target.current_typed_index]
+        return [key_event(pygame.K_a, char)]
+
+    return settings, factory, script
+
+
+def word_stress_scenario(scale, seed):
+    # Stress mode: thousands of words on screen at once, falling fast enough (about a second
+    # and a half from top to bottom) that every frame spawns and drops words. update_ms stays
+    # flat across scales only if a frame costs in proportion to the words that reach the bottom,
+    # not to the words falling.
+    return word_scenario(scale, seed, INITIAL_WORD_SPEED=0.4, MAX_WORD_SPEED=0.5)
+
+
+def word_typing_scenario(scale, seed):
+    # Keystroke handling under load: word_count nearly static words (none reach the bottom and
+    # the game spawns none itself) and KEYS_PER_FRAME keystrokes a frame. A keystroke only
+    # looks at the words expecting its letter, so events_ms should not grow with word_count.
+    word_count = scale
+    settings = patched(word, INITIAL_LIVES=10 ** 9, INITIAL_WORD_SPEED=0.001, MAX_WORD_SPEED=0.002,
+                       INITIAL_SPAWN_INTERVAL_MS=10 ** 9)
+
+    def factory(profiler):
+        game = word.Game(profiler=profiler)
+        game.game_state = word.GAME_STATE_PLAYING
+        game.reset_game()
+        while len(game.active_words) < word_count:
+            game.spawn_word()
+        return game
+
+    def script(frame, game, session):
+        # Replaces completed words, then types the next letter of each of the oldest words.
+        while len(game.active_words) < word_count:
+            game.spawn_word()
+        targets = itertools.islice(game.active_words, KEYS_PER_FRAME)
+        return [key_event(pygame.K_a, target.original_text[target.current_typed_index]) for target in targets]
+
+    return settings, factory, script
+
+
+def generate_platformer_level(width, rng):
+    # Ground with gaps, staggered platforms, hazards and coins, exit gate at the far end.
+    platforms, hazards, collectables = [], [], []
+    x = 0
+    while x < width:
+        segment = rng.randrange(300, 700)
+        platforms.append((x, 550, min(segment, width - x), 50))
+        x += segment + rng.choice([0, 0, 60])
+    for x in range(200, width - 200, 150):
+        y = rng.randrange(250, 460)
+        platforms.append((x, y, rng.randrange(60, 140), 20))
+        collectables.append((x + 20, y - 20, rng.choice(["coin", "coin", "heart"])))
+        if rng.random() < 0.3:
+            hazards.append((x + rng.randrange(0, 200), 530, 40, 20))
+    return {
+        "player_start": (50, 500),
+        "platforms": platforms,
+        "hazards": hazards,
+        "collectables": collectables,
+        "exit_gate": (width - 100, 500, 50, 50),
+    }
+
+
+def aaa_scenario(scale, seed):
+    level = generate_platformer_level(scale, random.Random(seed))
+    settings = nullcontext() # Nothing to patch: the level itself carries the scale
+
+    def factory(profiler):
+        return aaa.GameManager([aaa.InlineLevel(level)], headless=True, profiler=profiler)
+
+    def script(frame, game, session):
+        if game.game_state in ("GAME_OVER", "LEVEL_COMPLETE"):
+            return [key_event(pygame.K_r)]
+        events = [] if pygame.K_RIGHT in session.pressed else [key_event(pygame.K_RIGHT)]
+        if frame % 40 == 0:
+            events.append(key_event(pygame.K_SPACE))
+        if frame % 120 == 60:
+            events.append(key_event(pygame.K_LSHIFT))
+        return events
+
+    return settings, factory, script
+
+
+# Scenario name -> (game it runs, name of its scale, scenario function)
+SCENARIOS = {
+    "maze": ("maze", "grid", maze_scenario),
+    "snake": ("snake", "grid", snake_scenario),
+    "word": ("word", "words", word_scenario),
+    "word_stress": ("word", "words", word_stress_scenario),
+    "word_typing": ("word", "words", word_typing_scenario),
+    "aaa": ("aaa", "level_width", aaa_scenario),
+}
+
+
+def scenario_key(scenario_name, scale):
+    scale_name = SCENARIOS[scenario_name][1]
+    scale_text = "x".join(map(str, scale)) if isinstance(scale, tuple) else str(scale)
+    return f"{scenario_name}/{scale_name}={scale_text}"
+
+
+def run_session(scenario_name, scale, frames, seed, profiler):
+    game_name, _, scenario = SCENARIOS[scenario_name]
+    settings, factory, script = scenario(scale, seed)
+    with settings:
+        session = ScriptedSession(game_name, factory, script, frames, profiler, seed)
+        session.run()
+    return session
+
+
+def run_scenario(scenario_name, scale, frames=DEFAULT_FRAMES, seed=0, repeats=TIMING_REPEATS):
+    """
+    Runs one scenario at one scale for frames frames and returns its result dict:
+    per-frame update/draw/events times (ms), allocations per frame and peak Python memory.
+    """
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+    summary = None
+    elapsed = None
+    for _ in range(repeats):
+        timing = FrameProfiler(scenario_name, capacity=TIMING_CAPACITY)
+        start = time.perf_counter()
+        run_session(scenario_name, scale, frames, seed, timing)
+        run_elapsed = time.perf_counter() - start
+        run_summary = timing.summary()
+        if summary is None:
+            summary, elapsed = run_summary, run_elapsed
+            continue
+        elapsed = min(elapsed, run_elapsed)
+        for phase, stats in run_summary.items():
+            summary[phase] = {name: min(value, summary[phase][name]) for name, value in stats.items()}
+
+    memory = AllocationProfiler(scenario_name)
+    tracemalloc.start()
+    try:
+        run_session(scenario_name, scale, frames, seed, memory)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    def rounded(stats):
+        return {name: round(value, 4) for name, value in stats.items()}
+
+    return {
+        "key": scenario_key(scenario_name, scale),
+        "game": SCENARIOS[scenario_name][0],
+        "scenario": scenario_name,
+        "scale": list(scale) if isinstance(scale, tuple) else scale,
+        "frames": timing.frames,
+        "frames_per_s": round(timing.frames / elapsed, 1),
+        "update_ms": rounded(summary["update"]),
+        "draw_ms": rounded(summary["draw"]),
+        "events_ms": rounded(summary["events"]),
+        "work_ms": rounded(summary["work"]),
+        "alloc_kb_per_frame": round(sum(memory.alloc_bytes) / max(1, len(memory.alloc_bytes)) / 1024, 3),
+        "net_blocks_per_frame": round(sum(memory.net_blocks) / max(1, len(memory.net_blocks)), 3),
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def run_benchmarks(games=None, frames=DEFAULT_FRAMES, seed=0, scales=None, repeats=TIMING_REPEATS):
+    """
+    Runs every scale of every selected scenario (games names the scenarios) and returns the
+    results document. scales optionally maps a scenario name to the scales to run instead of
+    SCALES.
+    """
+    results = []
+    for scenario_name in games or list(SCENARIOS):
+        for scale in (scales or {}).get(scenario_name, SCALES[scenario_name]):
+            result = run_scenario(scenario_name, scale, frames, seed, repeats)
+            results.append(result)
+            print(f"{result['key']:<28} update p50 {result['update_ms']['p50']:.3f} p99 {result['update_ms']['p99']:.3f} ms  "
+                  f"draw p50 {result['draw_ms']['p50']:.3f} p99 {result['draw_ms']['p99']:.3f} ms  "
+                  f"events p50 {result['events_ms']['p50']:.3f} ms  "
+                  f"alloc {result['alloc_kb_per_frame']:.1f} KB/frame  peak {result['peak_memory_kb']:.0f} KB")
+    return {
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "platform": platform.platform(),
+        "frames": frames,
+        "repeats": repeats,
+        "seed": seed,
+        "results": results,
+    }
+
+
+def metric_value(result, metric):
+    value = result
+    for part in metric.split("."):
+        value = value[part]
+    return value
+
+
+def check_regressions(document, baseline=None, thresholds=None):
+    """
+    Compares a results document against a baseline document and/or absolute limits.
+    Returns a list of human-readable failures (empty when everything is within bounds).
+    """
+    thresholds = thresholds or {}
+    default_tolerance = thresholds.get("default_tolerance", DEFAULT_TOLERANCE)
+    tolerances = dict(DEFAULT_TOLERANCES, **thresholds.get("tolerances", {}))
+    limits = thresholds.get("limits", {})
+    baseline_results = {result["key"]: result for result in (baseline or {}).get("results", [])}
+
+    failures = []
+    for result in document["results"]:
+        for metric, limit in limits.get(result["key"], {}).items():
+            value = metric_value(result, metric)
+            if value > limit:
+                failures.append(f"{result['key']} {metric} = {value} exceeds the limit of {limit}")
+
+        previous = baseline_results.get(result["key"])
+        if previous is None:
+            continue
+        for metric in GATED_METRICS:
+            value = metric_value(result, metric)
+            allowed = metric_value(previous, metric) * (1 + tolerances.get(metric, default_tolerance)) + ABSOLUTE_SLACK[metric]
+            if value > allowed:
+                failures.append(f"{result['key']} {metric} = {value} regressed (baseline {metric_value(previous, metric)}, allowed {allowed:.4f})")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless benchmarks of the bundled games.")
+    parser.add_argument("--games", nargs="+", choices=sorted(SCENARIOS), help="Scenarios to run (default: all)")
+    parser.add_argument("--frames", type=int, default=DEFAULT_FRAMES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=TIMING_REPEATS, help="Timing runs per scenario (best is kept)")
+    parser.add_argument("--output", help="Write the results JSON here")
+    parser.add_argument("--baseline", help="Results JSON of an earlier run to compare against")
+    parser.add_argument("--thresholds", help="JSON file with tolerances and absolute limits")
+    args = parser.parse_args()
+
+    document = run_benchmarks(args.games, args.frames, args.seed, repeats=args.repeats)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(document, output_file, indent=2)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+    thresholds = None
+    if args.thresholds:
+        with open(args.thresholds) as thresholds_file:
+            thresholds = json.load(thresholds_file)
+
+    failures = check_regressions(document, baseline, thresholds)
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,41 +1,86 @@
 import os
 from typing import List
-from crewai import Agent, Crew, Process, Task, LLM
+from crewai import Agent, Crew, Process, Task
+from crewai.llms.base_llm import BaseLLM
 from crewai.project import CrewBase, agent, crew, task
 
+from game_builder_crew.llm_router import DEFAULT_FALLBACK_MODEL, ENV_FALLBACK_MODEL, backend_name, build_router
+from game_builder_crew.log_sink import log_task_output, step_logger, verbose_console
+from game_builder_crew.perf_gate import review_guardrail
+from game_builder_crew.prompt_cache import build_context_cache
+
+# CHANGED BACK TO 'gemini-flash-latest' which is safer
+PRIMARY_MODEL = 'gemini/gemini-2.5-flash'
+
+
+class RoutedLLM(BaseLLM):
+    """
+    The LLM an agent uses: sends every call through the shared LLMRouter, starting on the
+    agent's own key. stage names the agent in the router's latency stats.
+    """
+    def __init__(self, router, stage, model=PRIMARY_MODEL, temperature=0.7):
+        super().__init__(model=model, temperature=temperature)
+        self.router = router
+        self.stage = stage
+        self.primary = backend_name(model, stage)
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, from_task=None, from_agent=None,
+             response_model=None, **kwargs):
+        # crewai passes response_model (and, in newer versions, more keywords); all go to the backend
+        return self.router.call(
+            messages,
+            stage=self.stage,
+            primary=self.primary,
+            tools=tools,
+            callbacks=callbacks,
+            available_functions=available_functions,
+            from_task=from_task,
+            from_agent=from_agent,
+            response_model=response_model,
+            **kwargs,
+        )
+
+    def supports_function_calling(self):
+        return True
+
+    def get_context_window_size(self):
+        return 1048576 # Gemini 2.5 Flash
+
+
+def build_default_router():
+    """
+    The router built from the environment: the agents' keys for the primary model, then for
+    the fallback model, with the static prompt prefixes cached by the provider.
+    """
+    api_keys = {
+        'designer': os.environ.get('GOOGLE_API_KEY_DESIGNER'),
+        'senior': os.environ.get('GOOGLE_API_KEY_SENIOR'),
+        'qa': os.environ.get('GOOGLE_API_KEY_QA'),
+        'chief': os.environ.get('GOOGLE_API_KEY_CHIEF'),
+    }
+    models = [PRIMARY_MODEL, os.environ.get(ENV_FALLBACK_MODEL, DEFAULT_FALLBACK_MODEL)]
+    # Static prompt prefixes (agent system prompts, task instructions) are cached by the provider.
+    tasks_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config/tasks.yaml')
+    return build_router(models, api_keys, temperature=0.7, cache=build_context_cache(tasks_path))
+
+
 @CrewBase
 class GameBuilderCrew:
     """GameBuilder crew"""
     agents_config = 'config/agents.yaml'
     tasks_config = 'config/tasks.yaml'
 
-    def __init__(self):
-        # --- 1. DEFINE A SEPARATE LLM FOR EACH AGENT ---
-        
-        # CHANGED BACK TO 'gemini-flash-latest' which is safer
-        self.llm_designer = LLM(
-            model='gemini/gemini-2.5-flash', 
-            temperature=0.7,
-            api_key=os.environ.get('GOOGLE_API_KEY_DESIGNER')
-        )
+    def __init__(self, router=None):
+        # --- 1. ONE ROUTER, A SEPARATE PRIMARY KEY FOR EACH AGENT ---
+        # Every agent starts its calls on its own key; slow or failing calls are hedged or
+        # failed over to the other keys and then the fallback model (see llm_router.py).
+        # Crews running concurrently (training.py) pass one router so they share its rate limits.
+        self.router = router or build_default_router()
 
-        self.llm_senior = LLM(
-            model='gemini/gemini-2.5-flash',
-            temperature=0.7,
-            api_key=os.environ.get('GOOGLE_API_KEY_SENIOR')
-        )
-
-        self.llm_qa = LLM(
-            model='gemini/gemini-2.5-flash',
-            temperature=0.7,
-            api_key=os.environ.get('GOOGLE_API_KEY_QA')
-        )
-
-        self.llm_chief = LLM(
-            model='gemini/gemini-2.5-flash',
-            temperature=0.7,
-            api_key=os.environ.get('GOOGLE_API_KEY_CHIEF')
-        )
+        self.llm_designer = RoutedLLM(self.router, 'designer')
+        self.llm_senior = RoutedLLM(self.router, 'senior')
+        self.llm_qa = RoutedLLM(self.router, 'qa')
+        self.llm_chief = RoutedLLM(self.router, 'chief')
 
     # --- 2. ASSIGN THE SPECIFIC LLM TO THE AGENT ---
 
@@ -43,8 +88,9 @@ class GameBuilderCrew:
     def game_designer_agent(self) -> Agent:
         return Agent(
             config=self.agents_config['game_designer_agent'],
-            verbose=True,
-            llm=self.llm_designer  # <--- Uses Key 1
+            verbose=verbose_console(),
+            step_callback=step_logger('designer'),
+            llm=self.llm_designer  # <--- Starts on Key 1
         )
 
     @agent
@@ -52,8 +98,9 @@ class GameBuilderCrew:
         return Agent(
             config=self.agents_config['senior_engineer_agent'],
             allow_delegation=False,
-            verbose=True,
-            llm=self.llm_senior    # <--- Uses Key 2
+            verbose=verbose_console(),
+            step_callback=step_logger('senior'),
+            llm=self.llm_senior    # <--- Starts on Key 2
         )
     
     @agent
@@ -61,8 +108,9 @@ class GameBuilderCrew:
         return Agent(
             config=self.agents_config['qa_engineer_agent'],
             allow_delegation=False,
-            verbose=True,
-            llm=self.llm_qa        # <--- Uses Key 3
+            verbose=verbose_console(),
+            step_callback=step_logger('qa'),
+            llm=self.llm_qa        # <--- Starts on Key 3
         )
     
     @agent
@@ -70,8 +118,9 @@ class GameBuilderCrew:
         return Agent(
             config=self.agents_config['chief_qa_engineer_agent'],
             allow_delegation=True,
-            verbose=True,
-            llm=self.llm_chief     # <--- Uses Key 4
+            verbose=verbose_console(),
+            step_callback=step_logger('chief'),
+            llm=self.llm_chief     # <--- Starts on Key 4
         )
 
     # --- TASKS (No changes needed here) ---
@@ -88,7 +137,8 @@ class GameBuilderCrew:
         return Task(
             config=self.tasks_config['code_task'],
             agent=self.senior_engineer_agent(),
-            context=[self.design_task()] # Explicitly pass the design
+            context=[self.design_task()], # Explicitly pass the design
+            guardrail=review_guardrail # Appends the performance and memory gate reports for review_task
         )
 
     @task
@@ -115,6 +165,38 @@ class GameBuilderCrew:
             agents=self.agents,  
             tasks=self.tasks, 
             process=Process.sequential,
-            verbose=True,
+            verbose=verbose_console(), # Progress goes to the structured log (log_sink.py) instead
+            task_callback=log_task_output,
             max_rpm=60 # You can increase this now!
-        )
\ No newline at end of file
+        )
+
+    # --- INCREMENTAL CREWS (see incremental.py) ---
+    # Plain methods, not @task/@crew, so these tasks stay out of the main crew.
+
+    def delta_crew(self) -> Crew:
+        """Designer only: turns the changes to the idea into a design delta."""
+        return Crew(
+            agents=[self.game_designer_agent()],
+            tasks=[Task(config=self.tasks_config['design_delta_task'], agent=self.game_designer_agent())],
+            process=Process.sequential,
+            verbose=verbose_console(),
+            task_callback=log_task_output,
+            max_rpm=60
+        )
+
+    def patch_crew(self) -> Crew:
+        """Engineer writes the changed definitions, QA reviews only those."""
+        patch_task = Task(config=self.tasks_config['patch_task'], agent=self.senior_engineer_agent())
+        review_task = Task(
+            config=self.tasks_config['patch_review_task'],
+            agent=self.qa_engineer_agent(),
+            context=[patch_task]
+        )
+        return Crew(
+            agents=[self.senior_engineer_agent(), self.qa_engineer_agent()],
+            tasks=[patch_task, review_task],
+            process=Process.sequential,
+            verbose=verbose_console(),
+            task_callback=log_task_output,
+            max_rpm=60
+        )
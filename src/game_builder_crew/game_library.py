@@ -0,0 +1,309 @@
+import ast
+import json
+import math
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+import numpy as np
+
+# --- Library ---
+# A local store of working games and the designs they were built from. code_task gets the
+# classes of the closest games as reference material, so the engineer adapts a known-good base
+# instead of writing the whole game from scratch. The games bundled with this package are
+# always part of the library; every game the crew generates (and that compiles) is added to it.
+ENV_LIBRARY_DIR = "GAME_LIBRARY_DIR"
+ENV_TOKEN_BUDGET = "GAME_REFERENCE_TOKENS"
+DEFAULT_LIBRARY_DIR = "generated_games"
+DEFAULT_TOKEN_BUDGET = 3000 # Tokens of reference code added to code_task
+CHARS_PER_TOKEN = 4 # Rough estimate, good enough for budgeting
+MAX_GAMES = 3 # Reference code is taken from at most this many games
+MIN_SIMILARITY = 0.05 # Games less similar than this are never used
+INDEX_FILE = "index.json"
+
+NO_REFERENCES = "No reference implementations are available for this design; write the game from scratch."
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+_library_lock = threading.Lock() # Web requests add games concurrently
+
+# Bundled games and a short design summary of each
+BUNDLED_GAMES = {
+    "snake": (
+        "snake.py",
+        "Snake game on a grid. The player steers the snake with the arrow keys; it moves one cell per "
+        "tick at a fixed rate independent of the frame rate, grows by one segment when it eats food, "
+        "and the game is over when it leaves the grid or hits its own body. Food spawns on a random "
+        "free cell. Score, start screen and game over screen.",
+    ),
+    "maze": (
+        "maze.py",
+        "Maze game on a fixed tile grid. The player moves one cell per key press (arrow keys or WASD) "
+        "and cannot pass walls. A single monster steps toward the player every 30 frames along the "
+        "axis with the larger distance, trying the other axis when a wall blocks it. Reaching the "
+        "exit wins, being caught is game over. Elapsed time display, start, win and game over "
+        "screens with restart.",
+    ),
+    "word": (
+        "word.py",
+        "Typing game. Words fall from the top of the screen and the player types them to destroy them "
+        "before they reach the bottom; each word that reaches it costs a life. Word speed increases "
+        "over time and words spawn more often as the player completes them. Words come from a "
+        "built-in list or a dictionary file, longer ones as the speed rises. Score, lives, start menu "
+        "and game over screen with mouse buttons.",
+    ),
+    "aaa": (
+        "aaa.py",
+        "Platformer over three fixed levels. The player runs and jumps with gravity, wall jumps and "
+        "dashes between platforms, avoids spike hazards, collects coins for score and hearts for "
+        "health, and reaches the exit gate to load the next level. Scrolling camera, health, score "
+        "and level display, level complete, game over and win screens.",
+    ),
+}
+
+_WORD = re.compile(r"[A-Za-z][a-z]+|[A-Z]+(?![a-z])|\d+")
+STOP_WORDS = frozenset(
+    "the a an and or of to in on is are be it its for with as by at this that from if when each "
+    "can will not self def return none true false import class while else elif".split()
+)
+
+
+def tokenize(text):
+    """
+    Splits text into lowercase words, breaking identifiers on underscores and camelCase so that
+    "FallingWord" in code matches "falling words" in a design.
+    """
+    words = (word.lower() for word in _WORD.findall(text))
+    return [word.rstrip("s") if len(word) > 3 else word for word in words if word not in STOP_WORDS]
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def strip_code_fences(text):
+    # The engineer is asked for plain code but sometimes wraps it in a markdown fence.
+    match = re.search(r"```(?:python)?\n(.*?)```", text, re.S)
+    return match.group(1) if match else text
+
+
+class CodeChunk:
+    """
+    A top-level class or function of a library game, the unit reference code is cut into.
+    """
+    def __init__(self, name, source, line):
+        self.name = name
+        self.source = source
+        self.line = line
+        self.tokens = estimate_tokens(source)
+
+
+def split_chunks(code):
+    """
+    Returns the top-level classes and functions of a game as CodeChunks, plus the module
+    header (imports and constants before the first definition) as a chunk named "constants".
+    """
+    tree = ast.parse(code)
+    chunks = []
+    header = []
+    for node in tree.body:
+        source = ast.get_source_segment(code, node)
+        if isinstance(node, (ast.ClassDef, ast.FunctionDef)):
+            chunks.append(CodeChunk(node.name, source, node.lineno))
+        elif not chunks and isinstance(node, (ast.Assign, ast.AnnAssign)):
+            header.append(source)
+    if header:
+        chunks.insert(0, CodeChunk("constants", "\n".join(header), 1))
+    return chunks
+
+
+class LibraryGame:
+    def __init__(self, name, design, code, path, spec=None):
+        self.name = name
+        self.design = design # The user's idea the game was built from
+        self.code = code
+        self.path = path
+        self.spec = spec # The designer's technical design document, for generated games
+        self.chunks = split_chunks(code)
+
+
+class TfidfIndex:
+    """
+    Bag-of-words TF-IDF vectors with cosine similarity, built with numpy over a small corpus.
+    """
+    def __init__(self, documents):
+        counts = [Counter(tokenize(document)) for document in documents]
+        self.vocabulary = {word: index for index, word in enumerate(sorted(set().union(*counts)))}
+        frequencies = np.zeros(len(self.vocabulary))
+        for count in counts:
+            frequencies[[self.vocabulary[word] for word in count]] += 1
+        self.idf = np.log((1 + len(documents)) / (1 + frequencies)) + 1
+        self.vectors = np.array([self.vectorize_counts(count) for count in counts]).reshape(len(documents), -1)
+
+    def vectorize_counts(self, count):
+        vector = np.zeros(len(self.vocabulary))
+        for word, n in count.items():
+            if word in self.vocabulary:
+                vector[self.vocabulary[word]] = 1 + math.log(n)
+        vector *= self.idf
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def similarities(self, text):
+        return self.vectors @ self.vectorize_counts(Counter(tokenize(text)))
+
+
+def write_atomic(path, text):
+    # Readers see either the old or the new file, never a half-written one.
+    with open(f"{path}.tmp", "w", encoding="utf-8") as tmp_file:
+        tmp_file.write(text)
+    os.replace(f"{path}.tmp", path)
+
+
+class GameLibrary:
+    """
+    Stored games (bundled and generated) and retrieval of reference code for a new design.
+    Generated games live in library_dir as <name>.py plus an index.json of their designs and
+    the specs the designer wrote for them.
+    """
+    def __init__(self, library_dir=None, include_bundled=True):
+        self.library_dir = library_dir or os.environ.get(ENV_LIBRARY_DIR) or DEFAULT_LIBRARY_DIR
+        self.games = []
+        if include_bundled:
+            for name, (filename, design) in BUNDLED_GAMES.items():
+                self.load_game(name, design, os.path.join(PACKAGE_DIR, filename))
+        for name, entry in self.read_index().items():
+            if isinstance(entry, str): # Entries written before specs were stored
+                entry = {"design": entry}
+            self.load_game(name, entry["design"], os.path.join(self.library_dir, f"{name}.py"), entry.get("spec"))
+        self._index = None
+
+    def read_index(self):
+        path = os.path.join(self.library_dir, INDEX_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path, "r", encoding="utf-8") as index_file:
+            return json.load(index_file)
+
+    def load_game(self, name, design, path, spec=None):
+        # Games that are missing or don't parse are skipped; they can't be a known-good base.
+        try:
+            with open(path, "r", encoding="utf-8") as game_file:
+                self.games.append(LibraryGame(name, design, game_file.read(), path, spec))
+        except (OSError, SyntaxError):
+            pass
+
+    def add(self, design, code, name=None, spec=None):
+        """
+        Stores a generated game and the spec it was built from. Returns its name, or None if the
+        code doesn't compile. Safe to call from concurrent requests: names are unique and the
+        index is updated under a lock and replaced atomically.
+        """
+        code = strip_code_fences(code).strip() + "\n"
+        try:
+            compile(code, "<generated game>", "exec")
+        except SyntaxError:
+            return None
+        name = name or f"game_{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        path = os.path.join(self.library_dir, f"{name}.py")
+        with _library_lock:
+            os.makedirs(self.library_dir, exist_ok=True)
+            write_atomic(path, code)
+            index = self.read_index()
+            index[name] = {"design": design, "spec": spec}
+            write_atomic(os.path.join(self.library_dir, INDEX_FILE), json.dumps(index, indent=2))
+        self.games = [game for game in self.games if game.name != name]
+        self.load_game(name, design, path, spec)
+        self._index = None
+        return name
+
+    def closest_generated(self, design, min_similarity=0.0):
+        """
+        Returns (similarity, game) for the generated game (one with a stored spec) whose design
+        is closest to design, or (0.0, None) if there is none at least min_similarity.
+        """
+        for score, game in self.rank(design):
+            if game.spec is not None and score >= min_similarity:
+                return score, game
+        return 0.0, None
+
+    def rank(self, design):
+        """
+        Returns (similarity, game) pairs, most similar first. A game is matched on its design
+        and, at a lower weight, on the identifiers in its code.
+        """
+        if not self.games:
+            return []
+        if self._index is None:
+            self._index = (TfidfIndex([game.design for game in self.games]), TfidfIndex([game.code for game in self.games]))
+        design_index, code_index = self._index
+        scores = 0.7 * design_index.similarities(design) + 0.3 * code_index.similarities(design)
+        return sorted(zip(scores.tolist(), self.games), key=lambda pair: -pair[0])
+
+    def references(self, design, token_budget=None):
+        """
+        Returns reference code for code_task: the classes and functions of the closest games
+        that are most relevant to the design, packed greedily into token_budget tokens and
+        printed in source order under a header per game.
+        """
+        token_budget = token_budget or int(os.environ.get(ENV_TOKEN_BUDGET, DEFAULT_TOKEN_BUDGET))
+        ranked = [(score, game) for score, game in self.rank(design)[:MAX_GAMES] if score >= MIN_SIMILARITY]
+        if not ranked:
+            return NO_REFERENCES
+
+        # Chunks are scored by their game's similarity times their own, so the closest game's
+        # classes come first but a strongly matching class from a further game can still win.
+        candidates = []
+        for game_score, game in ranked:
+            chunk_scores = TfidfIndex([chunk.source for chunk in game.chunks]).similarities(design)
+            for chunk, chunk_score in zip(game.chunks, chunk_scores.tolist()):
+                candidates.append((game_score * (0.5 + chunk_score), game_score, game, chunk))
+        candidates.sort(key=lambda candidate: -candidate[0])
+
+        selected = {}
+        remaining = token_budget
+        for _, game_score, game, chunk in candidates:
+            # The first chunk of a game also pays for that game's header.
+            cost = chunk.tokens + (0 if game.name in selected else estimate_tokens(game.design) + 30)
+            if cost <= remaining:
+                selected.setdefault(game.name, (game_score, game, []))[2].append(chunk)
+                remaining -= cost
+        if not selected:
+            return NO_REFERENCES
+
+        sections = []
+        for game_score, game, chunks in sorted(selected.values(), key=lambda entry: -entry[0]):
+            names = ", ".join(chunk.name for chunk in sorted(chunks, key=lambda chunk: chunk.line))
+            body = "\n\n".join(chunk.source for chunk in sorted(chunks, key=lambda chunk: chunk.line))
+            sections.append(f"# --- Reference: {game.name} (similarity {game_score:.2f}; {names}) ---\n# Design: {game.design}\n{body}")
+        return "\n\n\n".join(sections)
+
+
+def build_inputs(game, library=None):
+    """
+    Returns the kickoff inputs for a game design: the design itself plus the reference code
+    retrieved for it.
+    """
+    library = library or GameLibrary()
+    return {"game": game, "reference_code": library.references(game)}
+
+
+# --- Command Line ---
+# Prints the library ranking and the reference code code_task would get for a design.
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python -m game_builder_crew.game_library <design text or file> [token budget]")
+        sys.exit(1)
+    design = sys.argv[1]
+    if os.path.exists(design):
+        with open(design, "r", encoding="utf-8") as design_file:
+            design = design_file.read()
+    budget = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    library = GameLibrary()
+    for score, game in library.rank(design):
+        print(f"{score:.3f}  {game.name}  ({len(game.chunks)} chunks)")
+    references = library.references(design, budget)
+    print(f"\n{references}\n\n[{estimate_tokens(references)} tokens]")
@@ -0,0 +1,291 @@
+import ast
+import builtins
+import difflib
+import re
+import symtable
+import sys
+import time
+
+from game_builder_crew.game_library import GameLibrary, TfidfIndex, estimate_tokens, split_chunks, strip_code_fences
+from game_builder_crew.log_sink import get_sink
+
+# --- Incremental Regeneration ---
+# When the user edits the idea of a game that was already generated ("add a second monster",
+# "make it faster"), only the difference goes through the crew:
+#   1. the new idea is diffed against the stored run's idea
+#   2. the designer writes a delta to the stored spec (delta_crew)
+#   3. the classes, functions and constants the changes touch are picked from the stored code,
+#      and the engineer rewrites only those, reviewed by QA (patch_crew)
+#   4. the rewritten definitions are spliced into the stored code by name, and only they are
+#      validated (syntax, plus every global name they use must exist); problems go back to
+#      the engineer for up to MAX_REPAIR_ROUNDS more rounds
+MIN_EDIT_SIMILARITY = 0.35 # Below this the new idea counts as a different game
+AFFECTED_TOKEN_BUDGET = 4000 # Tokens of existing code shown to the engineer
+MIN_CHUNK_SIMILARITY = 0.05
+MAX_REPAIR_ROUNDS = 1
+NO_PROBLEMS = "None."
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def describe_changes(old_idea, new_idea):
+    """
+    Returns the sentences added to and removed from the idea, as a short bullet list.
+    """
+    old_sentences = [sentence.strip() for sentence in _SENTENCE.split(old_idea) if sentence.strip()]
+    new_sentences = [sentence.strip() for sentence in _SENTENCE.split(new_idea) if sentence.strip()]
+    added, removed = [], []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, old_sentences, new_sentences, autojunk=False).get_opcodes():
+        if tag in ("delete", "replace"):
+            removed += old_sentences[i1:i2]
+        if tag in ("insert", "replace"):
+            added += new_sentences[j1:j2]
+    lines = [f"- Added: {sentence}" for sentence in added] + [f"- Removed: {sentence}" for sentence in removed]
+    return "\n".join(lines) or "- No changes to the idea."
+
+
+def definition_key(node):
+    """
+    Returns the name a top-level statement defines (class, function, constant, the main
+    guard), ("import", source) for imports, or None for anything else.
+    """
+    if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+        return node.name
+    if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+        return node.targets[0].id
+    if isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name):
+        return node.target.id
+    if isinstance(node, (ast.Import, ast.ImportFrom)):
+        return ("import", ast.dump(node))
+    if isinstance(node, ast.If) and "__main__" in ast.dump(node.test):
+        return "__main__"
+    return None
+
+
+def node_lines(node):
+    # First and last line (1-based, inclusive) of a statement, decorators included.
+    decorators = getattr(node, "decorator_list", [])
+    return min([node.lineno] + [decorator.lineno for decorator in decorators]), node.end_lineno
+
+
+def outline(code):
+    """
+    Returns a compact outline of a game: its imports, constants, and the signatures of its
+    classes (with their methods) and functions.
+    """
+    tree = ast.parse(code)
+    lines = []
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            lines.append(ast.get_source_segment(code, node))
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            source = ast.get_source_segment(code, node)
+            lines.append(source if len(source) <= 100 else source[:97] + "...")
+        elif isinstance(node, ast.ClassDef):
+            bases = ", ".join(ast.unparse(base) for base in node.bases)
+            lines.append(f"class {node.name}({bases}):" if bases else f"class {node.name}:")
+            for item in node.body:
+                if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    lines.append(f"    def {item.name}({ast.unparse(item.args)}): ...")
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            lines.append(f"def {node.name}({ast.unparse(node.args)}): ...")
+    return "\n".join(lines)
+
+
+def affected_code(code, query, token_budget=AFFECTED_TOKEN_BUDGET):
+    """
+    Returns the top-level definitions of code most relevant to query (the changes and the
+    design delta) that fit in token_budget, in source order. Definitions named in the query
+    come first, then the rest by TF-IDF similarity.
+    """
+    chunks = split_chunks(code)
+    if not chunks:
+        return ""
+    scores = TfidfIndex([chunk.source for chunk in chunks]).similarities(query).tolist()
+    named = {chunk.name for chunk in chunks if re.search(rf"\b{re.escape(chunk.name)}\b", query)}
+    ranked = sorted(zip(chunks, scores), key=lambda pair: (pair[0].name not in named, -pair[1]))
+    selected = []
+    remaining = token_budget
+    for chunk, score in ranked:
+        if (chunk.name in named or score >= MIN_CHUNK_SIMILARITY) and chunk.tokens <= remaining:
+            selected.append(chunk)
+            remaining -= chunk.tokens
+    return "\n\n".join(chunk.source for chunk in sorted(selected, key=lambda chunk: chunk.line))
+
+
+def apply_patch(code, patch):
+    """
+    Splices the top-level definitions in patch into code: each replaces the definition of the
+    same name, new ones are added (imports after the imports, constants after the constants,
+    classes and functions before the main guard). Returns (new code, changed names).
+    """
+    tree = ast.parse(code)
+    patch_tree = ast.parse(patch)
+    lines = code.splitlines()
+    existing = {}
+    for node in tree.body:
+        key = definition_key(node)
+        if key is not None:
+            existing[key] = node
+
+    replacements = [] # (first line, last line, new source), 1-based inclusive
+    additions = {"import": [], "constant": [], "definition": []}
+    changed = []
+    for node in patch_tree.body:
+        key = definition_key(node)
+        if key is None:
+            continue
+        start, end = node_lines(node)
+        source = "\n".join(patch.splitlines()[start - 1:end])
+        if key in existing:
+            if isinstance(key, tuple):
+                continue # The import is already there
+            first, last = node_lines(existing[key])
+            replacements.append((first, last, source))
+        elif isinstance(key, tuple):
+            additions["import"].append(source)
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            additions["constant"].append(source)
+        else:
+            additions["definition"].append(source)
+        if not isinstance(key, tuple):
+            changed.append(key)
+
+    # Insertion points, as "after this line" (0 = top of the file)
+    imports = [node_lines(node)[1] for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    constants = [node_lines(node)[1] for node in tree.body if isinstance(node, (ast.Assign, ast.AnnAssign))]
+    main_guard = existing.get("__main__")
+    insert_points = {
+        "import": max(imports, default=0),
+        "constant": max(constants, default=max(imports, default=0)),
+        "definition": node_lines(main_guard)[0] - 1 if main_guard else len(lines),
+    }
+
+    edits = [(first, last, source) for first, last, source in replacements]
+    for kind, sources in additions.items():
+        if sources:
+            separator = "\n" if kind != "definition" else "\n\n\n"
+            text = separator.join(sources)
+            edits.append((insert_points[kind] + 1, insert_points[kind], ("\n\n" if kind == "definition" else "") + text + ("\n\n" if kind == "definition" else "")))
+    # Apply from the bottom up so earlier line numbers stay valid
+    for first, last, source in sorted(edits, key=lambda edit: (edit[0], edit[1]), reverse=True):
+        lines[first - 1:last] = source.splitlines()
+    return "\n".join(lines) + "\n", changed
+
+
+def validate_definitions(code, names):
+    """
+    Returns a list of problems in the named top-level definitions of code: syntax errors, and
+    global names they use that the module never defines or imports.
+    """
+    try:
+        module = symtable.symtable(code, "<game>", "exec")
+    except SyntaxError as error:
+        return [f"SyntaxError: {error.msg} (line {error.lineno})"]
+    if "*" in code and re.search(r"^\s*from\s+\S+\s+import\s+\*", code, re.M):
+        return [] # Star imports make the defined names unknowable
+
+    defined = {symbol.get_name() for symbol in module.get_symbols() if symbol.is_assigned() or symbol.is_imported() or symbol.is_namespace()}
+    defined |= set(dir(builtins)) | {"__name__", "__file__"}
+    problems = []
+
+    def check(table, where):
+        for symbol in table.get_symbols():
+            if symbol.is_referenced() and symbol.is_global() and not symbol.is_assigned() and symbol.get_name() not in defined:
+                problems.append(f"{where}: name '{symbol.get_name()}' is not defined")
+        for child in table.get_children():
+            check(child, f"{where}.{child.get_name()}" if child.get_type() != "module" else where)
+
+    wanted = set(names)
+    for child in module.get_children():
+        if child.get_name() in wanted:
+            check(child, child.get_name())
+    # Changed constants: names used on their right-hand side
+    tree = ast.parse(code)
+    for node in tree.body:
+        if isinstance(node, (ast.Assign, ast.AnnAssign)) and definition_key(node) in wanted:
+            for name in ast.walk(node.value) if node.value else []:
+                if isinstance(name, ast.Name) and isinstance(name.ctx, ast.Load) and name.id not in defined:
+                    problems.append(f"{definition_key(node)}: name '{name.id}' is not defined")
+    return sorted(set(problems))
+
+
+class IncrementalResult:
+    def __init__(self, code, spec, changed, problems, base, seconds):
+        self.code = code
+        self.spec = spec
+        self.changed = changed # Names of the top-level definitions that were rewritten or added
+        self.problems = problems # Validation problems left after the repair rounds
+        self.base = base # The library game the edit was applied to
+        self.seconds = seconds
+
+    def __str__(self):
+        return self.code
+
+
+def regenerate(new_idea, library=None, base=None, game_crew=None):
+    """
+    Applies an edited idea to the closest generated game in the library (or base). Returns an
+    IncrementalResult, or None when there is no earlier run close enough to edit, in which
+    case the caller should run the full crew.
+    """
+    from game_builder_crew.crew import GameBuilderCrew # Imports crewai; not needed for the helpers above
+
+    start = time.perf_counter()
+    library = library or GameLibrary()
+    if base is None:
+        _, base = library.closest_generated(new_idea, MIN_EDIT_SIMILARITY)
+    if base is None:
+        return None
+    game_crew = game_crew or GameBuilderCrew()
+    sink = get_sink()
+    changes = describe_changes(base.design, new_idea)
+    sink.info("incremental_start", base=base.name, changes=changes)
+
+    delta = str(game_crew.delta_crew().kickoff(inputs={"previous_spec": base.spec, "prompt_changes": changes}))
+    inputs = {
+        "spec_delta": delta,
+        "code_outline": outline(base.code),
+        "affected_code": affected_code(base.code, f"{changes}\n{delta}"),
+        "validation_problems": NO_PROBLEMS,
+    }
+
+    code, changed, problems = base.code, [], []
+    for _ in range(MAX_REPAIR_ROUNDS + 1):
+        patch = strip_code_fences(str(game_crew.patch_crew().kickoff(inputs=inputs)))
+        try:
+            code, changed = apply_patch(base.code, patch)
+        except SyntaxError as error:
+            problems = [f"SyntaxError in the changed definitions: {error.msg} (line {error.lineno})"]
+        else:
+            problems = validate_definitions(code, changed)
+        if not problems:
+            break
+        sink.warning("incremental_problems", base=base.name, problems=problems)
+        inputs["validation_problems"] = "\n".join(f"- {problem}" for problem in problems)
+        inputs["affected_code"] = patch # Show the engineer its own attempt to fix
+
+    spec = f"{base.spec}\n\nChanges ({new_idea.strip()[:80]}):\n{delta}"
+    if not problems:
+        library.add(new_idea, code, spec=spec)
+    seconds = time.perf_counter() - start
+    sink.info("incremental_done", base=base.name, changed=changed, problems=problems, seconds=round(seconds, 2),
+              prompt_tokens=sum(estimate_tokens(value) for value in inputs.values()))
+    return IncrementalResult(code, spec, changed, problems, base, seconds)
+
+
+# --- Command Line ---
+# Applies an edited idea to the closest generated game in the library and prints the new code.
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python -m game_builder_crew.incremental <edited idea>")
+        sys.exit(1)
+    result = regenerate(sys.argv[1])
+    if result is None:
+        print("No earlier run is close enough to edit; run the full crew instead.")
+        sys.exit(1)
+    print(result.code)
+    print(f"# Edited {result.base.name}: changed {', '.join(result.changed) or 'nothing'} in {result.seconds:.1f}s")
+    if result.problems:
+        print("# Problems left:\n" + "\n".join(f"#   {problem}" for problem in result.problems))
+        sys.exit(1)
@@ -0,0 +1,233 @@
+import sys
+import time
+
+import numpy as np
+import pygame
+
+from game_builder_crew.aaa import (DASH_DURATION, DASH_SPEED, GRAVITY, LEVEL_DATA, MAX_DASHES, PLAYER_HEIGHT,
+                                   PLAYER_JUMP_POWER, PLAYER_SPEED, PLAYER_WIDTH, TERMINAL_VELOCITY,
+                                   WALL_JUMP_Y_VELOCITY, LevelFile)
+
+# --- Movement Model ---
+# Arcs are built from the same constants and per-step integration as aaa.Player.step, so a
+# profile entry t is exactly where rect.y ends up t physics steps after leaving the ground.
+# Horizontal motion is free in the air (handle_input runs every step), so an arc is a vertical
+# profile plus the widest horizontal reach after t steps, with or without a dash.
+# Note that a wall jump's WALL_JUMP_X_VELOCITY is replaced by handle_input in the same step,
+# so a wall jump only adds height: holding towards a wall and jumping on every slide climbs it.
+ARC_PADDING_STEPS = 30 # Extra steps past the level's lowest point, so every arc ends below it
+ARC_SOURCE_CHUNK = 64 # Sources per batch, bounding the (sources, steps, targets) arrays of an arc
+
+_profile_cache = {} # (initial velocity, length) -> array of rect.y offsets
+
+
+def vertical_profile(initial_velocity, length):
+    """
+    Returns the rect.y offset after each of length physics steps (entry 0 is the take-off
+    position) for a player leaving the ground with initial_velocity.
+    """
+    key = (initial_velocity, length)
+    if key not in _profile_cache:
+        rect = pygame.Rect(0, 0, PLAYER_WIDTH, PLAYER_HEIGHT) # Same rounding as the real rect
+        velocity = initial_velocity
+        offsets = [0]
+        for _ in range(length - 1):
+            velocity = min(velocity + GRAVITY, TERMINAL_VELOCITY)
+            rect.y += velocity
+            offsets.append(rect.y)
+        _profile_cache[key] = np.array(offsets, dtype=np.int64)
+    return _profile_cache[key]
+
+
+def horizontal_reach(length):
+    """
+    Returns how far the player can get sideways after each of length steps, using the one
+    dash available per jump (DASH_SPEED for DASH_DURATION steps) when the player has one.
+    """
+    steps = np.arange(length, dtype=np.int64)
+    reach = PLAYER_SPEED * steps
+    if MAX_DASHES > 0:
+        reach += (DASH_SPEED - PLAYER_SPEED) * np.minimum(steps, DASH_DURATION)
+    return reach
+
+
+# Wall climbing works when each wall jump gains height before the next slide begins.
+CAN_WALL_CLIMB = vertical_profile(WALL_JUMP_Y_VELOCITY, 2)[1] < 0
+
+
+class LevelReport:
+    """
+    Result of validating one level. Platforms and collectables are identified by their
+    LEVEL_DATA tuples; for level files, platforms that cross chunk boundaries appear once per chunk.
+    """
+    def __init__(self, name, platforms, reachable, unreachable_collectables, exit_reachable):
+        self.name = name
+        self.reachable_platforms = [platform for platform, ok in zip(platforms, reachable) if ok]
+        self.unreachable_platforms = [platform for platform, ok in zip(platforms, reachable) if not ok]
+        self.unreachable_collectables = unreachable_collectables
+        self.exit_reachable = exit_reachable
+
+    @property
+    def completable(self):
+        return self.exit_reachable
+
+    def __str__(self):
+        lines = [f"{self.name}: {'OK' if self.exit_reachable and not self.unreachable_collectables else 'PROBLEMS'}"]
+        if not self.exit_reachable:
+            lines.append("  exit gate is unreachable")
+        for x, y, c_type in self.unreachable_collectables:
+            lines.append(f"  unreachable {c_type} at ({x}, {y})")
+        if self.unreachable_platforms:
+            lines.append(f"  {len(self.unreachable_platforms)} unreachable platform(s): {self.unreachable_platforms}")
+        return "\n".join(lines)
+
+
+def read_level(level):
+    """
+    Returns (player_start, platforms, collectables, exit_gate) from a LEVEL_DATA-style dict or
+    a level source with load_chunk() (aaa.InlineLevel, aaa.LevelFile).
+    """
+    if isinstance(level, dict):
+        return tuple(level["player_start"]), list(level["platforms"]), list(level["collectables"]), tuple(level["exit_gate"])
+    platforms = []
+    collectables = []
+    for chunk_index in range(level.num_chunks):
+        chunk_platforms, _, chunk_collectables = level.load_chunk(chunk_index)
+        platforms += chunk_platforms
+        collectables += chunk_collectables
+    return level.player_start, platforms, collectables, level.exit_gate
+
+
+def _arc_hits(sources, profile, reach, targets, contact):
+    """
+    For every source (top, x_min, x_max of the player's rect) and target rect (x, y, w, h)
+    along one arc, returns the (sources, steps, targets) arrays:
+      overlap - the player's rows overlap the target's rows at that step
+      hit     - the player's reachable x range touches (contact=True) or overlaps the target
+      inside  - every reachable x overlaps the target (the player cannot be beside it)
+    """
+    top = sources[:, 0, None, None] + profile[None, :, None]
+    x_min = sources[:, 1, None, None] - reach[None, :, None]
+    x_max = sources[:, 2, None, None] + reach[None, :, None]
+    left, right = targets[:, 0], targets[:, 0] + targets[:, 2]
+    target_top, target_bottom = targets[:, 1], targets[:, 1] + targets[:, 3]
+
+    overlap = (top < target_bottom) & (top + PLAYER_HEIGHT > target_top)
+    if contact:
+        hit = (x_max >= left - PLAYER_WIDTH) & (x_min <= right)
+    else:
+        hit = (x_max > left - PLAYER_WIDTH) & (x_min < right)
+    inside = (x_min > left - PLAYER_WIDTH) & (x_max < right)
+    return overlap, hit, inside
+
+
+def _platform_edges(sources, profile, reach, platforms):
+    # Which platforms the player can stand on after following this arc from each source.
+    overlap, hit, inside = _arc_hits(sources, profile, reach, platforms, contact=True)
+    has_overlap = overlap.any(axis=1)
+    first = overlap.argmax(axis=1)[:, None, :] # First step the player's rows reach the platform
+    rising = np.concatenate(([False], profile[1:] < profile[:-1]))
+    first_rising = rising[first[:, 0, :]]
+
+    if CAN_WALL_CLIMB:
+        # Touching the platform at any height lets the player climb its side to the top, unless
+        # every path runs into its underside on the way up.
+        bonk = first_rising & np.take_along_axis(inside, first, axis=1)[:, 0, :]
+        return has_overlap & ~bonk & (overlap & hit).any(axis=1)
+    # Otherwise the player has to come down onto the top.
+    _, landing, _ = _arc_hits(sources, profile, reach, platforms, contact=False)
+    return has_overlap & ~first_rising & np.take_along_axis(landing, first, axis=1)[:, 0, :]
+
+
+def _item_hits(sources, profile, reach, items):
+    # Which items (collectables, exit gate) the player's rect can overlap along this arc.
+    overlap, hit, _ = _arc_hits(sources, profile, reach, items, contact=False)
+    return (overlap & hit).any(axis=1)
+
+
+def _in_chunks(arc_check, sources, profile, reach, targets):
+    # Runs arc_check (_platform_edges, _item_hits) on ARC_SOURCE_CHUNK sources at a time and
+    # stacks the (sources, targets) results, so memory grows with the targets, not the level.
+    if len(sources) <= ARC_SOURCE_CHUNK:
+        return arc_check(sources, profile, reach, targets)
+    return np.concatenate([arc_check(sources[start:start + ARC_SOURCE_CHUNK], profile, reach, targets)
+                           for start in range(0, len(sources), ARC_SOURCE_CHUNK)])
+
+
+def validate_level(level, name="level"):
+    """
+    Builds the reachability graph of a level and returns a LevelReport.
+
+    Nodes are the platforms the player can stand on. From the start the player can only fall;
+    from a platform it can jump or walk off either edge and steer (and dash) through the air.
+    An edge exists when that arc reaches the target platform from above, or its side (wall
+    climbing). Collectables and the exit gate are reachable when some arc from a reachable
+    platform overlaps them. Arcs ignore other platforms in the way and hazards (which only cost
+    health), so the check is optimistic: anything reported unreachable really is.
+    """
+    (start_x, start_y), platforms, collectables, exit_gate = read_level(level)
+    platform_rects = np.array(platforms, dtype=np.int64).reshape(-1, 4)
+    item_rects = np.array([(x - 10, y - 10, 20, 20) for x, y, _ in collectables] + [exit_gate], dtype=np.int64)
+
+    # Sources: the start, then one per platform (player standing on top, anywhere along it)
+    sources = np.empty((len(platforms) + 1, 3), dtype=np.int64)
+    sources[0] = (start_y, start_x, start_x)
+    if len(platforms):
+        sources[1:, 0] = platform_rects[:, 1] - PLAYER_HEIGHT
+        sources[1:, 1] = platform_rects[:, 0] - PLAYER_WIDTH + 1
+        sources[1:, 2] = platform_rects[:, 0] + platform_rects[:, 2] - 1
+
+    lowest = max([start_y + PLAYER_HEIGHT] + [y + h for _, y, _, h in platform_rects.tolist() + item_rects.tolist()])
+    highest = int(sources[:, 0].min())
+    length = int((lowest - highest) / TERMINAL_VELOCITY) + ARC_PADDING_STEPS
+    length = 1 << max(length - 1, 1).bit_length() # Round up so profiles are shared between levels
+    fall = vertical_profile(0, length)
+    jump = vertical_profile(PLAYER_JUMP_POWER, length)
+    reach = horizontal_reach(length)
+
+    # The start can only fall; platforms can jump or walk off.
+    start_edges = _platform_edges(sources[:1], fall, reach, platform_rects)[0]
+    start_items = _item_hits(sources[:1], fall, reach, item_rects)[0]
+    if len(platforms):
+        edges = (_in_chunks(_platform_edges, sources[1:], fall, reach, platform_rects)
+                 | _in_chunks(_platform_edges, sources[1:], jump, reach, platform_rects))
+        platform_items = (_in_chunks(_item_hits, sources[1:], fall, reach, item_rects)
+                          | _in_chunks(_item_hits, sources[1:], jump, reach, item_rects))
+    else:
+        edges = np.zeros((0, 0), dtype=bool)
+        platform_items = np.zeros((0, len(item_rects)), dtype=bool)
+
+    # Breadth-first search over the platform graph
+    reachable = start_edges.copy()
+    frontier = list(np.flatnonzero(reachable))
+    while frontier:
+        new = edges[frontier].any(axis=0) & ~reachable
+        reachable |= new
+        frontier = list(np.flatnonzero(new))
+
+    items_reached = start_items | platform_items[reachable].any(axis=0)
+    unreachable_collectables = [tuple(item) for item, ok in zip(collectables, items_reached[:-1]) if not ok]
+    return LevelReport(name, platforms, reachable.tolist(), unreachable_collectables, bool(items_reached[-1]))
+
+
+def validate_levels(levels, names=None):
+    """
+    Validates a batch of levels (dicts or level sources) and returns their LevelReports.
+    """
+    names = names or [f"level {index + 1}" for index in range(len(levels))]
+    return [validate_level(level, name) for level, name in zip(levels, names)]
+
+
+# --- Command Line ---
+# Validates the given level files, or LEVEL_DATA when none are given, and exits with status 1
+# if any level cannot be completed.
+if __name__ == "__main__":
+    paths = sys.argv[1:]
+    levels = [LevelFile(path) for path in paths] if paths else LEVEL_DATA
+    start = time.perf_counter()
+    reports = validate_levels(levels, paths or None)
+    elapsed = time.perf_counter() - start
+    for report in reports:
+        print(report)
+    print(f"Validated {len(reports)} level(s) in {elapsed * 1000:.1f} ms")
+    sys.exit(0 if all(report.completable for report in reports) else 1)
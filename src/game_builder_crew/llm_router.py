@@ -0,0 +1,540 @@
+import contextvars
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+
+from game_builder_crew.game_library import estimate_tokens
+from game_builder_crew.log_sink import DEBUG, get_sink
+from game_builder_crew.prompt_cache import message_text, prefix_hashes, split_marked
+
+# --- Hedging ---
+# Every agent's LLM call goes through an LLMRouter. The call starts on the agent's own backend
+# (its API key and primary model); if it hasn't answered by the stage's p90 latency, a duplicate
+# goes out on the next available backend (another key, then the fallback model), and the first
+# successful response wins. Failed calls fail over to the next backend immediately. Backends
+# that keep failing (rate limits, outages) are skipped by a per-backend circuit breaker.
+# Calls that pass tools, available functions or callbacks can have side effects (crewai runs
+# delegation tools and callbacks inside the LLM call), so they go out once: no hedges, no failover.
+HEDGE_PERCENTILE = 90
+MIN_LATENCY_SAMPLES = 5 # Below this the stage uses DEFAULT_HEDGE_AFTER_S
+DEFAULT_HEDGE_AFTER_S = 45.0
+MIN_HEDGE_AFTER_S = 1.0 # Never hedge sooner than this, even for fast stages
+LATENCY_WINDOW = 50 # Recent successful latencies kept per stage
+MAX_HEDGES = 2 # Extra requests per call on top of the first, so at most 3 in flight
+CALL_TIMEOUT_S = 600.0 # Overall limit for one call, hedges included
+
+BREAKER_FAILURE_THRESHOLD = 3 # Consecutive failures that open a breaker
+BREAKER_COOLDOWN_S = 60.0 # Gemini rate limits are per minute
+DEFAULT_REQUESTS_PER_MINUTE = 10 # Per key: Gemini 2.5 Flash free tier
+RATE_WINDOW_S = 60.0
+
+# Environment variables
+#   GAME_LLM_REPLAY=path        answer every call from a recording instead of the API
+#   GAME_LLM_RECORD=path        append every successful response to a recording
+#   GAME_LLM_LATENCY_FILE=path  where stage latencies are kept between runs
+#   GAME_LLM_FALLBACK_MODEL     model used after all keys of the primary model
+#   GAME_LLM_RPM=n              requests per minute allowed on each key (0: no limit)
+ENV_REPLAY = "GAME_LLM_REPLAY"
+ENV_RECORD = "GAME_LLM_RECORD"
+ENV_LATENCY_FILE = "GAME_LLM_LATENCY_FILE"
+ENV_FALLBACK_MODEL = "GAME_LLM_FALLBACK_MODEL"
+ENV_RPM = "GAME_LLM_RPM"
+DEFAULT_LATENCY_FILE = ".llm_latency.json"
+SIDE_EFFECT_KWARGS = ("tools", "available_functions", "callbacks")
+DEFAULT_FALLBACK_MODEL = "gemini/gemini-2.5-flash-lite"
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures and rejects calls for cooldown_s; then
+    lets a single trial call through (half-open) and closes again if it succeeds.
+    """
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, cooldown_s=BREAKER_COOLDOWN_S, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.cooldown_s = cooldown_s
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at < self.cooldown_s:
+            return "open"
+        return "half-open"
+
+    def allow(self):
+        with self.lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                self.opened_at = self.clock()
+
+
+class RateLimiter:
+    """
+    Sliding-window request limit for one key: acquire() blocks until a request may go out
+    without exceeding requests_per_minute, so concurrent crews sharing a router stay within
+    the provider's limit instead of tripping it and waiting out the breaker.
+    """
+    def __init__(self, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, window_s=RATE_WINDOW_S, clock=time.monotonic, sleep=time.sleep):
+        self.requests_per_minute = requests_per_minute
+        self.window_s = window_s
+        self.clock = clock
+        self.sleep = sleep
+        self.sent = deque()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Waits for a free slot and takes it; returns the seconds waited.
+        """
+        waited = 0.0
+        while self.requests_per_minute:
+            with self.lock:
+                now = self.clock()
+                while self.sent and now - self.sent[0] >= self.window_s:
+                    self.sent.popleft()
+                if len(self.sent) < self.requests_per_minute:
+                    self.sent.append(now)
+                    break
+                delay = self.sent[0] + self.window_s - now
+            self.sleep(delay)
+            waited += delay
+        return waited
+
+
+class UsageMeter:
+    """
+    Token usage of the router's requests, summed per tag: as reported by the provider where the
+    backend reports it, estimated otherwise. A tag (e.g. one training iteration) is set for the
+    calling context with tagged(); untagged calls sum under None. A context variable rather than
+    a thread-local, as crewai runs agent calls in worker threads that copy the caller's context
+    (and the router runs requests in the same way).
+    """
+    FIELDS = ("requests", "input_tokens", "cached_tokens", "output_tokens")
+
+    def __init__(self):
+        self.tag = contextvars.ContextVar("usage_tag", default=None)
+        self.lock = threading.Lock()
+        self.totals = {}
+
+    @contextmanager
+    def tagged(self, tag):
+        token = self.tag.set(tag)
+        try:
+            yield
+        finally:
+            self.tag.reset(token)
+
+    def add(self, **counts):
+        tag = self.tag.get()
+        with self.lock:
+            totals = self.totals.setdefault(tag, dict.fromkeys(self.FIELDS, 0))
+            for field, count in counts.items():
+                totals[field] += count
+
+    def take(self, tag):
+        # Returns and forgets the totals of tag.
+        with self.lock:
+            return self.totals.pop(tag, dict.fromkeys(self.FIELDS, 0))
+
+
+class LatencyTracker:
+    """
+    Recent successful call latencies per stage, and the hedge deadline derived from them.
+    """
+    def __init__(self, window=LATENCY_WINDOW, path=None, default_s=DEFAULT_HEDGE_AFTER_S, minimum_s=MIN_HEDGE_AFTER_S):
+        self.window = window
+        self.path = path
+        self.default_s = default_s
+        self.minimum_s = minimum_s
+        self.samples = {}
+        self.lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as latency_file:
+                for stage, values in json.load(latency_file).items():
+                    self.samples[stage] = deque(values, maxlen=window)
+
+    def record(self, stage, seconds):
+        with self.lock:
+            self.samples.setdefault(stage, deque(maxlen=self.window)).append(round(seconds, 4))
+            if self.path:
+                with open(self.path, "w", encoding="utf-8") as latency_file:
+                    json.dump({name: list(values) for name, values in self.samples.items()}, latency_file)
+
+    def hedge_after(self, stage):
+        with self.lock:
+            values = self.samples.get(stage)
+            if not values or len(values) < MIN_LATENCY_SAMPLES:
+                return self.default_s
+            return max(float(np.percentile(values, HEDGE_PERCENTILE)), self.minimum_s)
+
+
+class GeminiBackend:
+    """
+    One Gemini model on one API key. Plain text calls go to the API through google-genai and use
+    an explicit cached content for the prefix prompt_cache.py marked, created on the first call
+    that needs it and registered in the ContextCache; calls with tools or a response model go
+    through crewai's LLM, which handles those. The provider's token counts are put in usage.
+    """
+    def __init__(self, model, api_key, temperature=0.7, label=None, cache=None):
+        from crewai import LLM # Only needed for real API calls, not for replays
+        from google import genai
+
+        self.name = backend_name(model, label or "key")
+        self.model = model.split("/", 1)[-1] # google-genai takes the bare model name
+        self.temperature = temperature
+        self.cache = cache
+        self.llm = LLM(model=model, temperature=temperature, api_key=api_key)
+        self.client = genai.Client(api_key=api_key)
+        self.create_lock = threading.Lock()
+
+    def call(self, messages, stage=None, usage=None, tools=None, available_functions=None, response_model=None, **kwargs):
+        from google.genai import errors, types
+
+        if tools or available_functions or response_model is not None:
+            return self.llm.call(plain_messages(messages), tools=tools, available_functions=available_functions,
+                                 response_model=response_model, **kwargs)
+        prefix, rest = split_marked(messages)
+        name = self.cached_content(prefix) if prefix else None
+        system, contents = gemini_contents(rest if name else prefix + rest)
+        config = types.GenerateContentConfig(temperature=self.temperature, system_instruction=system, cached_content=name)
+        try:
+            response = self.client.models.generate_content(model=self.model, contents=contents, config=config)
+        except errors.ClientError:
+            if not name:
+                raise
+            # The cached content is gone before its expiry (deleted, or the key changed): forget
+            # it and send the whole prompt.
+            self.cache.store(self.name, prefix_hashes(prefix)[-1], None, 0)
+            system, contents = gemini_contents(prefix + rest)
+            config = types.GenerateContentConfig(temperature=self.temperature, system_instruction=system)
+            response = self.client.models.generate_content(model=self.model, contents=contents, config=config)
+        metadata = response.usage_metadata
+        if usage is not None and metadata is not None:
+            usage.update(
+                input_tokens=metadata.prompt_token_count or 0, # Includes the cached tokens
+                cached_tokens=metadata.cached_content_token_count or 0,
+                output_tokens=(metadata.candidates_token_count or 0) + (metadata.thoughts_token_count or 0),
+            )
+        return response.text or ""
+
+    def cached_content(self, prefix):
+        # The name of the cached content for the marked prefix messages, created on first use;
+        # None when there is no cache or the provider refused to create one.
+        from google.genai import types
+
+        if self.cache is None:
+            return None
+        key, entry = self.cache.lookup(self.name, prefix)
+        if entry:
+            return entry[0]
+        with self.create_lock:
+            key, entry = self.cache.lookup(self.name, prefix) # Created while this call waited
+            if entry:
+                return entry[0]
+            system, contents = gemini_contents(prefix)
+            tokens = sum(estimate_tokens(message_text(message)) for message in prefix)
+            if not contents:
+                return None
+            try:
+                created = self.client.caches.create(model=self.model, config=types.CreateCachedContentConfig(
+                    system_instruction=system, contents=contents, ttl=f"{int(self.cache.ttl_s)}s"))
+            except Exception as error: # Too small, not available on this key's tier, ...
+                get_sink().warning("llm_cache_create_failed", backend=self.name, tokens=tokens, error=repr(error))
+                self.cache.store(self.name, key, None, tokens)
+                return None
+            expires_at = created.expire_time.timestamp() if created.expire_time else None
+            self.cache.store(self.name, key, created.name, tokens, expires_at)
+            get_sink().info("llm_cache_created", backend=self.name, tokens=tokens, name=created.name)
+            return created.name
+
+
+def plain_messages(messages):
+    # The messages with marked prefix blocks turned back into plain text, for crewai's LLM.
+    if isinstance(messages, str):
+        return messages
+    return [{"role": message["role"], "content": message_text(message)} for message in messages]
+
+
+def gemini_contents(messages):
+    """
+    Returns (system_instruction, contents) for messages in google-genai's types: system messages
+    become the system instruction, assistant messages model turns and the rest user turns.
+    """
+    from google.genai import types
+
+    system = "\n\n".join(message_text(message) for message in messages if message["role"] == "system") or None
+    contents = [
+        types.Content(role="model" if message["role"] == "assistant" else "user", parts=[types.Part.from_text(text=message_text(message))])
+        for message in messages
+        if message["role"] != "system"
+    ]
+    return system, contents
+
+
+class ReplayBackend:
+    """
+    Local stand-in for an API backend: answers from recorded responses per stage (cycling
+    through them), after an injected latency, failing with an injected error at error_rate.
+    latency_s is seconds or a function of a random.Random returning seconds.
+    """
+    def __init__(self, name, responses, latency_s=0.0, error_rate=0.0, error=RuntimeError, seed=None):
+        self.name = name
+        self.responses = {stage: list(values) if isinstance(values, (list, tuple)) else [values] for stage, values in responses.items()}
+        self.latency_s = latency_s
+        self.error_rate = error_rate
+        self.error = error
+        self.random = random.Random(seed)
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_recording(cls, path, name="replay", **kwargs):
+        responses = {}
+        with open(path, "r", encoding="utf-8") as recording:
+            for line in recording:
+                if line.strip():
+                    entry = json.loads(line)
+                    responses.setdefault(entry["stage"], []).append(entry["response"])
+        return cls(name, responses, **kwargs)
+
+    def call(self, messages, stage=None, **kwargs):
+        with self.lock:
+            latency = self.latency_s(self.random) if callable(self.latency_s) else self.latency_s
+            failed = self.random.random() < self.error_rate
+            values = self.responses.get(stage) or self.responses.get("*") or [""]
+            index = self.counters.get(stage, 0)
+            self.counters[stage] = index + 1
+        time.sleep(latency)
+        if failed:
+            raise self.error(f"{self.name}: injected failure")
+        return values[index % len(values)]
+
+
+class LLMRouter:
+    """
+    Routes calls over a list of backends with hedging, failover and per-backend circuit
+    breakers (see the notes at the top of this module). Losing requests can't be cancelled
+    once sent; they finish in the background and only update their breaker.
+    """
+    def __init__(self, backends, hedge=True, max_hedges=MAX_HEDGES, latency=None, record_path=None, cache=None, requests_per_minute=0):
+        self.backends = list(backends)
+        self.cache = cache # prompt_cache.ContextCache laying out and marking prompts, if any
+        self.breakers = {backend.name: CircuitBreaker() for backend in self.backends}
+        # Limits are per key: the backends of every model on one key share its limiter
+        limiters = {}
+        self.limiters = {backend.name: limiters.setdefault(backend.name.rsplit("@", 1)[-1], RateLimiter(requests_per_minute))
+                         for backend in self.backends}
+        self.usage = UsageMeter()
+        self.hedge = hedge
+        self.max_hedges = max_hedges
+        self.latency = latency or LatencyTracker()
+        self.record_path = record_path
+        self.record_lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max(4, len(self.backends) * 2), thread_name_prefix="llm")
+        self.stats = {"calls": 0, "hedges": 0, "failovers": 0, "backup_wins": 0, "rate_limited_s": 0.0}
+        self.stats_lock = threading.Lock() # Updated from request threads and concurrent crews
+
+    def candidates(self, primary=None):
+        # The primary backend first, then the rest in order, skipping open breakers. Half-open ones
+        # stay in: their single trial is only taken (allow()) when a request is actually sent to
+        # them. When every breaker is open the call still goes out rather than failing without trying.
+        ordered = sorted(self.backends, key=lambda backend: backend.name != primary)
+        usable = [backend for backend in ordered if self.breakers[backend.name].state != "open"]
+        return usable or ordered
+
+    def count(self, stat, amount=1):
+        with self.stats_lock:
+            self.stats[stat] += amount
+
+    def _call_backend(self, backend, messages, stage, input_tokens, kwargs):
+        waited = self.limiters[backend.name].acquire()
+        if waited:
+            self.count("rate_limited_s", waited)
+        start = time.monotonic() # Time spent waiting for the rate limit isn't backend latency
+        breaker = self.breakers[backend.name]
+        usage = {}
+        try:
+            response = backend.call(messages, stage=stage, usage=usage, **kwargs)
+        except Exception:
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+        # Every answered request is billed, including hedged duplicates that lose
+        if "input_tokens" in usage and self.cache is not None:
+            self.cache.record(stage, usage["input_tokens"], usage["cached_tokens"])
+        self.usage.add(
+            input_tokens=usage.get("input_tokens", input_tokens),
+            cached_tokens=usage.get("cached_tokens", 0),
+            output_tokens=usage.get("output_tokens", estimate_tokens(str(response))),
+        )
+        return response, time.monotonic() - start
+
+    def call(self, messages, stage="default", primary=None, **kwargs):
+        """
+        Returns the first successful response for messages. Raises the last backend error if
+        every backend failed, or TimeoutError if nothing answered within CALL_TIMEOUT_S. A call
+        with side effects (see SIDE_EFFECT_KWARGS) is sent to a single backend only.
+        """
+        self.count("calls")
+        if self.cache is not None:
+            messages = self.cache.prepare(messages, stage) # Before hedging, so duplicates share the prefix
+        input_tokens = estimate_tokens(messages if isinstance(messages, str) else "".join(message_text(message) for message in messages))
+        queue = self.candidates(primary)
+        hedge_after = self.latency.hedge_after(stage)
+        started = time.monotonic()
+        pending = {}
+        last_error = None
+        extra_requests = 0
+        single = any(kwargs.get(name) for name in SIDE_EFFECT_KWARGS)
+
+        def launch(force=False):
+            # Sends the request to the next backend in the queue whose breaker lets it through;
+            # returns whether one was sent. force sends to the next backend regardless.
+            while queue:
+                backend = queue.pop(0)
+                if force or self.breakers[backend.name].allow():
+                    self.usage.add(requests=1)
+                    # In a copy of the caller's context, so the request's usage gets the caller's tag
+                    request = contextvars.copy_context().run
+                    pending[self.executor.submit(request, self._call_backend, backend, messages, stage, input_tokens, kwargs)] = backend
+                    return True
+            return False
+
+        primary_backend = queue[0]
+        if not launch():
+            queue.insert(0, primary_backend) # Every breaker refused (trials in flight): go out anyway
+            launch(force=True)
+        first = next(iter(pending.values()))
+        while pending:
+            elapsed = time.monotonic() - started
+            if elapsed >= CALL_TIMEOUT_S:
+                raise TimeoutError(f"No LLM response for stage {stage!r} within {CALL_TIMEOUT_S:.0f}s")
+            can_hedge = self.hedge and not single and queue and extra_requests < self.max_hedges
+            # Hedges go out every hedge_after seconds while the call is still unanswered.
+            timeout = hedge_after * (extra_requests + 1) - elapsed if can_hedge else CALL_TIMEOUT_S - elapsed
+            done, _ = wait(pending, timeout=max(timeout, 0), return_when=FIRST_COMPLETED)
+            if not done:
+                if can_hedge and launch():
+                    extra_requests += 1
+                    self.count("hedges")
+                    get_sink().warning("llm_hedge", stage=stage, after_s=round(time.monotonic() - started, 3), backend=list(pending.values())[-1].name)
+                continue
+            for future in done:
+                backend = pending.pop(future)
+                try:
+                    response, seconds = future.result()
+                except Exception as error:
+                    last_error = error
+                    get_sink().warning("llm_error", stage=stage, backend=backend.name, error=repr(error), breaker=self.breakers[backend.name].state)
+                    continue
+                self.latency.record(stage, seconds)
+                self.log_call(stage, backend, messages, response, time.monotonic() - started)
+                if backend is not first:
+                    self.count("backup_wins")
+                self.record(stage, response)
+                return response
+            # Every finished request failed: fail over right away if nothing else is in flight.
+            if not pending and not single and launch():
+                self.count("failovers")
+        raise last_error or RuntimeError(f"No LLM backend available for stage {stage!r}")
+
+    def log_call(self, stage, backend, messages, response, seconds):
+        sink = get_sink()
+        fields = {"stage": stage, "backend": backend.name, "seconds": round(seconds, 3), "response_chars": len(str(response))}
+        if sink.enabled(DEBUG):
+            # Prompts and responses are large; the sink stores them once by hash.
+            sink.debug("llm_call", prompt=json.dumps(messages, ensure_ascii=False, default=str), response=str(response), **fields)
+        else:
+            sink.info("llm_call", **fields)
+
+    def record(self, stage, response):
+        if self.record_path and isinstance(response, str):
+            with self.record_lock, open(self.record_path, "a", encoding="utf-8") as recording:
+                recording.write(json.dumps({"stage": stage, "response": response}) + "\n")
+
+
+def build_router(models, api_keys, temperature=0.7, cache=None):
+    """
+    Returns the router the crew uses: with GAME_LLM_REPLAY set, a single replay backend on that
+    recording; otherwise one backend per (model, key), keys in the given order for each model.
+    api_keys maps a label (e.g. the agent) to its key; missing keys are skipped. Raises
+    ValueError if no key is set.
+    """
+    latency = LatencyTracker(path=os.environ.get(ENV_LATENCY_FILE, DEFAULT_LATENCY_FILE))
+    requests_per_minute = int(os.environ.get(ENV_RPM, DEFAULT_REQUESTS_PER_MINUTE))
+    record_path = os.environ.get(ENV_RECORD)
+    replay_path = os.environ.get(ENV_REPLAY)
+    if replay_path:
+        return LLMRouter([ReplayBackend.from_recording(replay_path)], latency=latency, cache=cache)
+    backends = [
+        GeminiBackend(model, key, temperature, label, cache)
+        for model in models
+        for label, key in api_keys.items()
+        if key
+    ]
+    if not backends:
+        raise ValueError(f"No API key is set for any of the keys {', '.join(api_keys)}: set them in the environment "
+                         f"or .env (see README), or set {ENV_REPLAY} to answer from a recording.")
+    return LLMRouter(backends, latency=latency, record_path=record_path, cache=cache, requests_per_minute=requests_per_minute)
+
+
+def backend_name(model, label):
+    # The name build_router gives the backend for model on the key labelled label.
+    return f"{model}@{label}"
+
+
+# --- Command Line ---
+# Simulates a sequential crew against replay backends with heavy-tailed latency, occasional
+# stalls and errors, and compares call latencies with and without hedging.
+if __name__ == "__main__":
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    scale = 0.01 # One simulated second is 10 ms of real time
+
+    def simulated_latency(rng):
+        stall = 8.0 if rng.random() < 0.05 else 1.0
+        return rng.lognormvariate(1.0, 0.4) * stall * scale
+
+    for hedge in (False, True):
+        backends = [
+            ReplayBackend(f"key{index}", {"*": "ok"}, simulated_latency, error_rate=0.03, seed=index)
+            for index in range(4)
+        ]
+        router = LLMRouter(backends, hedge=hedge, latency=LatencyTracker(default_s=DEFAULT_HEDGE_AFTER_S * scale, minimum_s=MIN_HEDGE_AFTER_S * scale))
+        latencies = []
+        for _ in range(calls):
+            start = time.monotonic()
+            router.call("prompt", stage="code_task", primary="key0")
+            latencies.append((time.monotonic() - start) / scale)
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+        print(f"hedge={'on ' if hedge else 'off'}  p50 {p50:5.2f}s  p90 {p90:5.2f}s  p99 {p99:5.2f}s  max {max(latencies):5.2f}s  {router.stats}")
+        router.executor.shutdown(wait=True)
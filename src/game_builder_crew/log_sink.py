@@ -0,0 +1,307 @@
+import atexit
+import hashlib
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+
+# --- Structured Log ---
+# Events are dicts written as JSON lines by a background thread, so logging never blocks the
+# caller: emit() only puts the event on a bounded queue. When the queue is full (by event count
+# or by queued payload bytes) the drop policy decides which event is lost, and the number of
+# dropped events is logged once the writer catches up. String fields longer than INLINE_LIMIT
+# (prompts, generated code) are stored once under payload_dir by their sha256 and the event
+# keeps only a reference, so repeated prompts cost one file.
+DEBUG = logging.DEBUG
+INFO = logging.INFO
+WARNING = logging.WARNING
+ERROR = logging.ERROR
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+
+QUEUE_CAPACITY = 1000 # Events waiting for the writer
+QUEUE_MAX_BYTES = 16 * 1024 * 1024 # Payload bytes waiting for the writer
+INLINE_LIMIT = 512 # Longer string fields are stored by reference
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+CLOSE_TIMEOUT_S = 5.0
+
+# Environment variables
+#   GAME_LOG_LEVEL=DEBUG|INFO|WARNING|ERROR   minimum level written (default INFO)
+#   GAME_LOG_FILE=path                        JSON lines file (default game_crew.log.jsonl)
+#   GAME_LOG_PAYLOADS=dir                     payload store (default log_payloads)
+#   GAME_LOG_CONSOLE=level                    also echo events at or above this level to stderr
+#   GAME_LOG_VERBOSE=1                        keep crewai's own verbose console output
+ENV_LEVEL = "GAME_LOG_LEVEL"
+ENV_FILE = "GAME_LOG_FILE"
+ENV_PAYLOADS = "GAME_LOG_PAYLOADS"
+ENV_CONSOLE = "GAME_LOG_CONSOLE"
+ENV_VERBOSE = "GAME_LOG_VERBOSE"
+DEFAULT_FILE = "game_crew.log.jsonl"
+DEFAULT_PAYLOADS = "log_payloads"
+
+_STOP = object()
+
+
+def parse_level(value, default=INFO):
+    if value is None or value == "":
+        return default
+    if isinstance(value, int) or value.isdigit():
+        return int(value)
+    level = logging.getLevelName(value.upper()) # The level number for a known name, else a string
+    return level if isinstance(level, int) else default
+
+
+class LogSink:
+    """
+    Bounded, asynchronous JSON-lines log (see Structured Log above). emit() is safe to call
+    from any thread; close() writes what is queued and stops the writer.
+    """
+    def __init__(self, path=DEFAULT_FILE, level=INFO, payload_dir=DEFAULT_PAYLOADS, capacity=QUEUE_CAPACITY,
+                 max_bytes=QUEUE_MAX_BYTES, drop_policy=DROP_OLDEST, inline_limit=INLINE_LIMIT, console_level=None):
+        self.path = path
+        self.level = level
+        self.payload_dir = payload_dir
+        self.max_bytes = max_bytes
+        self.drop_policy = drop_policy
+        self.inline_limit = inline_limit
+        self.console_level = console_level
+        self.queue = queue.Queue(maxsize=capacity)
+        self.lock = threading.Lock() # Guards the counters below
+        self.queued_bytes = 0
+        self.dropped = 0
+        self.written = 0
+        self.known_payloads = set()
+        self.closed = False
+        self.thread = threading.Thread(target=self._write_loop, name="log-sink", daemon=True)
+        self.thread.start()
+
+    def enabled(self, level):
+        return level >= self.level
+
+    def emit(self, level, event, **fields):
+        """
+        Queues an event; returns immediately. Returns False if the event was filtered or dropped.
+        """
+        if level < self.level or self.closed:
+            return False
+        size = sum(len(value) for value in fields.values() if isinstance(value, str))
+        record = (time.time(), level, event, fields, size)
+        with self.lock:
+            if self.queued_bytes + size > self.max_bytes and not self._make_room(size):
+                self.dropped += 1
+                return False
+            self.queued_bytes += size
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if self.drop_policy == DROP_OLDEST and self._drop_one():
+                try:
+                    self.queue.put_nowait(record)
+                    return True
+                except queue.Full:
+                    pass
+            with self.lock:
+                self.dropped += 1
+                self.queued_bytes -= size
+            return False
+        return True
+
+    def _drop_one(self):
+        # Removes the oldest queued event (never the stop marker) to make room.
+        try:
+            record = self.queue.get_nowait()
+        except queue.Empty:
+            return True
+        if record is _STOP:
+            self.queue.put_nowait(_STOP)
+            return False
+        with self.lock:
+            self.dropped += 1
+            self.queued_bytes -= record[4]
+        return True
+
+    def _make_room(self, size):
+        # Called with the lock held when the byte budget is exceeded.
+        if self.drop_policy != DROP_OLDEST or size > self.max_bytes:
+            return False
+        self.lock.release()
+        try:
+            while self.queued_bytes + size > self.max_bytes:
+                if self.queue.empty() or not self._drop_one():
+                    return self.queued_bytes + size <= self.max_bytes
+            return True
+        finally:
+            self.lock.acquire()
+
+    def debug(self, event, **fields):
+        return self.emit(DEBUG, event, **fields)
+
+    def info(self, event, **fields):
+        return self.emit(INFO, event, **fields)
+
+    def warning(self, event, **fields):
+        return self.emit(WARNING, event, **fields)
+
+    def error(self, event, **fields):
+        return self.emit(ERROR, event, **fields)
+
+    # --- Writer thread ---
+
+    def store_payload(self, text):
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        if digest not in self.known_payloads:
+            path = os.path.join(self.payload_dir, f"{digest}.txt")
+            if not os.path.exists(path):
+                os.makedirs(self.payload_dir, exist_ok=True)
+                with open(path, "wb") as payload_file:
+                    payload_file.write(data)
+            self.known_payloads.add(digest)
+        return {"ref": f"sha256:{digest}", "chars": len(text)}
+
+    def format_record(self, record):
+        timestamp, level, event, fields, _ = record
+        entry = {"ts": round(timestamp, 6), "level": LEVEL_NAMES.get(level, str(level)), "event": event}
+        for key, value in fields.items():
+            if isinstance(value, str) and len(value) > self.inline_limit:
+                value = self.store_payload(value)
+            elif not isinstance(value, (str, int, float, bool, type(None), list, dict)):
+                value = str(value)
+            entry[key] = value
+        return entry
+
+    def _write_loop(self):
+        log_file = open(self.path, "a", encoding="utf-8") if self.path else None
+        reported_drops = 0
+        try:
+            while True:
+                record = self.queue.get()
+                if record is _STOP:
+                    break
+                batch = [record]
+                # Drain whatever else is queued so one write and flush covers the batch
+                while len(batch) < 256:
+                    try:
+                        record = self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if record is _STOP:
+                        self.queue.put(_STOP)
+                        break
+                    batch.append(record)
+                lines = []
+                for record in batch:
+                    entry = self.format_record(record)
+                    lines.append(json.dumps(entry, ensure_ascii=False, default=str))
+                    if self.console_level is not None and record[1] >= self.console_level:
+                        details = " ".join(f"{key}={value}" for key, value in entry.items() if key not in ("ts", "level", "event"))
+                        print(f"[{entry['level']}] {entry['event']} {details}", file=sys.stderr)
+                with self.lock:
+                    self.queued_bytes -= sum(record[4] for record in batch)
+                    dropped = self.dropped
+                if dropped > reported_drops:
+                    lines.append(json.dumps({"ts": round(time.time(), 6), "level": "WARNING", "event": "log_dropped", "count": dropped - reported_drops}))
+                    reported_drops = dropped
+                if log_file:
+                    log_file.write("\n".join(lines) + "\n")
+                    log_file.flush()
+                self.written += len(batch)
+        finally:
+            if log_file:
+                log_file.close()
+
+    def close(self, timeout=CLOSE_TIMEOUT_S):
+        """
+        Stops accepting events, waits up to timeout for the queued ones to be written.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        while True:
+            try:
+                self.queue.put(_STOP, timeout=timeout)
+                break
+            except queue.Full:
+                self._drop_one()
+        self.thread.join(timeout)
+
+
+_sink = None
+_sink_lock = threading.Lock()
+
+
+def get_sink():
+    """
+    Returns the process-wide sink, configured from the GAME_LOG_* environment variables on
+    first use and closed at exit.
+    """
+    global _sink
+    with _sink_lock:
+        if _sink is None:
+            _sink = LogSink(
+                path=os.environ.get(ENV_FILE, DEFAULT_FILE),
+                level=parse_level(os.environ.get(ENV_LEVEL)),
+                payload_dir=os.environ.get(ENV_PAYLOADS, DEFAULT_PAYLOADS),
+                console_level=parse_level(os.environ.get(ENV_CONSOLE), None),
+            )
+            atexit.register(_sink.close)
+        return _sink
+
+
+def verbose_console():
+    # Whether agents and the crew should keep crewai's verbose console output.
+    return os.environ.get(ENV_VERBOSE, "") not in ("", "0")
+
+
+def step_logger(stage):
+    """
+    Returns a crewai step_callback that logs an agent's steps (thoughts, tool calls, final
+    answers) to the sink instead of the console.
+    """
+    def log_step(step):
+        sink = get_sink()
+        if not sink.enabled(DEBUG):
+            return
+        fields = {"stage": stage, "step": type(step).__name__}
+        for name in ("thought", "tool", "tool_input", "result", "output", "text"):
+            value = getattr(step, name, None)
+            if value:
+                fields[name] = value if isinstance(value, str) else str(value)
+        sink.debug("agent_step", **fields)
+    return log_step
+
+
+def log_task_output(output):
+    # crewai task_callback: one INFO event per finished task, with the output by reference.
+    get_sink().info("task_done", task=getattr(output, "name", None) or getattr(output, "description", "")[:80],
+                    agent=getattr(output, "agent", None), output=getattr(output, "raw", str(output)))
+
+
+# --- Command Line ---
+# Measures the caller-side cost of emit() against writing the same events synchronously.
+if __name__ == "__main__":
+    import tempfile
+
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    payload = "class Game:\n    pass\n" * 400
+    directory = tempfile.mkdtemp()
+
+    start = time.perf_counter()
+    with open(os.path.join(directory, "sync.log"), "w", encoding="utf-8") as sync_file:
+        for index in range(events):
+            sync_file.write(json.dumps({"event": "llm_call", "index": index, "prompt": payload}) + "\n")
+            sync_file.flush()
+    sync_s = time.perf_counter() - start
+
+    sink = LogSink(os.path.join(directory, "async.log"), payload_dir=os.path.join(directory, "payloads"))
+    start = time.perf_counter()
+    for index in range(events):
+        sink.info("llm_call", index=index, prompt=payload)
+    emit_s = time.perf_counter() - start
+    sink.close()
+    print(f"sync write: {sync_s / events * 1e6:.1f} us/event  emit: {emit_s / events * 1e6:.1f} us/event  "
+          f"written {sink.written}  dropped {sink.dropped}  log {os.path.getsize(os.path.join(directory, 'async.log')) / 1024:.0f} KB "
+          f"vs {os.path.getsize(os.path.join(directory, 'sync.log')) / 1024:.0f} KB")
@@ -4,6 +4,8 @@ from dotenv import load_dotenv  # <--- ADD THIS
 load_dotenv()                   # <--- ADD THIS
 
 from game_builder_crew.crew import GameBuilderCrew
+from game_builder_crew.game_library import GameLibrary, build_inputs
+from game_builder_crew.training import parse_args, train as train_crew
 
 def run():
     # Replace with your inputs, it will automatically interpolate any tasks and agents information
@@ -13,31 +15,32 @@ def run():
     with open('src/game_builder_crew/config/gamedesign.yaml', 'r', encoding='utf-8') as file:
         examples = yaml.safe_load(file)
 
-    inputs = {
-        'game' :  examples['example3_snake']
-    }
-    game= GameBuilderCrew().crew().kickoff(inputs=inputs)
+    library = GameLibrary()
+    inputs = build_inputs(examples['example3_snake'], library)
+    game_crew = GameBuilderCrew()
+    game= game_crew.crew().kickoff(inputs=inputs)
+    # Working games become references for later runs; the design spec allows incremental edits
+    library.add(inputs['game'], str(game), spec=game.tasks_output[0].raw)
 
     print("\n\n########################")
     print("## Here is the result")
     print("########################\n")
     print("final code for the game:")
     print(game)
+    print("\nPrompt cache:")
+    print(game_crew.router.cache.report())
     
 
 def train():
     """
-    Train the crew for a given number of iterations.
+    Train the crew for a given number of iterations, spread over several game designs and run
+    concurrently; an interrupted run resumes from its checkpoint (see training.py).
+    Usage: train N FILENAME [--examples a,b,...] [--workers K] [--fresh]
     """
-
-    with open('src/game_builder_crew/config/gamedesign.yaml', 'r', encoding='utf-8') as file:
-        examples = yaml.safe_load(file)
-
-    inputs = {
-        'game' : examples['example1_pacman']
-    }
     try:
-        GameBuilderCrew().crew().train(n_iterations=int(sys.argv[1]), filename=sys.argv[2], inputs=inputs)
+        finished = train_crew(**parse_args(sys.argv[1:]))
 
     except Exception as e:
         raise Exception(f"An error occurred while training the crew: {e}")
+    if not finished:
+        sys.exit(1)
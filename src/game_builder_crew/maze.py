@@ -1,7 +1,25 @@
 
 import pygame
 import sys
-import time
+
+try:
+    from game_builder_crew.profiler import get_profiler
+except ImportError: # Run as a plain script without the package installed: no profiling
+    class _NoProfiler:
+        def begin_frame(self):
+            pass
+
+        def mark(self, phase):
+            pass
+
+        def draw_overlay(self, screen):
+            pass
+
+        def close(self):
+            pass
+
+    def get_profiler(game_name, profiler=None):
+        return profiler or _NoProfiler()
 
 # --- Constants ---
 # Screen dimensions and cell size
@@ -191,7 +209,9 @@ class Monster:
 
 
 class GameManager:
-    def __init__(self, width, height, cell_size):
+    def __init__(self, width, height, cell_size, profiler=None):
+        # profiler is a profiler.FrameProfiler; by default it is configured from the environment
+        self.profiler = get_profiler("maze", profiler)
         pygame.init()
         pygame.font.init()
 
@@ -210,7 +230,7 @@ class GameManager:
         self.monster = Monster(MONSTER_START_POS[0], MONSTER_START_POS[1], self.cell_size, RED, frames_per_move=30) # Monster moves every 30 frames
 
         self.game_state = "MENU" # "MENU", "PLAYING", "GAME_OVER", "WIN", "QUIT"
-        self.start_time = 0.0
+        self.start_time = 0 # pygame.time.get_ticks() at game start
         self.elapsed_time = 0
 
         self.player_input_direction = None # Stores (dx, dy) for player movement this frame
@@ -219,7 +239,7 @@ class GameManager:
         self.player.set_position(PLAYER_START_POS[0], PLAYER_START_POS[1])
         self.monster.set_position(MONSTER_START_POS[0], MONSTER_START_POS[1])
         self.monster.move_timer = 0 # Reset monster's internal timer
-        self.start_time = time.time()
+        self.start_time = pygame.time.get_ticks()
         self.elapsed_time = 0
         self.game_state = "PLAYING"
         self.player_input_direction = None
@@ -256,7 +276,7 @@ class GameManager:
             self.monster.update(self.player.grid_x, self.player.grid_y, self.maze)
 
             # Update elapsed time
-            self.elapsed_time = int(time.time() - self.start_time)
+            self.elapsed_time = (pygame.time.get_ticks() - self.start_time) // 1000
 
             # Check win condition
             if self.player.grid_x == self.maze.exit_pos[0] and self.player.grid_y == self.maze.exit_pos[1]:
@@ -300,20 +320,27 @@ class GameManager:
             self.draw_text(f"Time: {self.elapsed_time} seconds", 40, WHITE, self.width // 2, self.height // 2, center=True)
             self.draw_text("Press R to Play Again", 36, GREEN, self.width // 2, self.height // 2 + 50, center=True)
 
+        self.profiler.draw_overlay(self.screen)
         pygame.display.flip()
 
     def run(self):
         running = True
         while running:
+            self.profiler.begin_frame()
             self.handle_events()
+            self.profiler.mark("events")
             self.update()
+            self.profiler.mark("update")
             self.draw()
+            self.profiler.mark("draw")
 
             self.clock.tick(FPS)
+            self.profiler.mark("tick")
 
             if self.game_state == "QUIT":
                 running = False
 
+        self.profiler.close()
         pygame.quit()
         sys.exit()
 
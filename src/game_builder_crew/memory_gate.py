@@ -0,0 +1,287 @@
+import json
+import linecache
+import os
+import random
+import resource
+import sys
+import traceback
+import tracemalloc
+
+import numpy as np
+
+from game_builder_crew.perf_gate import GATE_TIMEOUT_S, load_game_class, run_in_subprocess, stress_events
+
+# --- Memory Gate ---
+# A candidate game is run headlessly under tracemalloc for MEMORY_FRAMES stress frames (the
+# same random input as the performance gate) and measured on:
+#   alloc_bytes_per_frame    Python memory a steady-state frame allocates on top of what was
+#                            live when it started (median of the per-frame peak growth)
+#   surface_bytes_per_frame  pixel memory of the pygame Surfaces the game creates per frame
+#                            (SDL allocates it outside tracemalloc, so Surface() is counted)
+#   growth_bytes_per_minute  slope of live traced memory over the steady state, at 60 FPS (leaks)
+#   peak_rss_mb              peak resident set size of the whole run
+# A short attribution pass then traces the game's own lines and charges each the allocations
+# made until the game's next line runs, and the lines whose live memory grew the most between
+# the start and the end of the steady state are taken from tracemalloc snapshots. Those are the
+# offending lines reported when a budget is exceeded.
+MEMORY_FRAMES = 3000
+WARMUP_FRAMES = 300 # Caches fill up and the first rounds start; not part of the steady state
+ATTRIBUTION_FRAMES = 60
+TOP_LINES = 5
+FPS = 60
+
+DEFAULT_BUDGETS = {
+    "alloc_bytes_per_frame": 64 * 1024,
+    "surface_bytes_per_frame": 64 * 1024, # Far below one full-screen surface
+    "growth_bytes_per_minute": 1024 * 1024,
+    "peak_rss_mb": 400,
+}
+
+# Environment variables read by review_guardrail (perf_gate.py)
+#   GAME_MEMORY_GATE=review|reject|0   append failures to the review (default), make the engineer
+#                                      redo the code (crewai guardrail retry), or skip the gate
+#   GAME_MEMORY_BUDGETS=path           JSON file overriding DEFAULT_BUDGETS
+ENV_GATE = "GAME_MEMORY_GATE"
+ENV_BUDGETS = "GAME_MEMORY_BUDGETS"
+MODE_REVIEW = "review"
+MODE_REJECT = "reject"
+
+
+def load_budgets(path=None):
+    budgets = dict(DEFAULT_BUDGETS)
+    path = path or os.environ.get(ENV_BUDGETS)
+    if path:
+        with open(path, "r", encoding="utf-8") as budgets_file:
+            budgets.update(json.load(budgets_file))
+    return budgets
+
+
+class SurfaceCounter:
+    """
+    Replaces pygame.Surface with a subclass that records the pixel bytes and the creating line
+    (in the game's file) of every Surface created while counting is on.
+    """
+    def __init__(self, filename):
+        self.filename = os.path.abspath(filename)
+        self.counting = False
+        self.frame_bytes = 0
+        self.lines = {} # line -> bytes
+        self.original = None
+
+    def install(self):
+        import pygame
+
+        counter = self
+        self.original = pygame.Surface
+
+        class CountedSurface(self.original):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                if counter.counting:
+                    size = self.get_width() * self.get_height() * self.get_bytesize()
+                    counter.frame_bytes += size
+                    frame = sys._getframe(1)
+                    while frame is not None and os.path.abspath(frame.f_code.co_filename) != counter.filename:
+                        frame = frame.f_back
+                    if frame is not None:
+                        counter.lines[frame.f_lineno] = counter.lines.get(frame.f_lineno, 0) + size
+
+        pygame.Surface = CountedSurface
+
+    def uninstall(self):
+        import pygame
+
+        pygame.Surface = self.original
+
+
+class LineAllocationTracer:
+    """
+    sys.settrace hook that, on every line event in the game's file, charges the tracemalloc peak
+    growth since the game's previous line event to that previous line. Allocations made in
+    library code a line calls are charged to the calling line.
+    """
+    def __init__(self, filename):
+        self.filename = os.path.abspath(filename)
+        self.lines = {} # line -> bytes
+        self.previous_line = None
+        self.previous_bytes = 0
+        self.files = {}
+
+    def _in_game(self, code):
+        filename = code.co_filename
+        if filename not in self.files:
+            self.files[filename] = os.path.abspath(filename) == self.filename
+        return self.files[filename]
+
+    def global_trace(self, frame, event, arg):
+        return self.local_trace if self._in_game(frame.f_code) else None
+
+    def local_trace(self, frame, event, arg):
+        if event in ("line", "return"):
+            _, peak = tracemalloc.get_traced_memory()
+            if self.previous_line is not None:
+                growth = peak - self.previous_bytes
+                if growth > 0:
+                    self.lines[self.previous_line] = self.lines.get(self.previous_line, 0) + growth
+            tracemalloc.reset_peak()
+            self.previous_bytes = tracemalloc.get_traced_memory()[0]
+            self.previous_line = frame.f_lineno if event == "line" else None
+        return self.local_trace
+
+    def start(self):
+        sys.settrace(self.global_trace)
+
+    def stop(self):
+        sys.settrace(None)
+
+
+def top_lines(path, line_bytes, frames, count=TOP_LINES):
+    # The heaviest lines as dicts with their source text, in bytes per frame.
+    ranked = sorted(line_bytes.items(), key=lambda pair: -pair[1])[:count]
+    return [{"line": line, "bytes_per_frame": int(size / frames), "source": linecache.getline(path, line).strip()} for line, size in ranked if size >= frames]
+
+
+def run_memory_gate(path, frames=MEMORY_FRAMES, budgets=None, seed=0):
+    """
+    Runs the game at path under the stress load with allocation tracing in this process and
+    returns the gate report (a dict: passed, metrics, exceeded budgets, offending lines, or
+    the error).
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    budgets = budgets or load_budgets()
+    report = {"path": path, "frames": frames, "budgets": budgets}
+    rng = random.Random(seed)
+    surfaces = SurfaceCounter(path)
+    tracer = LineAllocationTracer(path)
+    frames = max(frames, WARMUP_FRAMES + ATTRIBUTION_FRAMES + 2)
+    steady_frames = frames - WARMUP_FRAMES - ATTRIBUTION_FRAMES
+
+    # Preallocated so recording a frame doesn't allocate in the traced process itself
+    alloc_bytes = np.zeros(steady_frames)
+    surface_bytes = np.zeros(steady_frames)
+    live_bytes = np.zeros(steady_frames)
+    tracemalloc.start()
+    surfaces.install()
+    try:
+        game_class = load_game_class(path)
+        report["game"] = game_class.__name__
+        app = game_class(headless=True)
+        start_snapshot = None
+        for frame in range(frames):
+            steady = WARMUP_FRAMES <= frame < WARMUP_FRAMES + steady_frames
+            attributing = frame >= WARMUP_FRAMES + steady_frames
+            if frame == WARMUP_FRAMES:
+                start_snapshot = tracemalloc.take_snapshot()
+            if frame == WARMUP_FRAMES + steady_frames:
+                end_snapshot = tracemalloc.take_snapshot()
+                tracer.start()
+
+            stress_events(app, rng)
+            app.running = True # A game that quits is simply kept going
+            surfaces.counting = steady
+            surfaces.frame_bytes = 0
+            tracemalloc.reset_peak()
+            frame_start = tracemalloc.get_traced_memory()[0]
+            app.step()
+            app.render() # Headless steps don't draw; allocations in drawing count too
+            current, peak = tracemalloc.get_traced_memory()
+            if steady:
+                alloc_bytes[frame - WARMUP_FRAMES] = peak - frame_start
+                surface_bytes[frame - WARMUP_FRAMES] = surfaces.frame_bytes
+                live_bytes[frame - WARMUP_FRAMES] = current
+            if attributing:
+                tracer.previous_line = None
+        tracer.stop()
+    except (Exception, SystemExit): # Generated code may call sys.exit()
+        tracer.stop()
+        report.update(passed=False, error=traceback.format_exc(limit=-6))
+        return report
+    finally:
+        surfaces.counting = False
+        surfaces.uninstall()
+
+    # Leak suspects: lines of the game whose live memory grew over the steady state
+    growth_lines = {}
+    for stat in end_snapshot.compare_to(start_snapshot, "lineno"):
+        frame = stat.traceback[0]
+        if stat.size_diff > 0 and os.path.abspath(frame.filename) == os.path.abspath(path):
+            growth_lines[frame.lineno] = growth_lines.get(frame.lineno, 0) + stat.size_diff
+    tracemalloc.stop()
+
+    slope = float(np.polyfit(np.arange(steady_frames), live_bytes, 1)[0])
+    metrics = {
+        "alloc_bytes_per_frame": float(np.median(alloc_bytes)),
+        "surface_bytes_per_frame": float(np.mean(surface_bytes)),
+        "growth_bytes_per_minute": max(0.0, slope * FPS * 60),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, # KB on Linux
+    }
+    exceeded = [name for name, value in metrics.items() if name in budgets and value > budgets[name]]
+    report.update(
+        passed=not exceeded,
+        metrics=metrics,
+        exceeded=exceeded,
+        alloc_lines=top_lines(path, tracer.lines, ATTRIBUTION_FRAMES),
+        surface_lines=top_lines(path, surfaces.lines, steady_frames),
+        growth_lines=top_lines(path, growth_lines, steady_frames),
+    )
+    return report
+
+
+def gate_code(code, frames=MEMORY_FRAMES, budgets_path=None, timeout=GATE_TIMEOUT_S):
+    """
+    Runs the memory gate on game source code in a subprocess and returns its report. The
+    budgets file defaults to GAME_MEMORY_BUDGETS, which the subprocess doesn't inherit.
+    """
+    budgets_path = budgets_path or os.environ.get(ENV_BUDGETS)
+    args = ["--frames", frames] + (["--budgets", os.path.abspath(budgets_path)] if budgets_path else [])
+    return run_in_subprocess("game_builder_crew.memory_gate", code, args, timeout)
+
+
+def format_bytes(size):
+    return f"{size / 1024 / 1024:.1f} MB" if size >= 1024 * 1024 else f"{size / 1024:.1f} KB"
+
+
+def format_report(report):
+    """
+    Returns the report as the text the reviewer gets: the verdict, the metrics against their
+    budgets and, for every exceeded budget, the offending lines.
+    """
+    if report.get("error"):
+        return ("MEMORY GATE: FAILED - the game crashed or hung during a headless run.\n"
+                f"Fix this error first:\n{report['error']}")
+    metrics, budgets = report["metrics"], report["budgets"]
+    lines = [
+        f"MEMORY GATE: {'PASSED' if report['passed'] else 'FAILED'} over {report['frames']} stress frames - "
+        f"allocations {format_bytes(metrics['alloc_bytes_per_frame'])}/frame (budget {format_bytes(budgets['alloc_bytes_per_frame'])}), "
+        f"new surfaces {format_bytes(metrics['surface_bytes_per_frame'])}/frame (budget {format_bytes(budgets['surface_bytes_per_frame'])}), "
+        f"growth {format_bytes(metrics['growth_bytes_per_minute'])}/minute (budget {format_bytes(budgets['growth_bytes_per_minute'])}), "
+        f"peak RSS {metrics['peak_rss_mb']:.0f} MB (budget {budgets['peak_rss_mb']:.0f} MB).",
+    ]
+    sections = [
+        ("alloc_bytes_per_frame", "alloc_lines", "Lines allocating every frame (create objects once and reuse them, avoid slicing/copying lists):"),
+        ("surface_bytes_per_frame", "surface_lines", "Lines creating Surfaces every frame (create them once, e.g. in reset() or __init__, and reuse them):"),
+        ("growth_bytes_per_minute", "growth_lines", "Lines whose memory keeps growing (remove, cap or clear what they add):"),
+    ]
+    for metric, key, title in sections:
+        if metric in report["exceeded"] and report[key]:
+            lines.append(title)
+            for entry in report[key]:
+                lines.append(f"  - line {entry['line']}: {format_bytes(entry['bytes_per_frame'])}/frame  {entry['source']}")
+    return "\n".join(lines)
+
+
+# --- Command Line ---
+# python -m game_builder_crew.memory_gate game.py [--frames N] [--budgets budgets.json] [--json]
+# Exits with status 1 if the game fails the gate.
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    as_json = "--json" in args
+    frame_count = int(args[args.index("--frames") + 1]) if "--frames" in args else MEMORY_FRAMES
+    budget_values = load_budgets(args[args.index("--budgets") + 1] if "--budgets" in args else None)
+    gate_report = run_memory_gate(args[0], frame_count, budget_values)
+    if as_json:
+        print(json.dumps(gate_report))
+    else:
+        print(format_report(gate_report))
+    sys.exit(0 if gate_report["passed"] else 1)
@@ -0,0 +1,285 @@
+import importlib.util
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from collections import Counter
+
+import numpy as np
+
+# --- Performance Gate ---
+# A candidate game (a GameApp subclass, see runtime/) is run headlessly at a stress scale:
+# STRESS_FRAMES frames, each with random key presses from its controls and random letters,
+# drawing every frame. FrameProfiler times the phases of each frame while a sampling profiler
+# records which of the game's functions (and lines) the time goes to. The gate fails when the
+# game's own work per frame (events + update + draw) exceeds FRAME_BUDGET_MS at the
+# BUDGET_PERCENTILE, and the hottest functions are reported to the reviewer as optimization
+# targets. Candidates run in a subprocess so a hanging or crashing game can't take the crew down.
+STRESS_FRAMES = 600
+WARMUP_FRAMES = 30 # Not counted: first draws, font loading
+KEYS_PER_FRAME = 3
+FRAME_BUDGET_MS = 8.0 # Half of a 60 FPS frame, leaving room for slower machines
+BUDGET_PERCENTILE = 95
+SAMPLE_INTERVAL_S = 0.0005
+TOP_FUNCTIONS = 5
+GATE_TIMEOUT_S = 120
+ENV_GATE = "GAME_PERF_GATE" # Set to 0 to skip the gate in the crew
+
+LETTER_KEYS = "abcdefghijklmnopqrstuvwxyz"
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of one thread every interval seconds from a background thread and counts,
+    for the functions defined in filename, how many samples they were on the stack (inclusive)
+    and on which of their lines the innermost one was (hot lines).
+    """
+    def __init__(self, filename, thread_id=None, interval=SAMPLE_INTERVAL_S):
+        self.filename = os.path.abspath(filename)
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.samples = 0
+        self.inclusive = Counter()
+        self.lines = Counter()
+        self.running = False
+        self.thread = None
+
+    def _run(self):
+        while self.running:
+            frame = sys._current_frames().get(self.thread_id)
+            on_stack = set()
+            innermost = None
+            while frame is not None:
+                code = frame.f_code
+                if os.path.abspath(code.co_filename) == self.filename:
+                    function = (getattr(code, "co_qualname", code.co_name), code.co_firstlineno)
+                    on_stack.add(function)
+                    if innermost is None and frame.f_lineno is not None:
+                        innermost = (function, frame.f_lineno)
+                frame = frame.f_back
+            self.samples += 1
+            self.inclusive.update(on_stack)
+            if innermost:
+                self.lines[innermost] += 1
+            time.sleep(self.interval)
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="sampler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+
+    def hot_functions(self, count=TOP_FUNCTIONS):
+        """
+        Returns the count functions with the most inclusive samples, each with its share of all
+        samples and its hottest lines.
+        """
+        hot = []
+        for (name, line), samples in self.inclusive.most_common(count):
+            lines = sorted(((line_no, n) for (function, line_no), n in self.lines.items() if function == (name, line)), key=lambda pair: -pair[1])
+            hot.append({
+                "function": name,
+                "line": line,
+                "share": samples / self.samples if self.samples else 0.0,
+                "hot_lines": [{"line": line_no, "share": n / self.samples} for line_no, n in lines[:3]],
+            })
+        return hot
+
+
+def load_game_class(path):
+    """
+    Imports the game at path (without running its main guard) and returns its GameApp subclass.
+    """
+    from game_builder_crew.runtime import GameApp
+
+    spec = importlib.util.spec_from_file_location("candidate_game", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    classes = [value for value in vars(module).values()
+               if isinstance(value, type) and issubclass(value, GameApp) and value is not GameApp and value.__module__ == module.__name__]
+    if not classes:
+        raise ValueError("No GameApp subclass found; the game must build on game_builder_crew.runtime")
+    # The most derived class if the game defines several
+    return max(classes, key=lambda cls: len(cls.__mro__))
+
+
+def stress_events(app, rng):
+    # Random key presses: mostly mapped controls, some letters (typing games use on_event).
+    import pygame
+
+    mapped = [key for keys in app.controls.values() for key in keys if key != app.quit_key]
+    for _ in range(KEYS_PER_FRAME):
+        if mapped and rng.random() < 0.7:
+            key = rng.choice(mapped)
+            unicode = ""
+        else:
+            unicode = rng.choice(LETTER_KEYS)
+            key = pygame.key.key_code(unicode)
+        pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=key, unicode=unicode, mod=0, scancode=0))
+        pygame.event.post(pygame.event.Event(pygame.KEYUP, key=key, unicode=unicode, mod=0, scancode=0))
+
+
+def run_gate(path, frames=STRESS_FRAMES, budget_ms=FRAME_BUDGET_MS, seed=0):
+    """
+    Runs the game at path under the stress load in this process and returns the gate report
+    (a dict: passed, the work percentiles, per-phase means, hot functions, or the error).
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    from game_builder_crew.profiler import PHASE_INDEX, FrameProfiler
+
+    report = {"path": path, "frames": frames, "budget_ms": budget_ms, "percentile": BUDGET_PERCENTILE}
+    rng = random.Random(seed)
+    sampler = SamplingProfiler(path)
+    try:
+        game_class = load_game_class(path)
+        report["game"] = game_class.__name__
+        profiler = FrameProfiler(game_class.__name__, capacity=frames + WARMUP_FRAMES)
+        app = game_class(headless=True, profiler=profiler)
+        for frame in range(frames + WARMUP_FRAMES):
+            if frame == WARMUP_FRAMES:
+                sampler.start()
+            stress_events(app, rng)
+            app.running = True # A game that quits is simply kept going
+            app.step()
+            app.render() # Headless steps don't draw; the gate times drawing too
+            profiler.mark("draw")
+        sampler.stop()
+        profiler.close()
+    except (Exception, SystemExit): # Generated code may call sys.exit()
+        if sampler.running:
+            sampler.stop()
+        report.update(passed=False, error=traceback.format_exc(limit=-6))
+        return report
+
+    samples = profiler.recorded()[WARMUP_FRAMES:]
+    work = samples.sum(axis=1) - samples[:, PHASE_INDEX["tick"]]
+    p50, p_budget, p99 = np.percentile(work, [50, BUDGET_PERCENTILE, 99])
+    report.update(
+        passed=bool(p_budget <= budget_ms),
+        work_ms={"p50": float(p50), f"p{BUDGET_PERCENTILE}": float(p_budget), "p99": float(p99), "max": float(work.max())},
+        phase_mean_ms={phase: float(samples[:, index].mean()) for phase, index in PHASE_INDEX.items() if phase != "tick"},
+        hot_functions=sampler.hot_functions(),
+    )
+    return report
+
+
+def gate_env(home):
+    """
+    Returns the environment a candidate game runs in: only PATH, the SDL settings, this
+    process's import path and HOME pointed at home. Generated code is untrusted, so API keys
+    and everything else in os.environ stay out of its reach. This is not a sandbox: the game
+    still runs as the current user.
+    """
+    env = {name: value for name, value in os.environ.items() if name == "PATH" or name.startswith("SDL_")}
+    env.update(PYTHONPATH=os.pathsep.join(os.path.abspath(entry) for entry in sys.path), HOME=home)
+    return env
+
+
+def run_in_subprocess(module, code, args, timeout=GATE_TIMEOUT_S):
+    """
+    Writes game source code to a temporary directory, runs python -m module on it there with
+    args and --json in the environment from gate_env(), and returns the JSON report the module
+    prints last (or a failed report with the error if it crashed or timed out).
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "candidate_game.py")
+        with open(path, "w", encoding="utf-8") as game_file:
+            game_file.write(code)
+        command = [sys.executable, "-m", module, path, "--json"] + [str(arg) for arg in args]
+        try:
+            result = subprocess.run(command, capture_output=True, text=True, timeout=timeout, cwd=directory, env=gate_env(directory))
+        except subprocess.TimeoutExpired:
+            return {"passed": False, "error": f"The game did not finish its headless run within {timeout}s (infinite loop or blocking call?)"}
+        lines = result.stdout.strip().splitlines()
+        try:
+            return json.loads(lines[-1])
+        except (IndexError, json.JSONDecodeError):
+            return {"passed": False, "error": (result.stderr or result.stdout)[-2000:]}
+
+
+def gate_code(code, frames=STRESS_FRAMES, budget_ms=FRAME_BUDGET_MS, timeout=GATE_TIMEOUT_S):
+    """
+    Runs the gate on game source code in a subprocess and returns its report.
+    """
+    return run_in_subprocess("game_builder_crew.perf_gate", code, ["--frames", frames, "--budget", budget_ms], timeout)
+
+
+def format_report(report):
+    """
+    Returns the report as the text the reviewer gets: the verdict, the frame times and, on
+    failure, the hottest functions of the game as concrete optimization targets.
+    """
+    if report.get("error"):
+        return ("PERFORMANCE GATE: FAILED - the game crashed or hung during a headless stress run.\n"
+                f"Fix this error first:\n{report['error']}")
+    work = report["work_ms"]
+    percentile = f"p{report['percentile']}"
+    lines = [
+        f"PERFORMANCE GATE: {'PASSED' if report['passed'] else 'FAILED'} - frame work {percentile} {work[percentile]:.2f} ms "
+        f"(budget {report['budget_ms']:.1f} ms), p50 {work['p50']:.2f} ms, max {work['max']:.2f} ms over {report['frames']} stress frames.",
+        "Mean per phase: " + ", ".join(f"{phase} {ms:.2f} ms" for phase, ms in report["phase_mean_ms"].items()) + ".",
+    ]
+    if not report["passed"]:
+        lines.append("Optimize these hot functions (share of frame time; hottest lines):")
+        for hot in report["hot_functions"]:
+            hot_lines = ", ".join(f"line {entry['line']} {entry['share']:.0%}" for entry in hot["hot_lines"])
+            lines.append(f"  - {hot['function']} (defined at line {hot['line']}): {hot['share']:.0%} of frame time; {hot_lines}")
+        lines.append("Typical fixes: draw static content (grids, walls, backgrounds) once onto a cached surface and blit it; "
+                     "render text only when it changes; index collections instead of scanning lists on every event or frame.")
+    return "\n".join(lines)
+
+
+def review_guardrail(output):
+    """
+    crewai guardrail for code_task: runs the performance and memory gates on the engineer's code
+    and appends their failure reports to the task output, so review_task sees them next to the
+    code. Only a memory gate failure in reject mode (memory_gate.ENV_GATE) blocks the task, which
+    makes crewai send the report back to the engineer for another attempt.
+    """
+    from game_builder_crew import memory_gate
+    from game_builder_crew.game_library import strip_code_fences
+    from game_builder_crew.log_sink import get_sink
+
+    code = strip_code_fences(output.raw)
+    reports = []
+    if os.environ.get(ENV_GATE, "1") not in ("", "0"):
+        report = gate_code(code)
+        get_sink().info("perf_gate", passed=report["passed"], work_ms=report.get("work_ms"), error=report.get("error"))
+        if not report["passed"]:
+            reports.append(format_report(report))
+    memory_mode = os.environ.get(memory_gate.ENV_GATE, memory_gate.MODE_REVIEW)
+    if memory_mode not in ("", "0"):
+        report = memory_gate.gate_code(code)
+        get_sink().info("memory_gate", passed=report["passed"], metrics=report.get("metrics"), error=report.get("error"))
+        if not report["passed"]:
+            if memory_mode == memory_gate.MODE_REJECT:
+                return False, "\n\n".join(reports + [memory_gate.format_report(report)])
+            reports.append(memory_gate.format_report(report))
+    if not reports:
+        return True, output.raw
+    return True, "\n\n".join([output.raw] + reports)
+
+
+# --- Command Line ---
+# python -m game_builder_crew.perf_gate game.py [--frames N] [--budget MS] [--json]
+# Exits with status 1 if the game fails the gate.
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    as_json = "--json" in args
+    frames = int(args[args.index("--frames") + 1]) if "--frames" in args else STRESS_FRAMES
+    budget = float(args[args.index("--budget") + 1]) if "--budget" in args else FRAME_BUDGET_MS
+    gate_report = run_gate(args[0], frames, budget)
+    if as_json:
+        print(json.dumps(gate_report))
+    else:
+        print(format_report(gate_report))
+    sys.exit(0 if gate_report["passed"] else 1)
@@ -0,0 +1,167 @@
+import json
+import os
+import time
+
+import numpy as np
+import pygame
+
+# --- Phases ---
+# Every game loop is split into the same four phases. "tick" is the time spent in
+# clock.tick(), i.e. waiting for the frame cap; the rest of the frame is the game's own work.
+PHASES = ("events", "update", "draw", "tick")
+PHASE_INDEX = {phase: index for index, phase in enumerate(PHASES)}
+
+DEFAULT_CAPACITY = 1200 # Frames kept in the ring buffer (20 seconds at 60 FPS)
+OVERLAY_REFRESH_FRAMES = 30 # The overlay text is re-rendered this often, not every frame
+OVERLAY_FONT_SIZE = 20
+OVERLAY_COLOR = (255, 255, 255)
+OVERLAY_BACKGROUND = (0, 0, 0)
+
+# Environment variables read by get_profiler(), so any game can be profiled without code changes:
+#   GAME_PROFILE=1           record phase timings
+#   GAME_PROFILE_OVERLAY=1   also draw the on-screen overlay
+#   GAME_PROFILE_JSON=path   where to write the dump on exit (default: <game>-profile.json)
+ENV_PROFILE = "GAME_PROFILE"
+ENV_OVERLAY = "GAME_PROFILE_OVERLAY"
+ENV_JSON = "GAME_PROFILE_JSON"
+
+
+class FrameProfiler:
+    """
+    Records per-phase frame timings of a game loop into a ring buffer holding the last
+    capacity frames. The loop calls begin_frame() at the top of every iteration and
+    mark(phase) right after each phase; each mark charges the time since the previous mark
+    (or the frame start) to that phase, so the order of the phases in the loop doesn't matter.
+    The game's draw calls draw_overlay(screen) just before its display flip, and the loop
+    calls close() when it exits to write the JSON dump.
+    """
+    def __init__(self, game_name, capacity=DEFAULT_CAPACITY, overlay=False, dump_path=None):
+        self.game_name = game_name
+        self.capacity = capacity
+        self.overlay = overlay
+        self.dump_path = dump_path
+
+        self.samples = np.zeros((capacity, len(PHASES)), dtype=np.float64) # Milliseconds
+        self.frames = 0 # Completed frames (may exceed capacity; older ones are overwritten)
+        self.current = None # Phase timings of the frame in progress
+        self.last_mark = 0.0
+
+        self.font = None
+        self.overlay_surfaces = []
+
+    def begin_frame(self):
+        now = time.perf_counter()
+        if self.current is not None:
+            self.samples[self.frames % self.capacity] = self.current
+            self.frames += 1
+        self.current = [0.0] * len(PHASES)
+        self.last_mark = now
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.current[PHASE_INDEX[phase]] += (now - self.last_mark) * 1000
+        self.last_mark = now
+
+    def recorded(self):
+        """
+        Returns the recorded frames, oldest first, as a (frames, phases) array in milliseconds.
+        """
+        if self.frames <= self.capacity:
+            return self.samples[:self.frames]
+        return np.roll(self.samples, -(self.frames % self.capacity), axis=0)
+
+    def summary(self):
+        """
+        Returns mean/p50/p99/max per phase, plus for the whole frame and for the frame
+        without the tick (the work the game itself does), over the recorded frames.
+        """
+        recorded = self.recorded()
+        columns = {phase: recorded[:, index] for index, phase in enumerate(PHASES)}
+        columns["frame"] = recorded.sum(axis=1)
+        columns["work"] = columns["frame"] - columns["tick"]
+        summary = {}
+        for name, values in columns.items():
+            if len(values) == 0:
+                summary[name] = {"mean": 0.0, "p50": 0.0, "p99": 0.0, "max": 0.0}
+                continue
+            p50, p99 = np.percentile(values, [50, 99])
+            summary[name] = {"mean": float(values.mean()), "p50": float(p50), "p99": float(p99), "max": float(values.max())}
+        return summary
+
+    def draw_overlay(self, screen):
+        # Frame time, its p50/p99, and update vs draw, in the bottom-left corner. The text only
+        # changes every OVERLAY_REFRESH_FRAMES frames; in between the cached surfaces are blitted.
+        if not self.overlay:
+            return
+        if self.frames % OVERLAY_REFRESH_FRAMES == 0 or not self.overlay_surfaces:
+            if self.font is None:
+                self.font = pygame.font.Font(None, OVERLAY_FONT_SIZE)
+            stats = self.summary()
+            frame, update, draw = stats["frame"], stats["update"], stats["draw"]
+            lines = [
+                f"frame {frame['mean']:.2f} ms  p50 {frame['p50']:.2f}  p99 {frame['p99']:.2f}  (work p99 {stats['work']['p99']:.2f})",
+                f"update p50 {update['p50']:.2f} p99 {update['p99']:.2f}  |  draw p50 {draw['p50']:.2f} p99 {draw['p99']:.2f}",
+            ]
+            self.overlay_surfaces = [self.font.render(line, True, OVERLAY_COLOR, OVERLAY_BACKGROUND) for line in lines]
+
+        y = screen.get_height()
+        for surface in reversed(self.overlay_surfaces):
+            y -= surface.get_height()
+            screen.blit(surface, (0, y))
+
+    def close(self):
+        """
+        Finishes the frame in progress and writes the JSON dump if a dump path is set.
+        """
+        if self.current is not None:
+            self.samples[self.frames % self.capacity] = self.current
+            self.frames += 1
+            self.current = None
+        if self.dump_path:
+            self.dump(self.dump_path)
+
+    def dump(self, path):
+        report = {
+            "game": self.game_name,
+            "phases": list(PHASES),
+            "frames": self.frames,
+            "capacity": self.capacity,
+            "summary": self.summary(),
+            "samples_ms": self.recorded().round(4).tolist(), # One [events, update, draw, tick] row per frame
+        }
+        with open(path, "w") as dump_file:
+            json.dump(report, dump_file)
+
+
+class NullProfiler:
+    """
+    Stand-in used when profiling is off; every hook is a no-op.
+    """
+    def begin_frame(self):
+        pass
+
+    def mark(self, phase):
+        pass
+
+    def draw_overlay(self, screen):
+        pass
+
+    def close(self):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+def get_profiler(game_name, profiler=None):
+    """
+    Returns the profiler a game should use: the one passed in, else one configured from the
+    GAME_PROFILE* environment variables, else NULL_PROFILER.
+    """
+    if profiler is not None:
+        return profiler
+    if os.environ.get(ENV_PROFILE, "") in ("", "0"):
+        return NULL_PROFILER
+    overlay = os.environ.get(ENV_OVERLAY, "") not in ("", "0")
+    dump_path = os.environ.get(ENV_JSON) or f"{game_name}-profile.json"
+    return FrameProfiler(game_name, overlay=overlay, dump_path=dump_path)
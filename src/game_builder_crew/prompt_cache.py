@@ -0,0 +1,340 @@
+import atexit
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+import yaml
+
+from game_builder_crew.game_library import estimate_tokens
+
+# --- Prompt Layout ---
+# Every prompt the crew sends is laid out static-first so its beginning is byte-identical
+# across calls and runs:
+#   1. the agent's system message (role, goal, backstory and crewai's format instructions)
+#   2. the static head of the task description (everything before the first {input}; tasks.yaml
+#      keeps the inputs at the end of each description)
+#   3. the rest: the per-game inputs, the expected output, the context from earlier tasks
+#      (the design document) and the agent's scratchpad, which only ever grows at the end
+# The cacheable prefix of a call starts as 1 and 2, and grows to the longest run of leading
+# messages an earlier call already sent (an agent's next iteration re-sends its previous prompt,
+# including the design document, plus new messages; hedged duplicates re-send it unchanged).
+# Those messages are marked with cache_control. The Gemini backend (llm_router.py) creates an
+# explicit cached content for a marked prefix once per key through google-genai and sends only
+# the rest of the prompt with it; the cached contents it created are registered here, by prefix
+# hash, so later calls and runs reuse them until they expire. The hit accounting comes from the
+# token counts the provider reports (cached_content_token_count, which includes Gemini's implicit
+# caching), not from the registry.
+MIN_CACHE_TOKENS = 1024 # Gemini 2.5 Flash rejects smaller cached contents
+CACHE_TTL_S = 3600 # Lifetime of the cached contents the backend creates
+CACHED_TOKEN_PRICE = 0.25 # Price of a cached input token relative to an uncached one
+SAVE_INTERVAL_S = 30.0 # The registry is written at most this often, and on exit
+
+# Environment variables
+#   GAME_LLM_CONTEXT_CACHE=0       turn explicit context caching off
+#   GAME_LLM_CACHE_FILE=path       where the registry of cached contents is kept between runs
+ENV_CONTEXT_CACHE = "GAME_LLM_CONTEXT_CACHE"
+ENV_CACHE_FILE = "GAME_LLM_CACHE_FILE"
+DEFAULT_CACHE_FILE = ".llm_context_cache.json"
+
+CACHE_CONTROL = {"type": "ephemeral"}
+_PLACEHOLDER = re.compile(r"\{[A-Za-z_][A-Za-z0-9_\-]*\}")
+
+
+def static_head(template):
+    """
+    Returns the part of a task description template before its first {input} placeholder.
+    """
+    match = _PLACEHOLDER.search(template)
+    return template[:match.start()] if match else template
+
+
+def message_text(message):
+    content = message["content"]
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") for block in content)
+
+
+def is_marked(message):
+    # Whether prepare() marked message as part of the cacheable prefix.
+    content = message["content"]
+    return not isinstance(content, str) and any("cache_control" in block for block in content)
+
+
+def split_marked(messages):
+    """
+    Returns (prefix, rest): the leading messages prepare() marked for caching and the others.
+    """
+    if isinstance(messages, str):
+        return [], [{"role": "user", "content": messages}]
+    length = 0
+    while length < len(messages) and is_marked(messages[length]):
+        length += 1
+    return messages[:length], messages[length:]
+
+
+def prefix_hashes(messages):
+    """
+    Returns a chained hash for every prefix of messages: entry k identifies messages[:k + 1].
+    """
+    hashes = []
+    digest = hashlib.sha256()
+    for message in messages:
+        digest.update(message["role"].encode())
+        digest.update(b"\0")
+        digest.update(message_text(message).encode())
+        digest.update(b"\0")
+        hashes.append(digest.copy().hexdigest()[:32])
+    return hashes
+
+
+class ContextCache:
+    """
+    Splits prompts into a cacheable prefix and the rest (see Prompt Layout above) and marks the
+    prefix for the backend. Keeps the registry of the cached contents backends created (per
+    prefix hash: its token count and the content name and expiry per backend), the prompts
+    sent recently, and the hit accounting per stage from the provider's token counts.
+    """
+    def __init__(self, static_heads=(), enabled=True, path=None, min_tokens=MIN_CACHE_TOKENS, ttl_s=CACHE_TTL_S, clock=time.time):
+        self.static_heads = sorted((head for head in static_heads if head.strip()), key=len, reverse=True)
+        self.enabled = enabled
+        self.path = path
+        self.min_tokens = min_tokens
+        self.ttl_s = ttl_s
+        self.clock = clock
+        self.entries = {} # prefix hash -> {"tokens": n, "names": {backend: [name or None, expires_at]}}
+        self.seen = {} # Hash of every prompt sent -> expiry, so later calls can find their longest seen prefix
+        self.stats = {}
+        self.lock = threading.Lock() # Crews running concurrently share one cache
+        self.saved_at = clock()
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as cache_file:
+                saved = json.load(cache_file)
+            # Files from before the registry kept content names hold nothing reusable
+            self.entries = {key: entry for key, entry in saved.get("entries", {}).items() if isinstance(entry, dict)}
+            self.seen = saved["seen"] if isinstance(saved.get("seen"), dict) else {}
+            self.prune()
+
+    def prune(self):
+        # Drops expired registry entries and prompts; called with the lock held (or in __init__).
+        now = self.clock()
+        for key in list(self.entries):
+            names = self.entries[key]["names"]
+            for backend in [backend for backend, (_, expires_at) in names.items() if expires_at <= now]:
+                del names[backend]
+            if not names:
+                del self.entries[key]
+        self.seen = {key: expires_at for key, expires_at in self.seen.items() if expires_at > now}
+
+    def live(self, key, now):
+        # Whether some backend has a cached content for the prefix hash key.
+        entry = self.entries.get(key)
+        return bool(entry) and any(name and expires_at > now for name, expires_at in entry["names"].values())
+
+    def split_static_head(self, messages):
+        # Splits the first user message after the longest registered static head it contains.
+        for index, message in enumerate(messages):
+            if message["role"] != "user" or not isinstance(message["content"], str):
+                continue
+            content = message["content"]
+            for head in self.static_heads:
+                position = content.find(head)
+                if position >= 0:
+                    cut = position + len(head)
+                    if cut < len(content):
+                        return messages[:index] + [
+                            {"role": "user", "content": content[:cut]},
+                            {"role": "user", "content": content[cut:]},
+                        ] + messages[index + 1:], index + 1
+                    return messages, index + 1
+            return messages, index
+        return messages, len(messages)
+
+    def layout(self, messages):
+        """
+        Returns (messages, prefix_length, hashes, tokens): the messages with the static head split
+        off, the number of leading messages that form the cacheable prefix, the prefix hashes and
+        the cumulative token counts (tokens[k] covers messages[:k]).
+
+        The prefix is the longest one with a live cached content. A longer prefix sent before (or
+        the static prefix, when nothing is cached yet) is cached instead when it adds at least as
+        many tokens as the live content covers, since a call can only use one cached content.
+        """
+        messages, static_length = self.split_static_head(list(messages))
+        hashes = prefix_hashes(messages)
+        tokens = [0]
+        for message in messages:
+            tokens.append(tokens[-1] + estimate_tokens(message_text(message)))
+        now = self.clock()
+        # The last message is never part of the prefix: every call sends something uncached.
+        lengths = range(1, len(messages))
+        live_length = max((k for k in lengths if self.live(hashes[k - 1], now)), default=0)
+        seen_length = max((k for k in lengths if self.seen.get(hashes[k - 1], 0) > now), default=0)
+        grow_length = max(seen_length, min(static_length, len(messages) - 1))
+        if tokens[grow_length] - tokens[live_length] >= max(tokens[live_length], self.min_tokens):
+            return messages, grow_length, hashes, tokens
+        return messages, live_length, hashes, tokens
+
+    def prepare(self, messages, stage="default"):
+        """
+        Returns the messages to send, with the cacheable prefix marked for the backend when it is
+        large enough to be cached.
+        """
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        with self.lock:
+            messages, prefix_length, hashes, tokens = self.layout(messages)
+            self.seen[hashes[-1]] = self.clock() + self.ttl_s
+        self.save_if_due()
+        if self.enabled and prefix_length > 0 and tokens[prefix_length] >= self.min_tokens:
+            messages = [
+                {"role": message["role"], "content": [{"type": "text", "text": message_text(message), "cache_control": CACHE_CONTROL}]}
+                if index < prefix_length else message
+                for index, message in enumerate(messages)
+            ]
+        return messages
+
+    def lookup(self, backend, prefix):
+        """
+        Returns (key, entry) for the marked prefix messages: the prefix hash and the live
+        [name, expires_at] backend registered for it, or None. name is None after the backend
+        failed to create a cached content, until that record expires.
+        """
+        key = prefix_hashes(prefix)[-1]
+        with self.lock:
+            entry = self.entries.get(key, {"names": {}})["names"].get(backend)
+            return key, (entry if entry and entry[1] > self.clock() else None)
+
+    def store(self, backend, key, name, tokens, expires_at=None):
+        """
+        Registers the cached content backend created for the prefix hash key (name None records
+        a failed attempt, so it isn't retried on every call) and saves the registry.
+        """
+        with self.lock:
+            entry = self.entries.setdefault(key, {"tokens": tokens, "names": {}})
+            entry["names"][backend] = [name, expires_at or self.clock() + self.ttl_s]
+        self.save()
+
+    def record(self, stage, input_tokens, cached_tokens):
+        """
+        Adds one call's token counts as reported by the provider to the hit accounting.
+        """
+        with self.lock:
+            stats = self.stats.setdefault(stage, {"calls": 0, "hits": 0, "cached_tokens": 0, "input_tokens": 0})
+            stats["calls"] += 1
+            stats["hits"] += cached_tokens > 0
+            stats["cached_tokens"] += cached_tokens
+            stats["input_tokens"] += input_tokens
+
+    def totals(self):
+        totals = {"calls": 0, "hits": 0, "cached_tokens": 0, "input_tokens": 0}
+        with self.lock:
+            for stats in self.stats.values():
+                for key in totals:
+                    totals[key] += stats[key]
+        return totals
+
+    def report(self):
+        """
+        Returns the hit accounting per stage and overall, with the share of input tokens the
+        provider served from its cache and the input cost relative to sending everything uncached.
+        """
+        lines = []
+        for stage, stats in list(self.stats.items()) + [("total", self.totals())]:
+            input_tokens = stats["input_tokens"]
+            uncached = input_tokens - stats["cached_tokens"]
+            cost = (uncached + stats["cached_tokens"] * CACHED_TOKEN_PRICE) / input_tokens if input_tokens else 1.0
+            lines.append(
+                f"{stage:>10}: {stats['calls']:3d} calls  {stats['hits']:3d} with cached tokens  "
+                f"{stats['cached_tokens']:7d} cached / {input_tokens:7d} input tokens  input cost {cost:.0%}"
+            )
+        return "\n".join(lines)
+
+    def save_if_due(self):
+        if self.clock() - self.saved_at >= SAVE_INTERVAL_S:
+            self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        with self.lock:
+            self.prune()
+            self.saved_at = self.clock()
+            data = json.dumps({"entries": self.entries, "seen": self.seen})
+        with open(f"{self.path}.tmp", "w", encoding="utf-8") as cache_file:
+            cache_file.write(data)
+        os.replace(f"{self.path}.tmp", self.path)
+
+
+def load_static_heads(tasks_config):
+    """
+    Returns the static heads of all task descriptions in a tasks.yaml dict or path.
+    """
+    if isinstance(tasks_config, str):
+        with open(tasks_config, "r", encoding="utf-8") as tasks_file:
+            tasks_config = yaml.safe_load(tasks_file)
+    return [static_head(task["description"]) for task in tasks_config.values()]
+
+
+def build_context_cache(tasks_config):
+    enabled = os.environ.get(ENV_CONTEXT_CACHE, "1") not in ("", "0")
+    cache = ContextCache(load_static_heads(tasks_config), enabled=enabled, path=os.environ.get(ENV_CACHE_FILE, DEFAULT_CACHE_FILE))
+    atexit.register(cache.save)
+    return cache
+
+
+# --- Command Line ---
+# Simulates two runs of the crew on the same game with crewai's prompt layout (system message,
+# task prompt with context, then a few scratchpad iterations per task) against a simulated
+# provider that serves a registered prefix from its cache, and prints the hit accounting of
+# each, without calling any API.
+if __name__ == "__main__":
+    config_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config")
+    with open(os.path.join(config_dir, "tasks.yaml"), "r", encoding="utf-8") as tasks_file:
+        tasks = yaml.safe_load(tasks_file)
+    with open(os.path.join(config_dir, "agents.yaml"), "r", encoding="utf-8") as agents_file:
+        agents = yaml.safe_load(agents_file)
+    with open(os.path.join(config_dir, "gamedesign.yaml"), "r", encoding="utf-8") as design_file:
+        idea = yaml.safe_load(design_file)["example3_snake"]
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+    stages = [
+        ("design_task", "game_designer_agent", ""),
+        ("code_task", "senior_engineer_agent", "design"),
+        ("review_task", "qa_engineer_agent", "design code"),
+        ("evaluate_task", "chief_qa_engineer_agent", "design review"),
+    ]
+    inputs = {"game": idea, "reference_code": "class Snake:\n    pass\n" * 200}
+    outputs = {"design": "Technical design document. " * 400, "code": "x = 1\n" * 1500, "review": "y = 2\n" * 1500}
+    format_instructions = "\nTo give my best complete final answer to the task respond using the exact following format:\n" * 12
+
+    for run in (1, 2):
+        cache = ContextCache(load_static_heads(tasks))
+        if run == 2:
+            cache.entries, cache.seen = previous.entries, previous.seen
+        for task_name, agent_name, context in stages:
+            agent_config = agents[agent_name]
+            system = f"You are {agent_config['role']}. {agent_config['backstory']}\nYour personal goal is: {agent_config['goal']}{format_instructions}"
+            description = _PLACEHOLDER.sub(lambda match: inputs[match.group()[1:-1]], tasks[task_name]["description"])
+            user = f"\nCurrent Task: {description}\n\nThis is the expected criteria for your final answer: {tasks[task_name]['expected_output']}"
+            user += "\n\nThis is the context you're working with:\n" + "\n".join(outputs[name] for name in context.split())
+            messages = [{"role": "system", "content": system}, {"role": "user", "content": user}]
+            for iteration in range(iterations):
+                prefix, rest = split_marked(cache.prepare(messages, task_name))
+                prefix_tokens = sum(estimate_tokens(message_text(message)) for message in prefix)
+                total_tokens = prefix_tokens + sum(estimate_tokens(message_text(message)) for message in rest)
+                cached_tokens = 0
+                if prefix:
+                    key, entry = cache.lookup("simulated", prefix)
+                    if entry:
+                        cached_tokens = prefix_tokens
+                    else:
+                        cache.store("simulated", key, f"cachedContents/{key}", prefix_tokens)
+                cache.record(task_name, total_tokens, cached_tokens)
+                messages = messages + [{"role": "assistant", "content": f"Thought: step {iteration}\n" * 50}, {"role": "user", "content": "Observation: continue"}]
+        print(f"Run {run}:\n{cache.report()}\n")
+        previous = cache
@@ -0,0 +1,324 @@
+import argparse
+import gzip
+import importlib
+import os
+import random
+import struct
+import sys
+import time
+from abc import ABC, abstractmethod
+
+import pygame
+
+# --- Trace Format ---
+# A trace is a gzip stream: one header, then one frame record per clock.tick() call.
+#   header: magic, version, RNG seed, game name
+#   frame:  dt in ms returned by clock.tick(), number of events, then the events that
+#           pygame.event.get() returned since the previous tick
+# Each event is a type byte followed by a type-specific payload.
+TRACE_MAGIC = b"GBTR"
+TRACE_VERSION = 1
+HEADER_FORMAT = "<4sBQ16s"
+FRAME_FORMAT = "<HH"
+MAX_FRAME_DT_MS = 0xFFFF
+
+EVENT_QUIT = 0
+EVENT_KEYDOWN = 1 # key, unicode code point (0 if none)
+EVENT_KEYUP = 2 # key
+EVENT_MOUSEBUTTONDOWN = 3 # button, x, y
+EVENT_PAYLOAD_FORMATS = {
+    EVENT_QUIT: "",
+    EVENT_KEYDOWN: "<iI",
+    EVENT_KEYUP: "<i",
+    EVENT_MOUSEBUTTONDOWN: "<Bhh",
+}
+
+# Game name -> (module, factory, name of the method running the main loop)
+GAMES = {
+    "maze": ("game_builder_crew.maze", lambda m: m.GameManager(m.SCREEN_WIDTH, m.SCREEN_HEIGHT, m.CELL_SIZE), "run"),
+    "snake": ("game_builder_crew.snake", lambda m: m.Game(), "run"),
+    "word": ("game_builder_crew.word", lambda m: m.Game(), "run"),
+    "aaa": ("game_builder_crew.aaa", lambda m: m.GameManager(), "run_game_loop"),
+}
+
+# Originals of everything the trace layer replaces while a session is active.
+_real_event_get = pygame.event.get
+_real_get_ticks = pygame.time.get_ticks
+_real_get_pressed = pygame.key.get_pressed
+_RealClock = pygame.time.Clock
+
+
+def encode_event(event):
+    """
+    Packs a pygame event into its trace record, or returns None for event types
+    the games don't handle (those are not recorded and not delivered).
+    """
+    if event.type == pygame.QUIT:
+        return struct.pack("<B", EVENT_QUIT)
+    if event.type == pygame.KEYDOWN:
+        code_point = ord(event.unicode) if len(event.unicode) == 1 else 0
+        return struct.pack("<BiI", EVENT_KEYDOWN, event.key, code_point)
+    if event.type == pygame.KEYUP:
+        return struct.pack("<Bi", EVENT_KEYUP, event.key)
+    if event.type == pygame.MOUSEBUTTONDOWN:
+        return struct.pack("<BBhh", EVENT_MOUSEBUTTONDOWN, event.button, event.pos[0], event.pos[1])
+    return None
+
+
+def read_event(stream):
+    """
+    Reads one event record from stream and rebuilds the pygame event.
+    """
+    event_type = stream.read(1)[0]
+    payload_format = EVENT_PAYLOAD_FORMATS[event_type]
+    fields = struct.unpack(payload_format, stream.read(struct.calcsize(payload_format))) if payload_format else ()
+    if event_type == EVENT_QUIT:
+        return pygame.event.Event(pygame.QUIT)
+    if event_type == EVENT_KEYDOWN:
+        key, code_point = fields
+        return pygame.event.Event(pygame.KEYDOWN, key=key, unicode=chr(code_point) if code_point else "", mod=0)
+    if event_type == EVENT_KEYUP:
+        return pygame.event.Event(pygame.KEYUP, key=fields[0], mod=0)
+    button, x, y = fields
+    return pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=button, pos=(x, y))
+
+
+class KeyState:
+    """
+    Stand-in for the sequence returned by pygame.key.get_pressed(), indexed by key constant.
+    """
+    def __init__(self, pressed):
+        self.pressed = frozenset(pressed)
+
+    def __getitem__(self, key):
+        return key in self.pressed
+
+
+class TraceClock:
+    """
+    Replaces pygame.time.Clock while a trace session is active; every tick() ends a frame.
+    """
+    def __init__(self, session):
+        self.session = session
+        self.last_dt = 0
+
+    def tick(self, framerate=0):
+        self.last_dt = self.session.end_frame(framerate)
+        return self.last_dt
+
+    def get_time(self):
+        return self.last_dt
+
+
+class TraceSession(ABC):
+    """
+    Base for recording and replaying. While active, the game reads events, key state and
+    time only through this session: time is virtual (the sum of the frame dts so far), so a
+    recorded run and its replay see exactly the same values. Subclasses provide the events
+    (get_events) and the length of each frame (end_frame).
+    """
+    def __init__(self, game_name, seed):
+        if game_name not in GAMES:
+            raise ValueError(f"Unknown game '{game_name}'. Expected one of: {', '.join(GAMES)}")
+        self.game_name = game_name
+        self.seed = seed
+        self.virtual_ms = 0
+        self.frames = 0
+        self.pressed = set()
+        self.game = None
+
+    def get_ticks(self):
+        return self.virtual_ms
+
+    def get_pressed(self):
+        return KeyState(self.pressed)
+
+    def track_keys(self, events):
+        for event in events:
+            if event.type == pygame.KEYDOWN:
+                self.pressed.add(event.key)
+            elif event.type == pygame.KEYUP:
+                self.pressed.discard(event.key)
+
+    @abstractmethod
+    def get_events(self, *args, **kwargs):
+        """
+        Returns the events of the current frame; installed as pygame.event.get.
+        """
+
+    @abstractmethod
+    def end_frame(self, framerate):
+        """
+        Ends the current frame and returns its dt in ms; called by TraceClock.tick.
+        """
+
+    def close(self):
+        pass
+
+    def build_game(self):
+        module_name, factory, _ = GAMES[self.game_name]
+        return factory(importlib.import_module(module_name))
+
+    def run(self):
+        """
+        Seeds the RNG, builds the game and runs its main loop with the session installed.
+        Returns the game instance once the loop exits.
+        """
+        run_method = GAMES[self.game_name][2]
+        pygame.event.get = self.get_events
+        pygame.time.get_ticks = self.get_ticks
+        pygame.key.get_pressed = self.get_pressed
+        pygame.time.Clock = lambda: TraceClock(self)
+        try:
+            random.seed(self.seed)
+            self.game = self.build_game()
+            getattr(self.game, run_method)()
+        except SystemExit:
+            pass # The game loops call sys.exit() when they finish
+        finally:
+            pygame.event.get = _real_event_get
+            pygame.time.get_ticks = _real_get_ticks
+            pygame.key.get_pressed = _real_get_pressed
+            pygame.time.Clock = _RealClock
+            self.close()
+        return self.game
+
+
+class TraceRecorder(TraceSession):
+    """
+    Plays a game interactively and writes its seed, events and frame timings to path.
+    """
+    def __init__(self, game_name, path, seed=None):
+        super().__init__(game_name, seed if seed is not None else random.SystemRandom().getrandbits(63))
+        self.clock = _RealClock()
+        self.pending_events = []
+        self.stream = gzip.open(path, "wb")
+        self.stream.write(struct.pack(HEADER_FORMAT, TRACE_MAGIC, TRACE_VERSION, self.seed, game_name.encode("ascii")))
+
+    def get_events(self, *args, **kwargs):
+        events = []
+        for event in _real_event_get(*args, **kwargs):
+            record = encode_event(event)
+            if record is not None:
+                self.pending_events.append(record)
+                events.append(event)
+        self.track_keys(events)
+        return events
+
+    def end_frame(self, framerate):
+        dt = min(self.clock.tick(framerate), MAX_FRAME_DT_MS)
+        self.write_frame(dt)
+        return dt
+
+    def write_frame(self, dt):
+        self.stream.write(struct.pack(FRAME_FORMAT, dt, len(self.pending_events)))
+        self.stream.write(b"".join(self.pending_events))
+        self.pending_events = []
+        self.virtual_ms += dt
+        self.frames += 1
+
+    def close(self):
+        # Events read after the last tick (usually the QUIT) go into a final zero-length frame.
+        if self.pending_events:
+            self.write_frame(0)
+        self.stream.close()
+
+
+class TraceReplayer(TraceSession):
+    """
+    Drives a game from a recorded trace, headless and without any frame-rate cap.
+    Once the trace is exhausted the game receives QUIT events until its loop exits.
+    """
+    def __init__(self, path):
+        self.stream = gzip.open(path, "rb")
+        magic, version, seed, game_name = struct.unpack(HEADER_FORMAT, self.stream.read(struct.calcsize(HEADER_FORMAT)))
+        if magic != TRACE_MAGIC or version != TRACE_VERSION:
+            raise ValueError(f"{path} is not a version {TRACE_VERSION} game trace")
+        super().__init__(game_name.rstrip(b"\0").decode("ascii"), seed)
+        self.elapsed_s = 0.0
+        self.frame = self.read_frame()
+        self.delivered = False
+
+    def read_frame(self):
+        header = self.stream.read(struct.calcsize(FRAME_FORMAT))
+        if len(header) < struct.calcsize(FRAME_FORMAT):
+            return None
+        dt, event_count = struct.unpack(FRAME_FORMAT, header)
+        return dt, [read_event(self.stream) for _ in range(event_count)]
+
+    def get_events(self, *args, **kwargs):
+        _real_event_get() # Keep the (dummy) SDL event queue drained
+        if self.frame is None:
+            return [pygame.event.Event(pygame.QUIT)]
+        if self.delivered:
+            return []
+        self.delivered = True
+        events = self.frame[1]
+        self.track_keys(events)
+        return events
+
+    def end_frame(self, framerate):
+        if self.frame is None:
+            return 0
+        dt = self.frame[0]
+        self.virtual_ms += dt
+        self.frames += 1
+        self.frame = self.read_frame()
+        self.delivered = False
+        return dt
+
+    def run(self):
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        start = time.perf_counter()
+        game = super().run()
+        self.elapsed_s = time.perf_counter() - start
+        return game
+
+    def close(self):
+        self.stream.close()
+
+
+def record(game_name, path, seed=None):
+    """
+    Records an interactive session of game_name into the trace file at path.
+    """
+    recorder = TraceRecorder(game_name, path, seed)
+    recorder.run()
+    return recorder
+
+
+def replay(path):
+    """
+    Replays the trace at path headlessly. Returns the finished TraceReplayer; its
+    game, frames and elapsed_s attributes describe the run.
+    """
+    replayer = TraceReplayer(path)
+    replayer.run()
+    return replayer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and replay input traces of the bundled games.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = subparsers.add_parser("record", help="Play a game and record the session")
+    record_parser.add_argument("game", choices=sorted(GAMES))
+    record_parser.add_argument("path")
+    record_parser.add_argument("--seed", type=int, default=None)
+
+    replay_parser = subparsers.add_parser("replay", help="Replay a recorded session headlessly")
+    replay_parser.add_argument("path")
+
+    args = parser.parse_args()
+    if args.command == "record":
+        recorder = record(args.game, args.path, args.seed)
+        print(f"Recorded {recorder.frames} frames of {recorder.game_name} (seed {recorder.seed}) to {args.path}")
+    else:
+        replayer = replay(args.path)
+        fps = replayer.frames / replayer.elapsed_s if replayer.elapsed_s else 0.0
+        print(f"Replayed {replayer.frames} frames of {replayer.game_name} in {replayer.elapsed_s:.2f}s ({fps:,.0f} frames/s)")
+        print(f"Virtual session length: {replayer.virtual_ms / 1000:.1f}s")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,19 @@
+"""
+Lightweight runtime for pygame games: subclass GameApp, set title/size/controls and override
+reset/update/draw (and on_action for key presses). See GameApp for the full list of hooks.
+"""
+from game_builder_crew.runtime.app import GAME_OVER, MENU, PAUSED, PLAYING, START_STATES, WIN, GameApp
+from game_builder_crew.runtime.controls import InputMap
+from game_builder_crew.runtime.text import TextRenderer
+
+__all__ = [
+    "GameApp",
+    "InputMap",
+    "TextRenderer",
+    "MENU",
+    "PLAYING",
+    "PAUSED",
+    "GAME_OVER",
+    "WIN",
+    "START_STATES",
+]
@@ -0,0 +1,165 @@
+import os
+
+import pygame
+
+from game_builder_crew.profiler import get_profiler
+from game_builder_crew.runtime.controls import InputMap
+from game_builder_crew.runtime.text import TextRenderer
+
+# Common state names. Games may use any other strings as extra states.
+MENU = "MENU"
+PLAYING = "PLAYING"
+PAUSED = "PAUSED"
+GAME_OVER = "GAME_OVER"
+WIN = "WIN"
+
+# States in which any key press (re)starts the game when start_on_key is set.
+START_STATES = (MENU, GAME_OVER, WIN)
+
+
+class GameApp:
+    """
+    Base class for a pygame game. Subclasses set the class attributes they need and override
+    the hooks; GameApp owns pygame setup, the main loop, the state machine, input mapping,
+    cached text rendering, headless mode and the profiler hooks. A subclass may define __init__;
+    reset() only runs on the first frame, after the subclass has set its own attributes.
+
+    Hooks (all optional):
+      reset()                    set up a new round; called on start() (the first step) and restart()
+      on_action(action)          a key mapped in controls went down this frame
+      on_event(event)            any other pygame event (QUIT and the quit key are handled)
+      update(dt)                 advance the game by dt milliseconds
+      draw(screen)               draw the frame; the screen is already filled with background
+      on_state_change(old, new)  called by set_state() when the state changes
+    """
+    title = "Game"
+    width = 800
+    height = 600
+    fps = 60
+    background = (0, 0, 0) # Fill color before draw(); None skips the fill
+    controls = {} # action -> tuple of pygame key constants
+    initial_state = MENU
+    quit_key = pygame.K_ESCAPE # None disables quitting by key
+    start_on_key = True # Any key press in START_STATES calls restart()
+
+    def __init__(self, headless=False, profiler=None):
+        # Headless runs use the dummy video driver, never draw and advance a fixed 1/fps per frame.
+        self.headless = headless
+        if headless:
+            os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        pygame.init()
+        self.screen = pygame.display.set_mode((self.width, self.height))
+        pygame.display.set_caption(self.title)
+        self.clock = pygame.time.Clock()
+        self.frame_ms = 1000 / self.fps
+
+        self.profiler = get_profiler(self.title.lower().replace(" ", "_"), profiler)
+        self.input = InputMap(self.controls)
+        self.text = TextRenderer()
+
+        self.running = True
+        self.state = self.initial_state
+        self.state_time = 0 # Milliseconds spent in the current state
+        self.started = False # reset() runs lazily, see start()
+
+    # --- Hooks ---
+
+    def reset(self):
+        pass
+
+    def on_action(self, action):
+        pass
+
+    def on_event(self, event):
+        pass
+
+    def update(self, dt):
+        pass
+
+    def draw(self, screen):
+        pass
+
+    def on_state_change(self, old_state, new_state):
+        pass
+
+    # --- State machine ---
+
+    def set_state(self, state):
+        if state != self.state:
+            old_state = self.state
+            self.state = state
+            self.state_time = 0
+            self.on_state_change(old_state, state)
+
+    def start(self):
+        # Sets up the first round once. Called by the first step() or render() rather than by
+        # __init__, so subclass attributes set after super().__init__() exist in reset().
+        if not self.started:
+            self.started = True
+            self.reset()
+
+    def restart(self):
+        # Starts a fresh round in the PLAYING state.
+        self.started = True
+        self.reset()
+        self.state_time = 0
+        self.set_state(PLAYING)
+
+    def quit(self):
+        self.running = False
+
+    # --- Main loop ---
+
+    def handle_event(self, event):
+        if event.type == pygame.QUIT:
+            self.quit()
+            return
+        if event.type == pygame.KEYDOWN:
+            if self.quit_key is not None and event.key == self.quit_key:
+                self.quit()
+                return
+            if self.start_on_key and self.state in START_STATES:
+                self.restart()
+                return
+            actions = self.input.press(event.key)
+            for action in actions:
+                self.on_action(action)
+            if actions:
+                return
+        self.on_event(event)
+
+    def step(self):
+        # One frame: tick, events, update and (unless headless) draw.
+        self.start()
+        self.profiler.begin_frame()
+        dt = self.frame_ms if self.headless else self.clock.tick(self.fps)
+        self.profiler.mark("tick")
+        self.input.begin_frame()
+        for event in pygame.event.get():
+            self.handle_event(event)
+        self.profiler.mark("events")
+        self.state_time += dt
+        self.update(dt)
+        self.profiler.mark("update")
+        if not self.headless:
+            self.render()
+            self.profiler.mark("draw")
+
+    def render(self):
+        self.start()
+        if self.background is not None:
+            self.screen.fill(self.background)
+        self.draw(self.screen)
+        self.profiler.draw_overlay(self.screen)
+        pygame.display.flip()
+
+    def run(self, max_frames=None):
+        """
+        Runs the main loop until quit() is called (or for max_frames frames), then shuts pygame down.
+        """
+        frames = 0
+        while self.running and (max_frames is None or frames < max_frames):
+            self.step()
+            frames += 1
+        self.profiler.close()
+        pygame.quit()
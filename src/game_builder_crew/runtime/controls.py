@@ -0,0 +1,35 @@
+import pygame
+
+
+class InputMap:
+    """
+    Maps action names to keys, e.g. {"left": (pygame.K_LEFT, pygame.K_a), "jump": (pygame.K_SPACE,)}.
+    held(action) reads the keyboard state; pressed(action) is true on the frame a key went down.
+    """
+    def __init__(self, controls):
+        self.controls = {action: tuple(keys) for action, keys in controls.items()}
+        self.key_actions = {} # key -> actions bound to it
+        for action, keys in self.controls.items():
+            for key in keys:
+                self.key_actions.setdefault(key, []).append(action)
+        self.just_pressed = set()
+
+    def begin_frame(self):
+        self.just_pressed.clear()
+
+    def press(self, key):
+        # Records a KEYDOWN and returns the actions bound to the key.
+        actions = self.key_actions.get(key, ())
+        self.just_pressed.update(actions)
+        return actions
+
+    def held(self, action):
+        keys = pygame.key.get_pressed()
+        return any(keys[key] for key in self.controls[action])
+
+    def pressed(self, action):
+        return action in self.just_pressed
+
+    def axis(self, negative, positive):
+        # -1, 0 or 1 from two opposing actions, e.g. axis("left", "right").
+        return int(self.held(positive)) - int(self.held(negative))
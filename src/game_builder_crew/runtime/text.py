@@ -0,0 +1,66 @@
+import pygame
+
+WHITE = (255, 255, 255)
+MAX_CACHED_SURFACES = 512 # Rendered text surfaces kept; the cache is dropped when it grows past this
+
+
+class TextRenderer:
+    """
+    Draws text with cached fonts and rendered surfaces, so text that doesn't change between
+    frames costs a single blit instead of a font load and a render.
+    """
+    def __init__(self, font_name=None):
+        self.font_name = font_name
+        self.fonts = {} # size -> pygame.font.Font
+        self.surfaces = {} # (text, size, color) -> rendered surface
+        self.dim_surfaces = {} # (size, alpha) -> translucent black surface
+
+    def font(self, size):
+        font = self.fonts.get(size)
+        if font is None:
+            font = self.fonts[size] = pygame.font.Font(self.font_name, size)
+        return font
+
+    def render(self, text, size=32, color=WHITE):
+        key = (text, size, color)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            if len(self.surfaces) >= MAX_CACHED_SURFACES:
+                self.surfaces.clear() # Text that changes every frame (timers, scores) must not grow the cache forever
+            surface = self.surfaces[key] = self.font(size).render(text, True, color)
+        return surface
+
+    def draw(self, screen, text, pos, size=32, color=WHITE, anchor="topleft"):
+        # anchor is any pygame.Rect position attribute: "topleft", "center", "midtop", "topright", ...
+        surface = self.render(str(text), size, color)
+        rect = surface.get_rect(**{anchor: pos})
+        screen.blit(surface, rect)
+        return rect
+
+    def draw_centered(self, screen, text, y_offset=0, size=48, color=WHITE):
+        # Centered horizontally, y_offset pixels below the middle of the screen.
+        center = (screen.get_width() // 2, screen.get_height() // 2 + y_offset)
+        return self.draw(screen, text, center, size, color, anchor="center")
+
+    def draw_hud(self, screen, items, pos=(10, 10), size=28, color=WHITE):
+        # One "Label: value" line per (label, value) pair (or dict item), stacked from pos.
+        x, y = pos
+        pairs = items.items() if isinstance(items, dict) else items
+        for label, value in pairs:
+            rect = self.draw(screen, f"{label}: {value}", (x, y), size, color)
+            y = rect.bottom + 4
+
+    def draw_panel(self, screen, lines, alpha=150):
+        # Dims the whole screen, then draws lines, a list of (text, size, color), centered as a block.
+        key = (screen.get_size(), alpha)
+        dim = self.dim_surfaces.get(key)
+        if dim is None:
+            dim = self.dim_surfaces[key] = pygame.Surface(screen.get_size(), pygame.SRCALPHA)
+            dim.fill((0, 0, 0, alpha))
+        screen.blit(dim, (0, 0))
+
+        surfaces = [self.render(text, size, color) for text, size, color in lines]
+        y = (screen.get_height() - sum(surface.get_height() + 10 for surface in surfaces)) // 2
+        for surface in surfaces:
+            screen.blit(surface, surface.get_rect(midtop=(screen.get_width() // 2, y)))
+            y += surface.get_height() + 10
@@ -1,7 +1,28 @@
 
+import os
 import pygame
 import random
 import sys
+from collections import deque
+
+try:
+    from game_builder_crew.profiler import get_profiler
+except ImportError: # Run as a plain script without the package installed: no profiling
+    class _NoProfiler:
+        def begin_frame(self):
+            pass
+
+        def mark(self, phase):
+            pass
+
+        def draw_overlay(self, screen):
+            pass
+
+        def close(self):
+            pass
+
+    def get_profiler(game_name, profiler=None):
+        return profiler or _NoProfiler()
 
 # 1. Technical Specification (Pygame)
 # 3.1. Display & Window
@@ -18,8 +39,12 @@ RED = (255, 0, 0)
 WHITE = (255, 255, 255)
 
 # 3.4. Timing
-FPS = 15
+# Rendering and simulation run independently: frames are drawn at FPS while the snake
+# moves once every SNAKE_SPEED_MS, driven by a fixed-timestep accumulator.
+FPS = 60
 SNAKE_SPEED_MS = 150
+MAX_TICKS_PER_FRAME = 5 # Caps catch-up ticks after a long frame
+INPUT_BUFFER_SIZE = 3 # Direction presses remembered between ticks
 
 # Directions
 UP = (0, -1)
@@ -31,6 +56,67 @@ RIGHT = (1, 0)
 START_SCREEN = "START_SCREEN"
 PLAYING = "PLAYING"
 GAME_OVER = "GAME_OVER"
+WIN = "WIN" # The snake fills the whole board, leaving no cell for food
+
+# Grid Occupancy
+class GridOccupancy:
+    # Per-cell occupancy counts (a bytearray bitmap over the grid) plus an index of the
+    # free cells, so membership tests, updates and free-cell sampling are all O(1).
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.counts = bytearray(width * height)
+        # free_cells holds the indices of every empty cell in no particular order;
+        # free_slot maps a cell index to its slot in free_cells (-1 when occupied).
+        self.free_cells = list(range(width * height))
+        self.free_slot = list(range(width * height))
+
+    def clear(self):
+        # Marks every cell as free again.
+        self.counts = bytearray(self.width * self.height)
+        self.free_cells = list(range(self.width * self.height))
+        self.free_slot = list(range(self.width * self.height))
+
+    def in_bounds(self, position):
+        x, y = position
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def add(self, position):
+        # Out-of-bounds cells are not tracked; the wall check ends the game for those.
+        if not self.in_bounds(position):
+            return
+        index = position[1] * self.width + position[0]
+        if self.counts[index] == 0:
+            # Swap-remove the cell from the free list.
+            slot = self.free_slot[index]
+            last = self.free_cells.pop()
+            if last != index:
+                self.free_cells[slot] = last
+                self.free_slot[last] = slot
+            self.free_slot[index] = -1
+        self.counts[index] += 1
+
+    def remove(self, position):
+        if not self.in_bounds(position):
+            return
+        index = position[1] * self.width + position[0]
+        self.counts[index] -= 1
+        if self.counts[index] == 0:
+            self.free_slot[index] = len(self.free_cells)
+            self.free_cells.append(index)
+
+    def count(self, position):
+        # Returns how many segments occupy the given cell (0 for out-of-bounds cells).
+        if not self.in_bounds(position):
+            return 0
+        return self.counts[position[1] * self.width + position[0]]
+
+    def random_free_position(self):
+        # Returns a uniformly random free (x, y) cell, or None if the grid is full.
+        if not self.free_cells:
+            return None
+        index = self.free_cells[random.randrange(len(self.free_cells))]
+        return (index % self.width, index // self.width)
 
 # 4.1. Snake Class
 class Snake:
@@ -38,12 +124,10 @@ class Snake:
         # Default: 3 segments long, starting near screen center, moving right.
         # Screen center grid: (GRID_WIDTH // 2, GRID_HEIGHT // 2)
         # For 3 segments moving right, head at (15, 12), body at (14, 12), (13, 12)
-        self.body = [(GRID_WIDTH // 2, GRID_HEIGHT // 2),
-                     (GRID_WIDTH // 2 - 1, GRID_HEIGHT // 2),
-                     (GRID_WIDTH // 2 - 2, GRID_HEIGHT // 2)]
-        self.direction = RIGHT
+        # The body is a deque (head at body[0]) mirrored into an occupancy grid.
+        self.occupancy = GridOccupancy(GRID_WIDTH, GRID_HEIGHT)
         self.color = GREEN
-        self.grow_pending = False
+        self.reset()
 
     def move(self):
         # Calculates new head position based on direction.
@@ -55,11 +139,12 @@ class Snake:
         # allowing the Game class to detect out-of-bounds collisions.
         new_head = (head_x + dir_x, head_y + dir_y)
 
-        self.body.insert(0, new_head) # Inserts new head at body[0].
+        self.body.appendleft(new_head) # Inserts new head at body[0] in O(1).
+        self.occupancy.add(new_head)
 
         # If grow_pending is False, removes the last segment (body.pop()).
         if not self.grow_pending:
-            self.body.pop()
+            self.occupancy.remove(self.body.pop())
         else:
             # Resets grow_pending to False.
             self.grow_pending = False
@@ -85,14 +170,18 @@ class Snake:
         return self.body[0]
 
     def check_collision_self(self):
-        # Returns True if self.get_head_position() is in self.body[1:], False otherwise.
-        return self.body[0] in self.body[1:]
+        # Returns True if the head shares its cell with another segment, False otherwise.
+        # The tail has already been popped by move(), so this matches head in body[1:].
+        return self.occupancy.count(self.body[0]) > 1
 
     def reset(self):
         # Resets the snake to its initial state (position, length, direction).
-        self.body = [(GRID_WIDTH // 2, GRID_HEIGHT // 2),
-                     (GRID_WIDTH // 2 - 1, GRID_HEIGHT // 2),
-                     (GRID_WIDTH // 2 - 2, GRID_HEIGHT // 2)]
+        self.body = deque([(GRID_WIDTH // 2, GRID_HEIGHT // 2),
+                           (GRID_WIDTH // 2 - 1, GRID_HEIGHT // 2),
+                           (GRID_WIDTH // 2 - 2, GRID_HEIGHT // 2)])
+        self.occupancy.clear()
+        for segment in self.body:
+            self.occupancy.add(segment)
         self.direction = RIGHT
         self.grow_pending = False
 
@@ -102,16 +191,15 @@ class Food:
         self.position = (0, 0) # Placeholder, will be randomized by game
         self.color = RED
 
-    def randomize_position(self, occupied_positions):
-        # Generates a new random (x, y) grid coordinate within screen bounds.
-        # Ensures the new position is not present in occupied_positions.
-        while True:
-            x = random.randint(0, GRID_WIDTH - 1)
-            y = random.randint(0, GRID_HEIGHT - 1)
-            new_position = (x, y)
-            if new_position not in occupied_positions:
-                self.position = new_position
-                break
+    def randomize_position(self, occupancy):
+        # Picks a new random (x, y) grid coordinate from the occupancy's free-cell index,
+        # so the position is never on the snake and sampling stays O(1) at any fill level.
+        # Returns False (leaving the position unchanged) if the board is full.
+        new_position = occupancy.random_free_position()
+        if new_position is None:
+            return False
+        self.position = new_position
+        return True
 
     def draw(self, surface):
         # Draws the food item as a filled rectangle.
@@ -124,7 +212,14 @@ class Food:
 
 # 4.3. Game Class
 class Game:
-    def __init__(self):
+    def __init__(self, headless=False, profiler=None):
+        # Headless runs use the dummy video driver, skip drawing and are not frame capped.
+        # profiler is a profiler.FrameProfiler; by default it is configured from the environment.
+        self.profiler = get_profiler("snake", profiler)
+        self.headless = headless
+        if self.headless:
+            os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
         # Initializes Pygame modules.
         pygame.init()
 
@@ -135,7 +230,7 @@ class Game:
         # Creates Snake and Food instances.
         self.snake = Snake()
         self.food = Food()
-        self.food.randomize_position(self.snake.body) # Initial food position
+        self.food.randomize_position(self.snake.occupancy) # Initial food position
 
         # Initializes score = 0, game_state = START_SCREEN.
         self.score = 0
@@ -146,8 +241,13 @@ class Game:
         self.font_large = pygame.font.Font(None, 48) # For titles
         self.font_medium = pygame.font.Font(None, 24) # For score and messages
 
-        # Sets last_move_time to 0.
-        self.last_move_time = 0
+        # Simulation timing: tick_ms is the current move interval (lower it to speed up the
+        # snake) and accumulator_ms the elapsed time not yet consumed by ticks.
+        self.tick_ms = SNAKE_SPEED_MS
+        self.accumulator_ms = 0
+
+        # Arrow key presses queued until the next tick, so quick turns aren't lost.
+        self.input_buffer = deque(maxlen=INPUT_BUFFER_SIZE)
 
         # Pygame time.Clock object.
         self.clock = pygame.time.Clock()
@@ -159,53 +259,75 @@ class Game:
 
         if event.type == pygame.KEYDOWN:
             # Handles state transitions
-            if self.game_state == START_SCREEN or self.game_state == GAME_OVER:
-                self.reset_game()
-                self.game_state = PLAYING
-                self.last_move_time = pygame.time.get_ticks() # Reset timer for new game
+            if self.game_state in (START_SCREEN, GAME_OVER, WIN):
+                self.reset_game() # Also resets the tick accumulator for the new game
                 return True # Event handled, continue game loop
 
-            # Updates snake.direction based on arrow keys. (Only if PLAYING)
+            # Buffers the direction from arrow keys for the next tick. (Only if PLAYING)
             if self.game_state == PLAYING:
                 if event.key == pygame.K_UP:
-                    self.snake.change_direction(UP)
+                    self.input_buffer.append(UP)
                 elif event.key == pygame.K_DOWN:
-                    self.snake.change_direction(DOWN)
+                    self.input_buffer.append(DOWN)
                 elif event.key == pygame.K_LEFT:
-                    self.snake.change_direction(LEFT)
+                    self.input_buffer.append(LEFT)
                 elif event.key == pygame.K_RIGHT:
-                    self.snake.change_direction(RIGHT)
+                    self.input_buffer.append(RIGHT)
         return True # Continue game loop
 
-    def update(self):
-        # If game_state == PLAYING:
-        if self.game_state == PLAYING:
-            current_time = pygame.time.get_ticks()
-            # If current_time - self.last_move_time > SNAKE_SPEED_MS:
-            if current_time - self.last_move_time > SNAKE_SPEED_MS:
-                self.last_move_time = current_time
-                self.snake.move() # Call self.snake.move().
+    def apply_buffered_input(self):
+        # Applies at most one direction change per tick, skipping buffered presses that
+        # would be ignored (same direction or a 180-degree turn).
+        while self.input_buffer:
+            previous_direction = self.snake.direction
+            self.snake.change_direction(self.input_buffer.popleft())
+            if self.snake.direction != previous_direction:
+                break
+
+    def update(self, dt):
+        # Adds dt milliseconds to the accumulator and runs every tick that is due.
+        if self.game_state != PLAYING:
+            self.accumulator_ms = 0
+            return
+
+        self.accumulator_ms += dt
+        ticks = 0
+        while self.accumulator_ms >= self.tick_ms and self.game_state == PLAYING:
+            self.tick()
+            self.accumulator_ms -= self.tick_ms
+            ticks += 1
+            if ticks >= MAX_TICKS_PER_FRAME:
+                self.accumulator_ms = 0 # Drop the backlog instead of spiralling
+                break
 
-                # Collision Detection:
-                head_x, head_y = self.snake.get_head_position()
+    def tick(self):
+        # Advances the simulation by exactly one snake move.
+        self.apply_buffered_input()
+        self.snake.move() # Call self.snake.move().
 
-                # Check snake.get_head_position() against SCREEN_WIDTH/SCREEN_HEIGHT boundaries.
-                wall_collision = not (0 <= head_x < GRID_WIDTH and 0 <= head_y < GRID_HEIGHT)
+        # Collision Detection:
+        head_x, head_y = self.snake.get_head_position()
 
-                # Check snake.check_collision_self().
-                self_collision = self.snake.check_collision_self()
+        # Check snake.get_head_position() against SCREEN_WIDTH/SCREEN_HEIGHT boundaries.
+        wall_collision = not (0 <= head_x < GRID_WIDTH and 0 <= head_y < GRID_HEIGHT)
 
-                # If any collision, set self.game_state = GAME_OVER.
-                if wall_collision or self_collision:
-                    self.game_state = GAME_OVER
+        # Check snake.check_collision_self().
+        self_collision = self.snake.check_collision_self()
 
-                # Food Consumption:
-                # If snake.get_head_position() == food.get_position():
-                if self.snake.get_head_position() == self.food.get_position():
-                    self.snake.grow_pending = True # Set snake.grow_pending = True.
-                    self.food.randomize_position(self.snake.body) # Call food.randomize_position(self.snake.body).
-                    self.score += 10 # Increment self.score by 10.
-                    # (Optional: Increase SNAKE_SPEED_MS slightly here for progressive difficulty) - Not implemented as per instructions.
+        # If any collision, set self.game_state = GAME_OVER.
+        if wall_collision or self_collision:
+            self.game_state = GAME_OVER
+
+        # Food Consumption:
+        # If snake.get_head_position() == food.get_position():
+        if self.snake.get_head_position() == self.food.get_position():
+            self.snake.grow_pending = True # Set snake.grow_pending = True.
+            self.score += 10 # Increment self.score by 10.
+            # Call food.randomize_position(self.snake.occupancy); no free cell left means the
+            # snake covers the whole board, which wins the game.
+            if not self.food.randomize_position(self.snake.occupancy):
+                self.game_state = WIN
+            # (Optional: Lower self.tick_ms slightly here for progressive difficulty) - Not implemented as per instructions.
 
     def draw_text_centered(self, surface, text, font, color, y_offset=0):
         text_surface = font.render(text, True, color)
@@ -232,25 +354,36 @@ class Game:
             self.draw_text_centered(self.screen, "Game Over!", self.font_large, WHITE, -70)
             self.draw_text_centered(self.screen, f"Final Score: {self.score}", self.font_medium, WHITE, -20)
             self.draw_text_centered(self.screen, "Press any key to restart", self.font_medium, WHITE, 30)
+        elif self.game_state == WIN:
+            # Draws "You Win!", final score, and "Press any key to restart" message centered.
+            self.draw_text_centered(self.screen, "You Win!", self.font_large, WHITE, -70)
+            self.draw_text_centered(self.screen, f"Final Score: {self.score}", self.font_medium, WHITE, -20)
+            self.draw_text_centered(self.screen, "Press any key to restart", self.font_medium, WHITE, 30)
 
+        self.profiler.draw_overlay(self.screen) # Frame timing overlay, when enabled.
         pygame.display.flip() # pygame.display.flip().
 
     def reset_game(self):
         # Calls self.snake.reset().
         self.snake.reset()
-        # Calls self.food.randomize_position(self.snake.body).
-        self.food.randomize_position(self.snake.body)
+        # Calls self.food.randomize_position(self.snake.occupancy); a board the new snake
+        # already fills can never be played.
+        if not self.food.randomize_position(self.snake.occupancy):
+            raise ValueError(f"A {GRID_WIDTH}x{GRID_HEIGHT} grid has no room for food next to the snake")
         # Sets self.score = 0.
         self.score = 0
         # Sets self.game_state = PLAYING.
         self.game_state = PLAYING
-        # Resets self.last_move_time = pygame.time.get_ticks().
-        self.last_move_time = pygame.time.get_ticks()
+        # Clears the tick accumulator, speed and any buffered input.
+        self.tick_ms = SNAKE_SPEED_MS
+        self.accumulator_ms = 0
+        self.input_buffer.clear()
 
     def run(self):
         # The main game loop, handles running boolean.
         running = True
         while running:
+            self.profiler.begin_frame()
             for event in pygame.event.get():
                 # Calls handle_input
                 running = self.handle_input(event)
@@ -259,11 +392,21 @@ class Game:
 
             if not running:
                 break # Exit outer loop if game quits
-
-            self.update() # Calls update
-            self.draw() # Calls draw
-            self.clock.tick(FPS) # pygame.time.Clock().tick(FPS) to cap frame rate.
-
+            self.profiler.mark("events")
+
+            if self.headless:
+                # Uncapped: every loop iteration advances the simulation by one tick.
+                self.update(self.tick_ms)
+                self.profiler.mark("update")
+            else:
+                dt = self.clock.tick(FPS) # Caps the render rate; dt drives the simulation.
+                self.profiler.mark("tick")
+                self.update(dt) # Calls update
+                self.profiler.mark("update")
+                self.draw() # Calls draw
+                self.profiler.mark("draw")
+
+        self.profiler.close() # Writes the profile dump, when enabled.
         pygame.quit() # pygame.quit() when running is False.
         sys.exit()
 
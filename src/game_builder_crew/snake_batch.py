@@ -0,0 +1,190 @@
+import time
+
+import numpy as np
+
+from game_builder_crew.snake import DOWN, GRID_HEIGHT, GRID_WIDTH, LEFT, RIGHT, UP
+
+# Action indices. Ordered so that the opposite of direction d is always d ^ 1.
+DIRECTIONS = (UP, DOWN, LEFT, RIGHT)
+ACTION_UP = 0
+ACTION_DOWN = 1
+ACTION_LEFT = 2
+ACTION_RIGHT = 3
+NO_ACTION = -1 # Keep the current direction
+
+FOOD_POINTS = 10 # Same reward as snake.Game.update
+START_LENGTH = 3 # Same start as snake.Snake.reset
+FOOD_SAMPLE_ATTEMPTS = 4 # Vectorized rejection rounds before the exact fallback
+
+
+class BatchSnakeEnv:
+    """
+    Runs many independent snake games in NumPy arrays and advances them all with one
+    vectorized step(). Rules follow snake.Snake / snake.Game: the snake starts 3 segments
+    long at the grid center moving right, 180-degree turns are ignored, leaving the grid
+    or hitting its own body ends the game, and eating food grows the snake on the next move.
+    No pygame code runs here.
+    """
+    def __init__(self, num_envs, grid_width=GRID_WIDTH, grid_height=GRID_HEIGHT, seed=None, auto_reset=True):
+        self.num_envs = num_envs
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.num_cells = grid_width * grid_height
+        self.auto_reset = auto_reset
+        self.rng = np.random.default_rng(seed)
+
+        self.dir_dx = np.array([d[0] for d in DIRECTIONS], dtype=np.int32)
+        self.dir_dy = np.array([d[1] for d in DIRECTIONS], dtype=np.int32)
+        self.env_ids = np.arange(num_envs)
+
+        # Bodies are ring buffers of cell indices (y * width + x); body[i, head_ptr[i]] is
+        # the head and the next length[i] - 1 slots (mod num_cells) are the rest of the body.
+        self.body = np.zeros((num_envs, self.num_cells), dtype=np.int32)
+        self.head_ptr = np.zeros(num_envs, dtype=np.int64)
+        self.length = np.zeros(num_envs, dtype=np.int64)
+        # Per-game occupancy bitmap, used for O(1) self-collision checks.
+        self.grid = np.zeros((num_envs, self.num_cells), dtype=np.uint8)
+
+        self.head_x = np.zeros(num_envs, dtype=np.int32)
+        self.head_y = np.zeros(num_envs, dtype=np.int32)
+        self.direction = np.zeros(num_envs, dtype=np.int8)
+        self.grow_pending = np.zeros(num_envs, dtype=bool)
+        self.food = np.zeros(num_envs, dtype=np.int64)
+        self.score = np.zeros(num_envs, dtype=np.int64)
+        self.done = np.zeros(num_envs, dtype=bool)
+
+        self.reset()
+
+    def reset(self, mask=None):
+        """
+        Resets the selected games (all of them if mask is None) to the starting state.
+        """
+        ids = self.env_ids if mask is None else np.flatnonzero(mask)
+        if len(ids) == 0:
+            return
+
+        self.grid[ids] = 0
+        start_x = self.grid_width // 2
+        start_y = self.grid_height // 2
+        for offset in range(START_LENGTH):
+            cell = start_y * self.grid_width + (start_x - offset)
+            self.body[ids, offset] = cell
+            self.grid[ids, cell] = 1
+
+        self.head_ptr[ids] = 0
+        self.length[ids] = START_LENGTH
+        self.head_x[ids] = start_x
+        self.head_y[ids] = start_y
+        self.direction[ids] = ACTION_RIGHT
+        self.grow_pending[ids] = False
+        self.score[ids] = 0
+        self.done[ids] = False
+        self._place_food(ids)
+
+    def step(self, actions=None):
+        """
+        Advances every running game by one move.
+        actions holds one action index per game (NO_ACTION keeps the current direction).
+        Returns (rewards, dones) arrays. Finished games are reset afterwards when
+        auto_reset is set, otherwise they stay frozen until reset() is called.
+        """
+        rewards = np.zeros(self.num_envs, dtype=np.int64)
+        alive = np.flatnonzero(~self.done)
+
+        # change_direction: accept any action except a 180-degree turn.
+        if actions is not None:
+            actions = np.asarray(actions)[alive]
+            turn = (actions >= 0) & (actions != (self.direction[alive] ^ 1))
+            self.direction[alive[turn]] = actions[turn]
+
+        # move: compute the new head and end games that leave the grid.
+        direction = self.direction[alive]
+        new_x = self.head_x[alive] + self.dir_dx[direction]
+        new_y = self.head_y[alive] + self.dir_dy[direction]
+        wall = (new_x < 0) | (new_x >= self.grid_width) | (new_y < 0) | (new_y >= self.grid_height)
+        self.done[alive[wall]] = True
+
+        ids = alive[~wall]
+        new_x = new_x[~wall]
+        new_y = new_y[~wall]
+        new_cell = new_y * self.grid_width + new_x
+
+        # Push the head into the ring buffer and the occupancy grid.
+        head_ptr = (self.head_ptr[ids] - 1) % self.num_cells
+        self.head_ptr[ids] = head_ptr
+        self.body[ids, head_ptr] = new_cell
+        self.grid[ids, new_cell] += 1
+        self.head_x[ids] = new_x
+        self.head_y[ids] = new_y
+
+        # Pop the tail unless the snake is growing this move.
+        grow = self.grow_pending[ids]
+        shrink_ids = ids[~grow]
+        tail_ptr = (self.head_ptr[shrink_ids] + self.length[shrink_ids]) % self.num_cells
+        self.grid[shrink_ids, self.body[shrink_ids, tail_ptr]] -= 1
+        self.length[ids[grow]] += 1
+        self.grow_pending[ids] = False
+
+        # check_collision_self: the head's cell is shared with another segment.
+        self_collision = self.grid[ids, new_cell] > 1
+        self.done[ids[self_collision]] = True
+
+        # Food consumption, as in snake.Game.update.
+        ate = new_cell == self.food[ids]
+        eaters = ids[ate]
+        self.grow_pending[eaters] = True
+        self.score[eaters] += FOOD_POINTS
+        rewards[eaters] = FOOD_POINTS
+        self._place_food(eaters)
+
+        dones = self.done.copy()
+        if self.auto_reset and dones.any():
+            self.reset(dones)
+        return rewards, dones
+
+    def _place_food(self, ids):
+        # Rejection sampling is vectorized across games and almost always succeeds within a
+        # few rounds; the rare leftovers (nearly full boards) pick exactly among the free cells.
+        pending = ids
+        for _ in range(FOOD_SAMPLE_ATTEMPTS):
+            if len(pending) == 0:
+                return
+            cells = self.rng.integers(0, self.num_cells, size=len(pending))
+            free = self.grid[pending, cells] == 0
+            self.food[pending[free]] = cells[free]
+            pending = pending[~free]
+
+        for env in pending:
+            free_cells = np.flatnonzero(self.grid[env] == 0)
+            if len(free_cells) == 0:
+                continue # Board is full; leave the food where it is
+            self.food[env] = free_cells[self.rng.integers(len(free_cells))]
+
+    def get_body(self, env):
+        """
+        Returns the body of one game as a list of (x, y) tuples, head first (like Snake.body).
+        """
+        slots = (self.head_ptr[env] + np.arange(self.length[env])) % self.num_cells
+        return [(int(cell % self.grid_width), int(cell // self.grid_width)) for cell in self.body[env, slots]]
+
+    def get_food_position(self, env):
+        """
+        Returns the (x, y) food position of one game.
+        """
+        cell = int(self.food[env])
+        return (cell % self.grid_width, cell // self.grid_width)
+
+
+# --- Throughput check ---
+if __name__ == "__main__":
+    num_envs = 4096
+    num_steps = 1000
+    env = BatchSnakeEnv(num_envs, seed=0)
+    action_rng = np.random.default_rng(1)
+    actions = action_rng.integers(NO_ACTION, 4, size=(num_steps, num_envs))
+
+    start = time.perf_counter()
+    for step_actions in actions:
+        env.step(step_actions)
+    elapsed = time.perf_counter() - start
+    print(f"{num_envs * num_steps / elapsed:,.0f} game-steps/s ({num_envs} games x {num_steps} steps in {elapsed:.2f}s)")
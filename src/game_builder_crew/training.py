@@ -0,0 +1,384 @@
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+
+import yaml
+
+from game_builder_crew.log_sink import get_sink
+from game_builder_crew.prompt_cache import CACHED_TOKEN_PRICE
+
+# --- Training ---
+# crewai's Crew.train runs its iterations one after another on one input and keeps the human
+# feedback for each in a pickle that a failure wipes. Here the iterations are spread round-robin
+# over several gamedesign.yaml examples and run concurrently, TRAIN_WORKERS crews at a time,
+# on one shared router (llm_router.py) so every key stays within its requests per minute. Each
+# finished iteration is written to a JSON checkpoint next to the output file with its timing,
+# token usage and training data, so an interrupted or partly failed run picks up where it
+# stopped when started again. Once every iteration is done, the feedback is evaluated per
+# agent role and saved to the output file exactly as Crew.train does.
+TRAIN_WORKERS = 3
+MAX_ATTEMPTS = 2 # Per iteration and run; what still fails is retried on the next run
+DEFAULT_EXAMPLES = ("example1_pacman", "example2_pacman", "example3_snake")
+DESIGNS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config", "gamedesign.yaml")
+CHECKPOINT_SUFFIX = ".checkpoint.json"
+
+# Gemini 2.5 Flash list prices in USD per million tokens; cached input is billed at CACHED_TOKEN_PRICE
+INPUT_PRICE_PER_M = 0.30
+OUTPUT_PRICE_PER_M = 2.50
+
+# Environment variables
+#   GAME_TRAIN_WORKERS=n    iterations running at the same time (default TRAIN_WORKERS)
+ENV_WORKERS = "GAME_TRAIN_WORKERS"
+
+# crewai internals wrapped by serialize_training_io(): (module, class, method). The feedback
+# prompt is required, and at least one of the executors' training-data writers.
+SUPPORTED_CREWAI = ">=1.15.28,<1.16" # Keep in step with pyproject.toml
+FEEDBACK_HOOK = ("crewai.core.providers.human_input", "SyncHumanInputProvider", "_prompt_input")
+TRAINING_OUTPUT_HOOKS = (
+    ("crewai.experimental.agent_executor", "AgentExecutor", "_handle_crew_training_output"), # Default in crews
+    ("crewai.agents.crew_agent_executor", "CrewAgentExecutor", "_handle_crew_training_output"),
+)
+CREW_TRAINING_ATTRS = ("_train", "_train_iteration") # Private Crew attributes set by Crew.train, see training_mode()
+
+_io_lock = threading.RLock()
+# The running iteration's label and feedback time; crewai's worker threads copy the context
+_iteration = contextvars.ContextVar("training_iteration", default=None)
+_serialized_depth = 0 # serialize_training_io() blocks currently running
+_originals = [] # (class, name, attribute in the class __dict__ or None) replaced by serialize_training_io()
+
+
+def _find_hook(module_name, class_name, method_name):
+    # The class defining method_name, or None if this crewai version doesn't have it.
+    import importlib
+
+    try:
+        cls = getattr(importlib.import_module(module_name), class_name)
+    except (ImportError, AttributeError):
+        return None
+    return cls if hasattr(cls, method_name) else None
+
+
+@contextmanager
+def serialize_training_io():
+    """
+    crewai's training mode assumes one crew at a time: it asks for feedback with input() and
+    rewrites one pickle on every answer. While the block runs, those crewai methods are wrapped
+    so concurrent crews take turns at the console and at the pickle, which is also written
+    atomically, and each feedback prompt is labelled with its game and iteration. Nested or
+    concurrent blocks share the wrapping; the originals are put back when the last one exits.
+    Raises RuntimeError if the installed crewai doesn't have the methods (see SUPPORTED_CREWAI).
+    """
+    global _serialized_depth
+    import crewai
+    from crewai.utilities.training_handler import CrewTrainingHandler
+
+    def serialized(method, feedback=False):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            start = time.monotonic()
+            with _io_lock:
+                if feedback:
+                    current = _iteration.get()
+                    print(f"\n===== Feedback for {current['label'] if current else 'training'} =====")
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    if feedback and _iteration.get():
+                        _iteration.get()["feedback_s"] += time.monotonic() - start
+        return wrapper
+
+    def atomic_save(self, data):
+        import pickle
+
+        with open(f"{self.file_path}.tmp", "wb") as pickle_file:
+            pickle.dump(data, pickle_file)
+        os.replace(f"{self.file_path}.tmp", self.file_path) # Readers never see a half-written file
+
+    with _io_lock:
+        if _serialized_depth == 0:
+            feedback_class = _find_hook(*FEEDBACK_HOOK)
+            output_hooks = [(cls, hook[2]) for hook in TRAINING_OUTPUT_HOOKS if (cls := _find_hook(*hook))]
+            if feedback_class is None or not output_hooks:
+                missing = [".".join(hook) for hook in (FEEDBACK_HOOK,) + TRAINING_OUTPUT_HOOKS if _find_hook(*hook) is None]
+                raise RuntimeError(f"Concurrent training needs crewai{SUPPORTED_CREWAI}; crewai {crewai.__version__} "
+                                   f"is missing {', '.join(missing)}")
+            # _prompt_input is a staticmethod; looked up on the class it is the plain function
+            patches = [(feedback_class, "_prompt_input", staticmethod(serialized(feedback_class._prompt_input, feedback=True)))]
+            patches += [(cls, method_name, serialized(getattr(cls, method_name))) for cls, method_name in output_hooks]
+            patches.append((CrewTrainingHandler, "save", atomic_save))
+            for cls, name, value in patches:
+                # None marks an inherited method: restoring deletes the override
+                _originals.append((cls, name, cls.__dict__.get(name)))
+                setattr(cls, name, value)
+        _serialized_depth += 1
+    try:
+        yield
+    finally:
+        with _io_lock:
+            _serialized_depth -= 1
+            if _serialized_depth == 0:
+                for cls, name, original in reversed(_originals):
+                    if original is None:
+                        delattr(cls, name)
+                    else:
+                        setattr(cls, name, original)
+                _originals.clear()
+
+
+@contextmanager
+def training_mode(crew, iteration):
+    """
+    Sets crew up for one training iteration the way Crew.train does, without resetting the
+    training files other iterations are writing, and undoes it when the block exits. crewai
+    has no public switch for this, so the private CREW_TRAINING_ATTRS are set here and only
+    here; raises RuntimeError if the installed crewai doesn't have them.
+    """
+    missing = [name for name in CREW_TRAINING_ATTRS if name not in type(crew).__private_attributes__]
+    if missing:
+        raise RuntimeError(f"Concurrent training needs crewai{SUPPORTED_CREWAI}; its Crew is missing {', '.join(missing)}")
+    saved_attrs = {name: getattr(crew, name, None) for name in CREW_TRAINING_ATTRS}
+    saved_tasks = [task.human_input for task in crew.tasks]
+    saved_agents = [agent.allow_delegation for agent in crew.agents]
+    crew._train = True
+    crew._train_iteration = iteration
+    for task in crew.tasks:
+        task.human_input = True
+    for agent in crew.agents:
+        agent.allow_delegation = False
+    try:
+        yield crew
+    finally:
+        for name, value in saved_attrs.items():
+            setattr(crew, name, value)
+        for task, human_input in zip(crew.tasks, saved_tasks):
+            task.human_input = human_input
+        for agent, allow_delegation in zip(crew.agents, saved_agents):
+            agent.allow_delegation = allow_delegation
+
+
+def plan_iterations(n_iterations, examples):
+    # Iteration i trains on examples[i % len(examples)].
+    return [{"iteration": index, "example": examples[index % len(examples)]} for index in range(n_iterations)]
+
+
+def token_cost(usage):
+    uncached = usage["input_tokens"] - usage["cached_tokens"]
+    return (uncached + usage["cached_tokens"] * CACHED_TOKEN_PRICE) * INPUT_PRICE_PER_M / 1e6 + usage["output_tokens"] * OUTPUT_PRICE_PER_M / 1e6
+
+
+class TrainingCheckpoint:
+    """
+    The finished and failed iterations of a training run, saved as JSON after every change.
+    Iterations are keyed by their number as a string.
+    """
+    def __init__(self, path, plan, fresh=False):
+        self.path = path
+        self.lock = threading.Lock()
+        self.data = {"plan": plan, "done": {}, "failed": {}}
+        if not fresh and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as checkpoint_file:
+                saved = json.load(checkpoint_file)
+            examples = {str(item["iteration"]): item["example"] for item in plan}
+            mismatched = [key for key, record in saved["done"].items() if key in examples and record["example"] != examples[key]]
+            if mismatched:
+                raise ValueError(f"{path} was written for other examples (iterations {', '.join(mismatched)}); pass --fresh to start over")
+            self.data["done"] = {key: record for key, record in saved["done"].items() if key in examples}
+        self.save()
+
+    def pending(self):
+        return [item for item in self.data["plan"] if str(item["iteration"]) not in self.data["done"]]
+
+    def mark_done(self, iteration, record):
+        with self.lock:
+            self.data["done"][str(iteration)] = record
+            self.data["failed"].pop(str(iteration), None)
+            self.save()
+
+    def mark_failed(self, iteration, example, error):
+        with self.lock:
+            self.data["failed"][str(iteration)] = {"example": example, "error": error}
+            self.save()
+
+    def save(self):
+        with open(f"{self.path}.tmp", "w", encoding="utf-8") as checkpoint_file:
+            json.dump(self.data, checkpoint_file, indent=1)
+        os.replace(f"{self.path}.tmp", self.path)
+
+    def training_data(self):
+        """
+        Returns the collected feedback as crewai's evaluator expects it, keyed by agent role:
+        {role: {iteration: {"initial_output", "human_feedback", "improved_output"}}}. Answers
+        without all three (e.g. empty feedback) are left out, as the evaluator rejects them.
+        """
+        by_role = {}
+        for key, record in sorted(self.data["done"].items(), key=lambda pair: int(pair[0])):
+            for role, data in record["training"].items():
+                if all(data.get(field) for field in ("initial_output", "human_feedback", "improved_output")):
+                    by_role.setdefault(role, {})[int(key)] = data
+        return by_role
+
+
+def run_iteration(item, examples, router, library):
+    """
+    Runs one training iteration: a fresh crew on the shared router, in training_mode().
+    Returns the checkpoint record.
+    """
+    from crewai.utilities.constants import TRAINING_DATA_FILE
+    from crewai.utilities.training_handler import CrewTrainingHandler
+
+    from game_builder_crew.crew import GameBuilderCrew
+    from game_builder_crew.game_library import build_inputs
+
+    iteration, example = item["iteration"], item["example"]
+    crew = GameBuilderCrew(router=router).crew()
+    tag = f"train-{iteration}"
+    current = {"label": f"{example} (iteration {iteration})", "feedback_s": 0.0}
+    _iteration.set(current)
+    router.usage.take(tag) # Forget the usage of an earlier failed attempt
+    start = time.monotonic()
+    with training_mode(crew, iteration), router.usage.tagged(tag):
+        crew.kickoff(inputs=build_inputs(examples[example], library))
+    seconds = time.monotonic() - start
+    usage = router.usage.take(tag)
+
+    with _io_lock:
+        saved = CrewTrainingHandler(TRAINING_DATA_FILE).load()
+    training = {agent.role: saved[str(agent.id)][iteration] for agent in crew.agents if iteration in saved.get(str(agent.id), {})}
+    return {
+        "example": example,
+        "seconds": round(seconds, 2),
+        "feedback_s": round(current["feedback_s"], 2), # Waiting for and typing feedback, included in seconds
+        "usage": usage,
+        "cost_usd": round(token_cost(usage), 6),
+        "training": training,
+    }
+
+
+def evaluate(checkpoint, filename, router):
+    """
+    Turns the collected feedback into each agent's trained instructions and saves them to
+    filename, like the end of Crew.train.
+    """
+    from crewai.utilities.evaluators.task_evaluator import TaskEvaluator
+    from crewai.utilities.training_handler import CrewTrainingHandler
+
+    from game_builder_crew.crew import GameBuilderCrew
+
+    training_data = checkpoint.training_data()
+    for agent in GameBuilderCrew(router=router).crew().agents:
+        if training_data.get(agent.role):
+            result = TaskEvaluator(agent).evaluate_training_data(training_data=training_data, agent_id=agent.role)
+            CrewTrainingHandler(filename).save_trained_data(agent_id=agent.role, trained_data=result.model_dump())
+    return sorted(training_data)
+
+
+def format_iteration(iteration, record):
+    usage = record["usage"]
+    return (f"{iteration:>4}  {record['example']:<18} {record['seconds']:8.1f}s {record['feedback_s']:8.1f}s  "
+            f"{usage['requests']:5d} {usage['input_tokens']:10d} {usage['cached_tokens']:10d} {usage['output_tokens']:8d}  ${record['cost_usd']:.4f}")
+
+
+def format_summary(checkpoint, wall_s):
+    """
+    Returns the per-iteration table (time, time spent on feedback, requests, tokens, cost),
+    the totals, and how the wall-clock time of this run compares with running them serially.
+    """
+    done = sorted(checkpoint.data["done"].items(), key=lambda pair: int(pair[0]))
+    lines = [f"{'iter':>4}  {'example':<18} {'time':>9} {'feedback':>9}  {'reqs':>5} {'input':>10} {'cached':>10} {'output':>8}  cost"]
+    lines += [format_iteration(int(key), record) for key, record in done]
+    serial_s = sum(record["seconds"] for _, record in done)
+    cost = sum(record["cost_usd"] for _, record in done)
+    tokens = sum(record["usage"]["input_tokens"] + record["usage"]["output_tokens"] for _, record in done)
+    lines.append(f"{len(done)}/{len(checkpoint.data['plan'])} iterations done, {tokens} tokens, ${cost:.4f}; "
+                 f"iteration time {serial_s:.0f}s in {wall_s:.0f}s wall clock this run")
+    for key, failure in sorted(checkpoint.data["failed"].items(), key=lambda pair: int(pair[0])):
+        lines.append(f"iteration {key} ({failure['example']}) failed: {failure['error'].strip().splitlines()[-1]}")
+    return "\n".join(lines)
+
+
+def train(n_iterations, filename, examples=DEFAULT_EXAMPLES, workers=None, fresh=False, designs_path=DESIGNS_PATH):
+    """
+    Trains the crew for n_iterations spread over the given gamedesign.yaml examples (see
+    Training above) and saves the result to filename. Returns True once every iteration is done
+    and the result is saved; False if some failed, in which case running again resumes.
+    """
+    from crewai.utilities.constants import TRAINING_DATA_FILE
+    from crewai.utilities.training_handler import CrewTrainingHandler
+
+    from game_builder_crew.crew import build_default_router
+    from game_builder_crew.game_library import GameLibrary
+
+    with open(designs_path, "r", encoding="utf-8") as designs_file:
+        designs = yaml.safe_load(designs_file)
+    unknown = [name for name in examples if name not in designs]
+    if unknown:
+        raise ValueError(f"Unknown examples {', '.join(unknown)}; {designs_path} has {', '.join(designs)}")
+    workers = workers or int(os.environ.get(ENV_WORKERS, TRAIN_WORKERS))
+
+    checkpoint = TrainingCheckpoint(filename + CHECKPOINT_SUFFIX, plan_iterations(n_iterations, list(examples)), fresh=fresh)
+    if fresh or not checkpoint.data["done"]:
+        CrewTrainingHandler(TRAINING_DATA_FILE).initialize_file()
+        CrewTrainingHandler(filename).initialize_file()
+    router = build_default_router()
+    library = GameLibrary()
+    sink = get_sink()
+    pending = checkpoint.pending()
+    print(f"Training: {len(pending)} of {n_iterations} iterations to run on {', '.join(examples)}, {workers} at a time")
+
+    start = time.monotonic()
+    attempts = {item["iteration"]: 0 for item in pending}
+    with serialize_training_io(), ThreadPoolExecutor(max_workers=workers, thread_name_prefix="train") as executor:
+        futures = {executor.submit(run_iteration, item, designs, router, library): item for item in pending}
+        while futures:
+            for future in as_completed(list(futures)):
+                item = futures.pop(future)
+                iteration = item["iteration"]
+                attempts[iteration] += 1
+                try:
+                    record = future.result()
+                except Exception:
+                    error = traceback.format_exc(limit=-4)
+                    checkpoint.mark_failed(iteration, item["example"], error)
+                    sink.error("train_iteration_failed", iteration=iteration, example=item["example"], attempt=attempts[iteration], error=error)
+                    if attempts[iteration] < MAX_ATTEMPTS:
+                        futures[executor.submit(run_iteration, item, designs, router, library)] = item
+                    continue
+                checkpoint.mark_done(iteration, record)
+                sink.info("train_iteration", iteration=iteration, **{key: value for key, value in record.items() if key != "training"})
+                print(format_iteration(iteration, record))
+    wall_s = time.monotonic() - start
+
+    print(format_summary(checkpoint, wall_s))
+    if checkpoint.pending():
+        print(f"Not all iterations finished; run the same command again to resume from {checkpoint.path}")
+        return False
+    roles = evaluate(checkpoint, filename, router)
+    print(f"Saved trained data for {', '.join(role.strip() for role in roles) or 'no agents (no feedback given)'} to {filename}")
+    return True
+
+
+def parse_args(args):
+    """
+    Parses N FILENAME [--examples a,b,...] [--workers K] [--fresh] into train()'s arguments.
+    """
+    options = {"n_iterations": int(args[0]), "filename": args[1]}
+    if "--examples" in args:
+        options["examples"] = tuple(args[args.index("--examples") + 1].split(","))
+    if "--workers" in args:
+        options["workers"] = int(args[args.index("--workers") + 1])
+    options["fresh"] = "--fresh" in args
+    return options
+
+
+# --- Command Line ---
+# python -m game_builder_crew.training N trained_agents_data.pkl [--examples a,b] [--workers K] [--fresh]
+# Exits with status 1 if iterations are left to resume.
+if __name__ == "__main__":
+    sys.exit(0 if train(**parse_args(sys.argv[1:])) else 1)
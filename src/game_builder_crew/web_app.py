@@ -1,25 +1,40 @@
 ﻿import gradio as gr
 from game_builder_crew.crew import GameBuilderCrew
+from game_builder_crew.game_library import GameLibrary, build_inputs
+from game_builder_crew.incremental import regenerate
+from game_builder_crew.log_sink import get_sink
 from dotenv import load_dotenv  # <--- ADD THIS
 load_dotenv()
 
 # --- The Logic Function ---
-def generate_game_code(custom_prompt):
+def generate_game_code(custom_prompt, edit_previous=False):
     """
-    Takes the user's custom text and runs the Crew.
+    Takes the user's custom text and runs the Crew. With edit_previous, an edited idea is
+    applied to the closest earlier game instead (see incremental.py), unless that edit still
+    fails validation; then the full Crew runs.
     """
     if not custom_prompt:
         return "# Please enter a game idea first!"
 
-    inputs = {
-        'game': custom_prompt
-    }
+    library = GameLibrary()
 
     try:
+        if edit_previous:
+            edited = regenerate(custom_prompt, library)
+            if edited is not None and not edited.problems:
+                return str(edited)
+            if edited is not None:
+                get_sink().warning("incremental_rejected", base=edited.base.name, problems=edited.problems)
+            # No earlier game is close enough, or the edit left problems: fall through to a full generation
+
+        inputs = build_inputs(custom_prompt, library)
         # The 'design_task' will now run first to refine this prompt!
         result = GameBuilderCrew().crew().kickoff(inputs=inputs)
+        # Working games become references for later runs; the design spec allows incremental edits
+        library.add(custom_prompt, str(result), spec=result.tasks_output[0].raw)
         return str(result)
     except Exception as e:
+        get_sink().error("generation_failed", error=repr(e), prompt=custom_prompt)
         return f"# Error generating code:\n# {str(e)}\n# (Check your API Key)"
 
 # --- The Gradio Interface ---
@@ -38,6 +53,11 @@ def launch_app():
                     lines=5
                 )
                 
+                edit_previous = gr.Checkbox(
+                    label="Edit my previous game (only regenerate what the changes affect)",
+                    value=False
+                )
+
                 generate_btn = gr.Button("🚀 Build My Game", variant="primary")
                 
                 gr.Markdown("### How it works:")
@@ -53,7 +73,7 @@ def launch_app():
 
         generate_btn.click(
             fn=generate_game_code, 
-            inputs=[game_input], 
+            inputs=[game_input, edit_previous], 
             outputs=[code_output]
         )
 
@@ -1,8 +1,32 @@
 
+import array
+import bisect
+import heapq
+import mmap
+import os
 import pygame
 import random
 import sys
 
+try:
+    from game_builder_crew.profiler import get_profiler
+except ImportError: # Run as a plain script without the package installed: no profiling
+    class _NoProfiler:
+        def begin_frame(self):
+            pass
+
+        def mark(self, phase):
+            pass
+
+        def draw_overlay(self, screen):
+            pass
+
+        def close(self):
+            pass
+
+    def get_profiler(game_name, profiler=None):
+        return profiler or _NoProfiler()
+
 # --- Constants ---
 # Screen Dimensions
 SCREEN_WIDTH = 800
@@ -55,6 +79,10 @@ WORD_LIST = [
     "mobile", "tablet", "device", "hardware", "firmware", "software"
 ]
 
+# External dictionaries (one word per line) are split into difficulty buckets by word
+# length, easiest first. Difficulty rises with base_word_speed.
+DIFFICULTY_BUCKETS = [(3, 4), (5, 6), (7, 8), (9, 14)] # (min, max) word length
+
 # --- Game States ---
 GAME_STATE_MENU = "MENU"
 GAME_STATE_PLAYING = "PLAYING"
@@ -66,47 +94,74 @@ class FallingWord:
     """
     Represents a single word falling on the screen.
     """
-    def __init__(self, text, x, y, speed, font, color_untyped, color_typed):
+    def __init__(self, text, x, y, speed, font, color_untyped, color_typed, spawn_order=0, spawn_time=0):
         self.original_text = text
         self.x = x
         self.y = y
         self.speed = speed # Pixels per millisecond
+        self.spawn_order = spawn_order # Increasing counter; earlier words of equal speed are lower
+        # Position is analytic: y(t) = spawn_y + speed * (t - spawn_time), in game time ms
+        self.spawn_y = y
+        self.spawn_time = spawn_time
         self.font = font
         self.color_untyped = color_untyped
         self.color_typed = color_typed
         self.current_typed_index = 0
 
         # Calculate initial rect for bounding box and accurate drawing position
-        # Use the full word to determine its total width for rect
-        temp_surface = self.font.render(self.original_text, True, self.color_untyped)
-        self.rect = temp_surface.get_rect(topleft=(int(self.x), int(self.y)))
+        # font.size() measures the full word without rasterizing it
+        width, height = self.font.size(self.original_text)
+        self.rect = pygame.Rect(int(self.x), int(self.y), width, height)
+
+        # Rendered typed/untyped surfaces, rebuilt only when current_typed_index changes
+        self.cached_typed_index = None
+        self.typed_surface = None
+        self.untyped_surface = None
 
-    def update(self, dt, screen_height):
+    def get_y(self, current_time):
         """
-        Moves the word down by speed * dt.
-        Returns True if it hits the bottom of the screen, False otherwise.
+        Returns the word's y position at the given game time (ms).
         """
-        self.y += self.speed * dt
+        return self.spawn_y + self.speed * (current_time - self.spawn_time)
+
+    def update_position(self, current_time):
+        """
+        Moves the word (y and rect) to its position at the given game time.
+        Only needed before drawing; nothing else reads the stored y.
+        """
+        self.y = self.get_y(current_time)
         self.rect.y = int(self.y) # Update rect's y position
 
-        if self.rect.bottom >= screen_height:
-            return True # Word hit bottom
-        return False
+    def get_bottom_deadline(self, screen_height):
+        """
+        Returns the game time at which the word's bottom reaches screen_height.
+        """
+        return self.spawn_time + (screen_height - self.rect.height - self.spawn_y) / self.speed
 
     def draw(self, screen):
         """
         Renders the word, drawing typed letters in one color and untyped in another.
         """
-        # Render the typed part
+        if self.cached_typed_index != self.current_typed_index:
+            self.render_surfaces()
+
+        # Draw the typed part
+        screen.blit(self.typed_surface, (self.x, self.y))
+
+        # Draw the untyped part, positioned after the typed part
+        untyped_x = self.x + self.typed_surface.get_width() # Offset by width of typed part
+        screen.blit(self.untyped_surface, (untyped_x, self.y))
+
+    def render_surfaces(self):
+        """
+        Renders the typed and untyped parts of the word for the current typed index.
+        Called from draw() only after a keystroke has advanced the word.
+        """
         typed_part = self.original_text[:self.current_typed_index]
-        typed_surface = self.font.render(typed_part, True, self.color_typed)
-        screen.blit(typed_surface, (self.x, self.y))
-        
-        # Render the untyped part, positioned after the typed part
         untyped_part = self.original_text[self.current_typed_index:]
-        untyped_surface = self.font.render(untyped_part, True, self.color_untyped)
-        untyped_x = self.x + typed_surface.get_width() # Offset by width of typed part
-        screen.blit(untyped_surface, (untyped_x, self.y))
+        self.typed_surface = self.font.render(typed_part, True, self.color_typed)
+        self.untyped_surface = self.font.render(untyped_part, True, self.color_untyped)
+        self.cached_typed_index = self.current_typed_index
 
     def check_input(self, char):
         """
@@ -138,11 +193,159 @@ class FallingWord:
         """
         return self.rect.width
 
+class WordListSource:
+    """
+    Serves words from an in-memory list (the built-in WORD_LIST).
+    Difficulty is ignored: the short list is sampled uniformly, as before.
+    """
+    def __init__(self, words):
+        self.words = words
+
+    def choose_word(self, difficulty):
+        return random.choice(self.words)
+
+    def close(self):
+        pass
+
+class DictionaryWordSource:
+    """
+    Serves words from a large dictionary file (one word per line) without loading it.
+
+    The file is memory-mapped and never parsed into strings. The first word requested
+    streams it once and records the byte offset of every plain ASCII word in the array of
+    its difficulty bucket (8 bytes per word); after that a word is one random pick from a
+    bucket and one line read, uniform within the bucket. close() must be called when done.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.size = os.fstat(self.file.fileno()).st_size
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        self.offsets = None # One array of line offsets per DIFFICULTY_BUCKETS entry, built on first use
+
+    def build_index(self):
+        """
+        Streams the file once and buckets the offset of every usable word by its length.
+        Raises ValueError if no line is a word of any bucket.
+        """
+        offsets = [array.array("q") for _ in DIFFICULTY_BUCKETS]
+        bucket_of = {}
+        for bucket, (min_length, max_length) in enumerate(DIFFICULTY_BUCKETS):
+            for length in range(min_length, max_length + 1):
+                bucket_of[length] = bucket
+        offset = 0
+        self.file.seek(0)
+        for line in self.file:
+            word = line.strip()
+            bucket = bucket_of.get(len(word))
+            if bucket is not None and word.isascii() and word.isalpha():
+                offsets[bucket].append(offset)
+            offset += len(line)
+        if not any(offsets):
+            raise ValueError(f"Dictionary {self.path} has no words of {DIFFICULTY_BUCKETS[0][0]}-"
+                             f"{DIFFICULTY_BUCKETS[-1][1]} ASCII letters")
+        self.offsets = offsets
+
+    def read_word_at(self, offset):
+        """
+        Returns the word starting at the given byte offset.
+        """
+        end = self.data.find(b"\n", offset)
+        if end == -1:
+            end = self.size
+        return self.data[offset:end].strip().decode("ascii").lower()
+
+    def choose_word(self, difficulty):
+        """
+        Returns a word from the given difficulty bucket. If the dictionary has none, the
+        nearest easier bucket with words is used, else the nearest harder one.
+        """
+        if self.offsets is None:
+            self.build_index()
+        order = list(range(difficulty, -1, -1)) + list(range(difficulty + 1, len(DIFFICULTY_BUCKETS)))
+        for bucket in order:
+            if self.offsets[bucket]:
+                return self.read_word_at(random.choice(self.offsets[bucket]))
+
+    def close(self):
+        if self.size and not self.data.closed:
+            self.data.close()
+        self.file.close()
+
+class NextLetterIndex:
+    """
+    Buckets active words by the next letter they expect, so a keystroke only looks at the
+    words it can advance.
+
+    buckets[letter][current_typed_index][speed] is a list of words ordered by spawn_order.
+    All words fall from the same height, so among words with the same speed the earliest
+    spawned is always the lowest on screen, and each list's first word is its best candidate.
+    Picking the highest priority word therefore only compares one word per speed level.
+    """
+    def __init__(self):
+        self.buckets = {}
+
+    def clear(self):
+        self.buckets = {}
+
+    def add(self, word):
+        """
+        Indexes a word under its next letter. Fully typed words are not indexed.
+        """
+        letter = word.get_next_letter()
+        if letter is None:
+            return
+        by_speed = self.buckets.setdefault(letter, {}).setdefault(word.current_typed_index, {})
+        group = by_speed.setdefault(word.speed, [])
+        position = bisect.bisect(group, word.spawn_order, key=lambda w: w.spawn_order)
+        group.insert(position, word)
+
+    def remove(self, word):
+        """
+        Removes a word from the index. Must be called before the word's typed index changes.
+        """
+        letter = word.get_next_letter()
+        if letter is None:
+            return
+        by_index = self.buckets[letter]
+        by_speed = by_index[word.current_typed_index]
+        group = by_speed[word.speed]
+        del group[bisect.bisect_left(group, word.spawn_order, key=lambda w: w.spawn_order)]
+
+        # Drop empty containers so min() over typed indices stays meaningful.
+        if not group:
+            del by_speed[word.speed]
+            if not by_speed:
+                del by_index[word.current_typed_index]
+                if not by_index:
+                    del self.buckets[letter]
+
+    def find_match(self, char, current_time):
+        """
+        Returns the word that should receive char, or None if no word expects it.
+        Prioritizes the smallest current_typed_index, then the word closest to the bottom
+        at current_time.
+        """
+        by_index = self.buckets.get(char)
+        if not by_index:
+            return None
+        best_word = None
+        best_y = None
+        for group in by_index[min(by_index)].values():
+            word = group[0]
+            y = word.get_y(current_time)
+            if best_word is None or y > best_y or (y == best_y and word.spawn_order < best_word.spawn_order):
+                best_word = word
+                best_y = y
+        return best_word
+
 class Game:
     """
     Manages the overall game state, main loop, event handling, updating all game objects, and rendering.
     """
-    def __init__(self):
+    def __init__(self, dictionary_path=None, profiler=None):
+        # profiler is a profiler.FrameProfiler; by default it is configured from the environment
+        self.profiler = get_profiler("word", profiler)
         pygame.init()
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Falling Words")
@@ -159,8 +362,16 @@ class Game:
         # Game attributes, initialized here and reset by reset_game()
         self.score = INITIAL_SCORE
         self.lives = INITIAL_LIVES
-        self.active_words = [] # List of FallingWord objects
-        self.word_list = WORD_LIST # The predefined list of words
+        self.active_words = {} # FallingWord objects (dict used as an ordered set)
+        self.word_index = NextLetterIndex() # Active words bucketed by their next letter
+        self.words_spawned = 0 # Spawn counter, gives each word its spawn_order
+        self.game_time = 0 # Milliseconds of play, advanced by dt; drives word positions
+        self.bottom_deadlines = [] # Min-heap of (bottom-hit game time, spawn_order, word)
+        # Where new words come from: an external dictionary file if given, else WORD_LIST
+        if dictionary_path:
+            self.word_source = DictionaryWordSource(dictionary_path)
+        else:
+            self.word_source = WordListSource(WORD_LIST)
 
         # Difficulty scaling attributes
         self.base_word_speed = INITIAL_WORD_SPEED
@@ -182,14 +393,16 @@ class Game:
         """
         self.score = INITIAL_SCORE
         self.lives = INITIAL_LIVES
-        self.active_words = []
+        self.active_words = {}
+        self.word_index.clear()
+        self.game_time = 0
+        self.bottom_deadlines = []
         self.base_word_speed = INITIAL_WORD_SPEED
         self.spawn_interval = INITIAL_SPAWN_INTERVAL_MS
         
-        # Reset timers for difficulty scaling and word spawning
-        current_time = pygame.time.get_ticks()
-        self.next_word_spawn_time = current_time + self.spawn_interval
-        self.last_speed_increase_time = current_time
+        # Reset timers for difficulty scaling and word spawning (game time, like word positions)
+        self.next_word_spawn_time = self.spawn_interval
+        self.last_speed_increase_time = 0
         self.words_typed_since_last_interval_decrease = 0
 
     def run(self):
@@ -197,11 +410,18 @@ class Game:
         The main game loop.
         """
         while self.running:
+            self.profiler.begin_frame()
             dt = self.clock.tick(FPS) # dt is milliseconds since last frame
+            self.profiler.mark("tick")
             self.handle_events()
+            self.profiler.mark("events")
             self.update_game_state(dt)
+            self.profiler.mark("update")
             self.draw_elements()
+            self.profiler.mark("draw")
 
+        self.profiler.close() # Writes the profile dump, when enabled
+        self.word_source.close() # Releases the dictionary file and its memory map
         pygame.quit()
         sys.exit()
 
@@ -241,30 +461,22 @@ class Game:
         Processes a typed character, attempting to match it with falling words.
         Prioritizes words based on current_typed_index and y-position.
         """
-        if not self.active_words:
-            return
-
-        candidate_words = []
-        for word in self.active_words:
-            if word.get_next_letter() == char:
-                candidate_words.append(word)
-
-        if not candidate_words:
-            return # No word found that matches the typed character
-
-        # Prioritization:
+        # Prioritization (handled by the next-letter index):
         # 1. Smallest current_typed_index (word closest to being completed)
         # 2. Closest to bottom (highest y value) if current_typed_index is the same
-        candidate_words.sort(key=lambda w: (w.current_typed_index, -w.y))
+        chosen_word = self.word_index.find_match(char, self.game_time)
+        if chosen_word is None:
+            return # No word found that matches the typed character
 
-        chosen_word = candidate_words[0] # Select the highest priority word
-        
-        # Attempt to type the character in the chosen word
+        # Type the character in the chosen word and re-index it under its new next letter
+        self.word_index.remove(chosen_word)
         if chosen_word.check_input(char):
-            if chosen_word.is_fully_typed():
+            if not chosen_word.is_fully_typed():
+                self.word_index.add(chosen_word)
+            else:
                 # Word completed: award points and remove from active words
                 self.score += WORD_POINTS + (len(chosen_word.original_text) * LETTER_POINTS)
-                self.active_words.remove(chosen_word)
+                del self.active_words[chosen_word]
                 self.words_typed_since_last_interval_decrease += 1
 
                 # Check if it's time to decrease spawn interval (increase frequency)
@@ -278,50 +490,62 @@ class Game:
         updates score/lives, and handles difficulty scaling.
         """
         if self.game_state == GAME_STATE_PLAYING:
-            current_time = pygame.time.get_ticks()
+            # Everything runs on game time (advanced by dt), never the wall clock, so spawning,
+            # speed-ups and word positions stay in step however dt is produced.
+            self.game_time += dt
 
             # Word Spawning Logic
-            if current_time >= self.next_word_spawn_time:
+            if self.game_time >= self.next_word_spawn_time:
                 self.spawn_word()
-                self.next_word_spawn_time = current_time + self.spawn_interval
+                self.next_word_spawn_time = self.game_time + self.spawn_interval
 
-            # Update Falling Words and check for words hitting the bottom
-            words_to_keep = []
-            for word in self.active_words:
-                if word.update(dt, SCREEN_HEIGHT): # Word hit bottom
+            # Words move analytically with game time; only words whose bottom-hit deadline
+            # has passed are touched. Typed words stay in the heap and are skipped here.
+            while self.bottom_deadlines and self.bottom_deadlines[0][0] <= self.game_time:
+                _, _, word = heapq.heappop(self.bottom_deadlines)
+                if word in self.active_words: # Word hit bottom
                     self.lives -= 1
-                    # Word is not added to words_to_keep, effectively removing it
-                else:
-                    words_to_keep.append(word)
-            self.active_words = words_to_keep # Update the list of active words
+                    del self.active_words[word]
+                    self.word_index.remove(word)
 
             # Difficulty Scaling (Word Speed Increase)
-            if current_time - self.last_speed_increase_time >= SPEED_INCREASE_INTERVAL_MS:
+            if self.game_time - self.last_speed_increase_time >= SPEED_INCREASE_INTERVAL_MS:
                 self.base_word_speed = min(MAX_WORD_SPEED, self.base_word_speed + SPEED_INCREASE_AMOUNT)
-                self.last_speed_increase_time = current_time
+                self.last_speed_increase_time = self.game_time
 
             # Game Over Check
             if self.lives <= 0:
                 self.game_state = GAME_STATE_GAME_OVER
 
+    def get_difficulty(self):
+        """
+        Maps the current base_word_speed onto a DIFFICULTY_BUCKETS index (0 = easiest).
+        """
+        progress = (self.base_word_speed - INITIAL_WORD_SPEED) / (MAX_WORD_SPEED - INITIAL_WORD_SPEED)
+        return min(len(DIFFICULTY_BUCKETS) - 1, int(progress * len(DIFFICULTY_BUCKETS)))
+
     def spawn_word(self):
         """
-        Creates a new FallingWord object and adds it to the active_words list.
+        Creates a new FallingWord object and adds it to active_words and the letter index.
         """
-        word_text = random.choice(self.word_list)
+        word_text = self.word_source.choose_word(self.get_difficulty())
         
         # Calculate word width to ensure it spawns fully on screen
-        # Need to render it once to get its dimensions
-        temp_surface = self.font_medium.render(word_text, True, WHITE)
-        word_width = temp_surface.get_width()
+        # font.size() measures the text without rendering it
+        word_width = self.font_medium.size(word_text)[0]
 
         # Random X position, ensuring the word doesn't go off the right edge
         max_x = SCREEN_WIDTH - word_width
         x = random.randint(0, max_x) if max_x > 0 else 0
         y = -50 # Start slightly above the top of the screen
 
-        new_word = FallingWord(word_text, x, y, self.base_word_speed, self.font_medium, WHITE, YELLOW)
-        self.active_words.append(new_word)
+        self.words_spawned += 1
+        new_word = FallingWord(word_text, x, y, self.base_word_speed, self.font_medium, WHITE, YELLOW,
+                               self.words_spawned, self.game_time)
+        self.active_words[new_word] = None
+        self.word_index.add(new_word)
+        deadline = new_word.get_bottom_deadline(SCREEN_HEIGHT)
+        heapq.heappush(self.bottom_deadlines, (deadline, new_word.spawn_order, new_word))
 
     def draw_elements(self):
         """
@@ -336,6 +560,7 @@ class Game:
         elif self.game_state == GAME_STATE_GAME_OVER:
             self.draw_game_over()
 
+        self.profiler.draw_overlay(self.screen) # Frame timing overlay, when enabled
         pygame.display.flip() # Update the full display Surface to the screen
 
     def draw_menu(self):
@@ -375,6 +600,7 @@ class Game:
 
         # Draw all currently active falling words
         for word in self.active_words:
+            word.update_position(self.game_time)
             word.draw(self.screen)
 
     def draw_game_over(self):
@@ -403,5 +629,6 @@ class Game:
 
 # --- Main Game Execution ---
 if __name__ == "__main__":
-    game = Game()
+    # Optional argument: path to a dictionary file with one word per line
+    game = Game(sys.argv[1] if len(sys.argv) > 1 else None)
     game.run()
\ No newline at end of file